@@ -1,23 +1,13 @@
 from pathlib import Path
 import sys
-from typing import Any, Literal, Optional
-from langchain.agents import create_agent
+from typing import Annotated, Literal, Optional
 from pydantic import BaseModel, Field
-from langfuse import Langfuse, get_client
-from langfuse.langchain import CallbackHandler
-import os
 
-from models.gemini import model
-from utils.pdf_to_image import pdf_to_base64_image_parts
-
-Langfuse(
-    public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-    secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-    host=os.getenv("LANGFUSE_HOST", "http://localhost:3000"),
-)
-
-langfuse = get_client()
-langfuse_handler = CallbackHandler()
+from utils.document_type import DocumentType
+from utils.modality import VISUAL
+from utils.page_selection import PageSelection
+from utils.pdf_to_image import ADAPTIVE
+from utils.result_store import IndexedFields
 
 
 class AiClearanceFromEntityDetails(BaseModel):
@@ -28,10 +18,10 @@ class AiClearanceFromEntityDetails(BaseModel):
         default=None,
         description='When not_agent_institution_confirmation is "Yes", the exact sentence(s) from the letter that state they are not an AI with any OU under the BBPS ecosystem (verbatim). Otherwise null.',
     )
-    sealed_or_stamped: Literal["Yes", "No"] = Field(
+    sealed_or_stamped: Annotated[Literal["Yes", "No"], VISUAL] = Field(
         description='Whether the letter has a seal or stamp. Allowed values: "Yes" or "No".'
     )
-    seal_or_stamp_description: Optional[str] = Field(
+    seal_or_stamp_description: Annotated[Optional[str], VISUAL] = Field(
         default=None,
         description="When sealed_or_stamped is 'Yes', the text or description visible on the seal/stamp (e.g. company name, designation). Otherwise null.",
     )
@@ -67,45 +57,37 @@ Your task is to extract structured information from the provided document image(
 """
 
 
-agent = create_agent(
-    model=model,
-    response_format=AiClearanceFromEntityDetails,
-    system_prompt=AI_CLEARANCE_FROM_ENTITY_SYSTEM_PROMPT,
+RENDER_OPTIONS = ADAPTIVE
+PAGE_SELECTION = PageSelection(
+    keywords=(
+        r"Agent Institution",
+        r"\bBBPS\b",
+        r"Operating Unit",
+        r"Authori[sz]ed Signatory",
+    ),
 )
 
 
-def validate_document(agent: Any, document_path: str | Path) -> AiClearanceFromEntityDetails:
-    image_parts = pdf_to_base64_image_parts(document_path)
-
-    result = agent.invoke(
-        {
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": (
-                                "Extract AI clearance from entity details from this document "
-                                "and return the structured response."
-                            ),
-                        },
-                        *image_parts,
-                    ],
-                }
-            ]
-        },
-        config={
-            "callbacks": [langfuse_handler],
-            "metadata": {
-                "document_path": str(document_path),
-                "agent_type": "ai_clearance_from_entity",
-            },
-            "tags": ["vlm", "pdf-validation"],
-        },
-    )
-
-    return result["structured_response"]
+DOCUMENT_TYPE = DocumentType(
+    agent_type="ai_clearance_from_entity",
+    slug="ai-clearance-from-entity",
+    title="AI clearance from entity",
+    response_format=AiClearanceFromEntityDetails,
+    system_prompt=AI_CLEARANCE_FROM_ENTITY_SYSTEM_PROMPT,
+    instruction=(
+        "Extract AI clearance from entity details from this document "
+        "and return the structured response."
+    ),
+    filename_patterns=("AI clearance*",),
+    classifier_keywords=(
+        r"Agent Institution",
+        r"\bclearance\b",
+        r"Operating Unit",
+    ),
+    render_options=RENDER_OPTIONS,
+    page_selection=PAGE_SELECTION,
+    indexed_fields=IndexedFields(entity_name="company_name"),
+)
 
 
 if __name__ == "__main__":
@@ -117,6 +99,6 @@ if __name__ == "__main__":
     )
     pdf_path = sys.argv[1] if len(sys.argv) >= 2 else default_pdf_path
 
-    response = validate_document(agent, pdf_path)
+    response = DOCUMENT_TYPE.validate(pdf_path)
     print(response.model_dump_json(indent=2))
 
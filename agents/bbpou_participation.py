@@ -1,29 +1,16 @@
 from datetime import date
-from pathlib import Path
 import sys
-from typing import Any, Literal, Optional, Union
-from langchain.agents import create_agent
+from typing import Annotated, Literal, Optional, Union
 from pydantic import BaseModel, Field
-from langfuse import Langfuse, get_client
-from langfuse.langchain import CallbackHandler
-import os
 
 
-from models.gemini import model
-#from models.ollama import model
-#from models.groq import model
-from utils.pdf_to_image import pdf_to_base64_image_parts
+from utils.document_type import DocumentType
+from utils.modality import VISUAL
+from utils.page_selection import PageSelection
+from utils.pdf_to_image import ADAPTIVE
+from utils.result_store import IndexedFields
 
 
-Langfuse(public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-    secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-    host=os.getenv("LANGFUSE_HOST", "http://localhost:3000"))
-
-langfuse = get_client()
-
-# Initialize the Langfuse handler
-langfuse_handler = CallbackHandler()
-
 class BBPouParticipation(BaseModel):
     company_name: str = Field(
         description="Legal name of the company/entity."
@@ -42,14 +29,14 @@ class BBPouParticipation(BaseModel):
     phone_number: str = Field(
         description="Contact phone number; kept as string to preserve formatting."
     )
-    stamped_seal: Literal["Yes", "No"] = Field(
+    stamped_seal: Annotated[Literal["Yes", "No"], VISUAL] = Field(
         description='Whether a stamped seal is present. Allowed values: "Yes" or "No".'
     )
-    seal_description: Optional[str] = Field(
+    seal_description: Annotated[Optional[str], VISUAL] = Field(
         default=None,
         description='Seal details if stamped_seal is "Yes"; otherwise null.',
     )
-    authorized_signatory: Literal["Yes", "No"] = Field(
+    authorized_signatory: Annotated[Literal["Yes", "No"], VISUAL] = Field(
         description='Whether an authorized signatory is present. Allowed values: "Yes" or "No".'
     )
     signatory_name: Optional[str] = Field(
@@ -112,46 +99,39 @@ Your task is to extract structured information from the provided document image(
 """
 
 
-agent = create_agent(
-    model=model,
-    response_format=BBPouParticipation,
-    system_prompt=BBPOU_SYSTEM_PROMPT,
+RENDER_OPTIONS = ADAPTIVE
+PAGE_SELECTION = PageSelection(
+    keywords=(
+        r"\bBBPOU\b",
+        r"Bharat Bill",
+        r"(Customer|Biller) BBPOU",
+        r"Authori[sz]ed Signatory",
+        r"\b(Phone|Tel|Mobile)\b",
+        r"\bSeal\b",
+    ),
 )
 
 
-def validate_document(agent: Any, document_path: str | Path) -> BBPouParticipation:
-    image_parts = pdf_to_base64_image_parts(document_path)
-
-    result = agent.invoke(
-    {
-        "messages": [
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": (
-                            "Extract BBPOU participation details from this document "
-                            "and return the structured response."
-                        ),
-                    },
-                    *image_parts,
-                ],
-            }
-        ]
-    },
-    config={
-        "callbacks": [langfuse_handler],
-        "metadata": {
-            "document_path": str(document_path),
-            "agent_type": "bbpou_validation",
-        },
-        "tags": ["vlm", "pdf-validation"],
-    },
+DOCUMENT_TYPE = DocumentType(
+    agent_type="bbpou_validation",
+    slug="bbpou-participation",
+    title="BBPOU participation letter",
+    response_format=BBPouParticipation,
+    system_prompt=BBPOU_SYSTEM_PROMPT,
+    instruction=(
+        "Extract BBPOU participation details from this document "
+        "and return the structured response."
+    ),
+    filename_patterns=("BBPOU participation*",),
+    classifier_keywords=(
+        r"BBPOU Participation",
+        r"participat\w*[\s\S]{0,80}Bharat Bill Payment",
+    ),
+    render_options=RENDER_OPTIONS,
+    page_selection=PAGE_SELECTION,
+    indexed_fields=IndexedFields(entity_name="company_name"),
 )
 
-    return result["structured_response"]
-
 
 if __name__ == "__main__":
     default_pdf_path = (
@@ -159,5 +139,5 @@ if __name__ == "__main__":
     )
     pdf_path = sys.argv[1] if len(sys.argv) >= 2 else default_pdf_path
 
-    response = validate_document(agent, pdf_path)
+    response = DOCUMENT_TYPE.validate(pdf_path)
     print(response.model_dump_json(indent=2))
\ No newline at end of file
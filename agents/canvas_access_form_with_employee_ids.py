@@ -1,23 +1,12 @@
-from pathlib import Path
 import sys
-from typing import Any, Literal
-from langchain.agents import create_agent
+from typing import Annotated, Literal
 from pydantic import BaseModel, Field
-from langfuse import Langfuse, get_client
-from langfuse.langchain import CallbackHandler
-import os
-
-from models.gemini import model
-#from models.ollama import model
-from utils.pdf_to_image import pdf_to_base64_image_parts
-
-Langfuse(
-    public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-    secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-    host=os.getenv("LANGFUSE_HOST", "http://localhost:3000"),
-)
-langfuse = get_client()
-langfuse_handler = CallbackHandler()
+
+from utils.document_type import DocumentType
+from utils.modality import VISUAL
+from utils.page_selection import PageSelection
+from utils.pdf_to_image import REQUEST_PAYLOAD_BUDGET, RenderOptions
+from utils.result_store import IndexedFields
 
 
 class AdminDetails(BaseModel):
@@ -65,7 +54,7 @@ class CanvasAccessFormWithEmployeeIds(BaseModel):
         default="VALUES MISSING",
         description="Whether the document/signatory is authorised or not. Allowed values only: 'authorised' or 'not authorised' or 'VALUES MISSING'.",
     )
-    authorised_details: AuthorisedDetails = Field(
+    authorised_details: Annotated[AuthorisedDetails, VISUAL] = Field(
         description="When is_authorised is 'authorised': name, designation, signature_present (yes or VALUES MISSING), seal_and_stamp (yes or VALUES MISSING), seal_and_stamp_description. Otherwise use VALUES MISSING for fields.",
     )
 
@@ -102,43 +91,39 @@ Your task is to extract structured information from the provided document image(
 """
 
 
-agent = create_agent(
-    model=model,
-    response_format=CanvasAccessFormWithEmployeeIds,
-    system_prompt=CANVAS_ACCESS_FORM_SYSTEM_PROMPT,
+# Dense tabular form: keep a larger long edge so small table text stays legible.
+RENDER_OPTIONS = RenderOptions(dpi=None, max_long_edge=2400, quality=85, max_payload_bytes=REQUEST_PAYLOAD_BUDGET)
+PAGE_SELECTION = PageSelection(
+    keywords=(
+        r"\bAdmin\b",
+        r"Declaration",
+        r"\bBBPOU\b",
+        r"Access Type",
+        r"Authori[sz]ed Signatory",
+    ),
 )
 
 
-def validate_document(agent: Any, document_path: str | Path) -> CanvasAccessFormWithEmployeeIds:
-    image_parts = pdf_to_base64_image_parts(document_path)
-    result = agent.invoke(
-        {
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": (
-                                "Extract Canvas Access Form details from this document "
-                                "and return the structured response."
-                            ),
-                        },
-                        *image_parts,
-                    ],
-                }
-            ]
-        },
-        config={
-            "callbacks": [langfuse_handler],
-            "metadata": {
-                "document_path": str(document_path),
-                "agent_type": "canvas_access_form_with_employee_ids",
-            },
-            "tags": ["vlm", "pdf-validation"],
-        },
-    )
-    return result["structured_response"]
+DOCUMENT_TYPE = DocumentType(
+    agent_type="canvas_access_form_with_employee_ids",
+    slug="canvas-access-form-with-employee-ids",
+    title="Canvas access form with employee IDs",
+    response_format=CanvasAccessFormWithEmployeeIds,
+    system_prompt=CANVAS_ACCESS_FORM_SYSTEM_PROMPT,
+    instruction=(
+        "Extract Canvas Access Form details from this document "
+        "and return the structured response."
+    ),
+    filename_patterns=("*Canvas_Access*", "*Canvas Access*"),
+    classifier_keywords=(
+        r"Access Request Form",
+        r"Bharat Connect",
+        r"Access Typ",
+    ),
+    render_options=RENDER_OPTIONS,
+    page_selection=PAGE_SELECTION,
+    indexed_fields=IndexedFields(entity_name="name_of_the_bbpou"),
+)
 
 
 if __name__ == "__main__":
@@ -146,5 +131,5 @@ if __name__ == "__main__":
         r"C:\test\Agents\agents-vlm\documents\pdfs\CH51_Canvas_Access Form.pdf"
     )
     pdf_path = sys.argv[1] if len(sys.argv) >= 2 else default_pdf_path
-    response = validate_document(agent, pdf_path)
+    response = DOCUMENT_TYPE.validate(pdf_path)
     print(response.model_dump_json(indent=2))
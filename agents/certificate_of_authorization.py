@@ -1,28 +1,15 @@
 from datetime import date
-from pathlib import Path
 import sys
-from typing import Any, Literal, Optional, Union
-from langchain.agents import create_agent
+from typing import Annotated, Literal, Optional, Union
 from pydantic import BaseModel, Field
-from langfuse import Langfuse, get_client
-from langfuse.langchain import CallbackHandler
-import os
 
 
-from models.gemini import model
-#from models.groq import model
-from utils.pdf_to_image import pdf_to_base64_image_parts
+from utils.document_type import DocumentType
+from utils.modality import VISUAL
+from utils.page_selection import PageSelection
+from utils.pdf_to_image import ADAPTIVE
 
 
-Langfuse(public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-    secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-    host=os.getenv("LANGFUSE_HOST", "http://localhost:3000"))
-
-langfuse = get_client()
-
-# Initialize the Langfuse handler
-langfuse_handler = CallbackHandler()
-
 class CertificateOfAuthorizationDetails(BaseModel):
     rbi_approval_received: Literal["Yes", "No"] = Field(
         description='Whether the entity has received approval from the RBI. Allowed values: "Yes" or "No".'
@@ -41,7 +28,7 @@ class CertificateOfAuthorizationDetails(BaseModel):
         default="date is not mentioned",
         description='Date of issue of the certificate in YYYY-MM-DD format, or the exact text "date is not mentioned".',
     )
-    signature_chief_general_manager: Literal["Yes", "No"] = Field(
+    signature_chief_general_manager: Annotated[Literal["Yes", "No"], VISUAL] = Field(
         description='Whether the signature of the Chief General Manager-in-Charge is present. Allowed values: "Yes" or "No".'
     )
     certification_of_authorisation_number: str = Field(
@@ -79,46 +66,37 @@ Your task is to extract structured information from the provided document image(
 """
 
 
-agent = create_agent(
-    model=model,
-    response_format=CertificateOfAuthorizationDetails,
-    system_prompt=CERTIFICATE_OF_AUTHORIZATION_SYSTEM_PROMPT,
+RENDER_OPTIONS = ADAPTIVE
+PAGE_SELECTION = PageSelection(
+    keywords=(
+        r"Certificate of Authori[sz]ation",
+        r"Reserve Bank",
+        r"Chief General Manager",
+        r"Payment System",
+    ),
 )
 
 
-def validate_document(agent: Any, document_path: str | Path) -> CertificateOfAuthorizationDetails:
-    image_parts = pdf_to_base64_image_parts(document_path)
-
-    result = agent.invoke(
-    {
-        "messages": [
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": (
-                            "Extract Certificate of Authorization details from this document "
-                            "and return the structured response."
-                        ),
-                    },
-                    *image_parts,
-                ],
-            }
-        ]
-    },
-    config={
-        "callbacks": [langfuse_handler],
-        "metadata": {
-            "document_path": str(document_path),
-            "agent_type": "certificate_of_authorization",
-        },
-        "tags": ["vlm", "pdf-validation"],
-    },
+DOCUMENT_TYPE = DocumentType(
+    agent_type="certificate_of_authorization",
+    slug="certificate-of-authorization",
+    title="Certificate of authorization",
+    response_format=CertificateOfAuthorizationDetails,
+    system_prompt=CERTIFICATE_OF_AUTHORIZATION_SYSTEM_PROMPT,
+    instruction=(
+        "Extract Certificate of Authorization details from this document "
+        "and return the structured response."
+    ),
+    filename_patterns=("Certificate Of Authorization*",),
+    classifier_keywords=(
+        r"CERTIFICATE OF AUTHORI[SZ]ATION",
+        r"Payment and Settlement Systems Act",
+        r"RESERVE BANK OF INDIA",
+    ),
+    render_options=RENDER_OPTIONS,
+    page_selection=PAGE_SELECTION,
 )
 
-    return result["structured_response"]
-
 
 if __name__ == "__main__":
     default_pdf_path = (
@@ -126,5 +104,5 @@ if __name__ == "__main__":
     )
     pdf_path = sys.argv[1] if len(sys.argv) >= 2 else default_pdf_path
 
-    response = validate_document(agent, pdf_path)
+    response = DOCUMENT_TYPE.validate(pdf_path)
     print(response.model_dump_json(indent=2))
@@ -1,23 +1,11 @@
 from pathlib import Path
 import sys
-from typing import Any, Literal, Optional
-from langchain.agents import create_agent
+from typing import Literal, Optional
 from pydantic import BaseModel, Field
-from langfuse import Langfuse, get_client
-from langfuse.langchain import CallbackHandler
-import os
 
-from models.gemini import model
-from utils.pdf_to_image import pdf_to_base64_image_parts
-
-Langfuse(
-    public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-    secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-    host=os.getenv("LANGFUSE_HOST", "http://localhost:3000"),
-)
-
-langfuse = get_client()
-langfuse_handler = CallbackHandler()
+from utils.document_type import DocumentType
+from utils.page_selection import PageSelection
+from utils.pdf_to_image import REQUEST_PAYLOAD_BUDGET, RenderOptions
 
 
 class CommencementLetterToRbiDetails(BaseModel):
@@ -78,45 +66,38 @@ Your task is to extract structured information from the provided document image(
 """
 
 
-agent = create_agent(
-    model=model,
-    response_format=CommencementLetterToRbiDetails,
-    system_prompt=COMMENCEMENT_LETTER_TO_RBI_SYSTEM_PROMPT,
+# Plain correspondence without seals: grayscale text renders compress far better.
+RENDER_OPTIONS = RenderOptions(dpi=None, image_format="png-gray", max_payload_bytes=REQUEST_PAYLOAD_BUDGET)
+PAGE_SELECTION = PageSelection(
+    keywords=(
+        r"commence",
+        r"Reserve Bank|\bRBI\b",
+        r"\bcc\s*:",
+        r"[\w.+-]+@[\w-]+\.[\w.]+",
+    ),
 )
 
 
-def validate_document(agent: Any, document_path: str | Path) -> CommencementLetterToRbiDetails:
-    image_parts = pdf_to_base64_image_parts(document_path)
-
-    result = agent.invoke(
-        {
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": (
-                                "Extract commencement letter to RBI details from this document "
-                                "and return the structured response."
-                            ),
-                        },
-                        *image_parts,
-                    ],
-                }
-            ]
-        },
-        config={
-            "callbacks": [langfuse_handler],
-            "metadata": {
-                "document_path": str(document_path),
-                "agent_type": "commencement_letter_to_rbi",
-            },
-            "tags": ["vlm", "pdf-validation"],
-        },
-    )
-
-    return result["structured_response"]
+DOCUMENT_TYPE = DocumentType(
+    agent_type="commencement_letter_to_rbi",
+    slug="commencement-letter-to-rbi",
+    title="Commencement letter to RBI",
+    response_format=CommencementLetterToRbiDetails,
+    system_prompt=COMMENCEMENT_LETTER_TO_RBI_SYSTEM_PROMPT,
+    instruction=(
+        "Extract commencement letter to RBI details from this document "
+        "and return the structured response."
+    ),
+    filename_patterns=("Commencement letter*",),
+    classifier_keywords=(
+        r"Intimation to operate as a BBPOU",
+        r"\bDPSS\b",
+        r"commence\w*",
+    ),
+    render_options=RENDER_OPTIONS,
+    page_selection=PAGE_SELECTION,
+    route_by_modality=True,
+)
 
 
 if __name__ == "__main__":
@@ -128,5 +109,5 @@ if __name__ == "__main__":
     )
     pdf_path = sys.argv[1] if len(sys.argv) >= 2 else default_pdf_path
 
-    response = validate_document(agent, pdf_path)
+    response = DOCUMENT_TYPE.validate(pdf_path)
     print(response.model_dump_json(indent=2))
@@ -0,0 +1,89 @@
+from utils.reconciliation import ConsistencyCheck, FieldRef
+
+# Cross-document checks over one entity's onboarding dossier. Fields are
+# referenced by document type slug and response field name, as registered in
+# agents/registry.py.
+DOSSIER_CHECKS: tuple[ConsistencyCheck, ...] = (
+    ConsistencyCheck(
+        name="entity_name",
+        kind="name",
+        fields=(
+            FieldRef("gst-certificate", "legal_name"),
+            FieldRef("bbpou-participation", "company_name"),
+            FieldRef("ai-clearance-from-entity", "company_name"),
+            FieldRef("canvas-access-form-with-employee-ids", "name_of_the_bbpou"),
+            FieldRef("escrow-account-details", "account_name"),
+        ),
+    ),
+    ConsistencyCheck(
+        name="sponsor_bank_name",
+        kind="name",
+        fields=(
+            FieldRef("letter-from-sponsor-bank", "bank_name"),
+            FieldRef("ndc-letter", "bank_name"),
+        ),
+    ),
+    # The settlement account is usually, but not necessarily, the escrow account.
+    ConsistencyCheck(
+        name="settlement_ifsc",
+        kind="identifier",
+        fields=(
+            FieldRef("ifsc-and-settlement-account-confirmation", "bank_ifsc_code"),
+            FieldRef("escrow-account-details", "ifsc_code"),
+        ),
+        severity="warning",
+    ),
+    ConsistencyCheck(
+        name="settlement_account_number",
+        kind="identifier",
+        fields=(
+            FieldRef("ifsc-and-settlement-account-confirmation", "bank_account_number"),
+            FieldRef("escrow-account-details", "account_number"),
+        ),
+        severity="warning",
+    ),
+    ConsistencyCheck(
+        name="entity_signatory",
+        kind="name",
+        fields=(
+            FieldRef("bbpou-participation", "signatory_name"),
+            FieldRef("canvas-access-form-with-employee-ids", "authorised_details.name"),
+        ),
+        severity="warning",
+    ),
+    ConsistencyCheck(
+        name="sponsor_bank_signatory",
+        kind="name",
+        fields=(
+            FieldRef("letter-from-sponsor-bank", "name_of_signer"),
+            FieldRef("ndc-letter", "name_of_signer"),
+        ),
+        severity="warning",
+    ),
+    ConsistencyCheck(
+        name="authorization_before_commencement",
+        kind="date_order",
+        fields=(
+            FieldRef("certificate-of-authorization", "date_of_issue"),
+            FieldRef("commencement-letter-to-rbi", "commencement_date"),
+        ),
+    ),
+    ConsistencyCheck(
+        name="escrow_opened_before_commencement",
+        kind="date_order",
+        fields=(
+            FieldRef("escrow-account-details", "account_opening_date"),
+            FieldRef("commencement-letter-to-rbi", "commencement_date"),
+        ),
+        severity="warning",
+    ),
+    ConsistencyCheck(
+        name="gst_registration_before_participation",
+        kind="date_order",
+        fields=(
+            FieldRef("gst-certificate", "date_of_issue_of_certificate"),
+            FieldRef("bbpou-participation", "date_of_authorization"),
+        ),
+        severity="warning",
+    ),
+)
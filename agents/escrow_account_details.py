@@ -1,23 +1,14 @@
 from pathlib import Path
 import sys
-from typing import Any, Literal, Optional
-from langchain.agents import create_agent
+from typing import Annotated, Literal, Optional
 from pydantic import BaseModel, Field
-from langfuse import Langfuse, get_client
-from langfuse.langchain import CallbackHandler
-import os
 
-from models.gemini import model
-from utils.pdf_to_image import pdf_to_base64_image_parts
-
-Langfuse(
-    public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-    secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-    host=os.getenv("LANGFUSE_HOST", "http://localhost:3000"),
-)
-
-langfuse = get_client()
-langfuse_handler = CallbackHandler()
+from utils.document_type import DocumentType
+from utils.modality import VISUAL
+from utils.page_selection import PageSelection
+from utils.pdf_to_image import ADAPTIVE
+from utils.result_store import IndexedFields
+from utils.text_layer import DATE_PATTERN, IFSC_PATTERN, TextExtraction, TextFieldRule
 
 
 class EscrowAccountDetails(BaseModel):
@@ -33,17 +24,17 @@ class EscrowAccountDetails(BaseModel):
     ifsc_code: str = Field(
         description="IFSC code of the bank/branch for the escrow account as stated in the document."
     )
-    signed: Literal["Yes", "No"] = Field(
+    signed: Annotated[Literal["Yes", "No"], VISUAL] = Field(
         description='Whether the document is signed. Allowed values: "Yes" or "No".'
     )
     signed_date: Optional[str] = Field(
         default=None,
         description="When signed is 'Yes', the date of signing as stated in the document. Otherwise null.",
     )
-    seal_or_stamp: Literal["Yes", "No"] = Field(
+    seal_or_stamp: Annotated[Literal["Yes", "No"], VISUAL] = Field(
         description='Whether the document has a seal or stamp. Allowed values: "Yes" or "No".'
     )
-    seal_description: Optional[str] = Field(
+    seal_description: Annotated[Optional[str], VISUAL] = Field(
         default=None,
         description="When seal_or_stamp is 'Yes', the text or description visible on the seal/stamp. Otherwise null.",
     )
@@ -81,45 +72,48 @@ Your task is to extract structured information from the provided document image(
 """
 
 
-agent = create_agent(
-    model=model,
-    response_format=EscrowAccountDetails,
-    system_prompt=ESCROW_ACCOUNT_DETAILS_SYSTEM_PROMPT,
+RENDER_OPTIONS = ADAPTIVE
+PAGE_SELECTION = PageSelection(
+    keywords=(
+        r"Escrow",
+        r"Account (No|Number)",
+        r"\bIFSC\b",
+        r"(?-i:\b[A-Z]{4}0[A-Z0-9]{6}\b)",
+        r"Open(ing|ed)",
+        r"Authori[sz]ed Signatory",
+    ),
+)
+TEXT_EXTRACTION = TextExtraction(
+    rules={
+        "account_number": TextFieldRule(r"ACCOUNT NUMBER[\s\S]*?\b(\d{9,18})\b"),
+        "account_opening_date": TextFieldRule(rf"ACCOUNT OPENING[\s\S]*?\b({DATE_PATTERN})\b"),
+        "ifsc_code": TextFieldRule(rf"IFSC(?: CODE)?[\s\S]*?\b({IFSC_PATTERN})\b", flags=0),
+    },
 )
 
 
-def validate_document(agent: Any, document_path: str | Path) -> EscrowAccountDetails:
-    image_parts = pdf_to_base64_image_parts(document_path)
-
-    result = agent.invoke(
-        {
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": (
-                                "Extract escrow account details from this document "
-                                "and return the structured response."
-                            ),
-                        },
-                        *image_parts,
-                    ],
-                }
-            ]
-        },
-        config={
-            "callbacks": [langfuse_handler],
-            "metadata": {
-                "document_path": str(document_path),
-                "agent_type": "escrow_account_details",
-            },
-            "tags": ["vlm", "pdf-validation"],
-        },
-    )
-
-    return result["structured_response"]
+DOCUMENT_TYPE = DocumentType(
+    agent_type="escrow_account_details",
+    slug="escrow-account-details",
+    title="Escrow account details",
+    response_format=EscrowAccountDetails,
+    system_prompt=ESCROW_ACCOUNT_DETAILS_SYSTEM_PROMPT,
+    instruction=(
+        "Extract escrow account details from this document "
+        "and return the structured response."
+    ),
+    filename_patterns=("Escrow account details*",),
+    classifier_keywords=(
+        r"escrow account",
+        r"Account Confirmation Letter",
+        r"\bIFSC\b",
+    ),
+    render_options=RENDER_OPTIONS,
+    page_selection=PAGE_SELECTION,
+    text_extraction=TEXT_EXTRACTION,
+    route_by_modality=True,
+    indexed_fields=IndexedFields(entity_name="account_name", ifsc="ifsc_code"),
+)
 
 
 if __name__ == "__main__":
@@ -131,5 +125,5 @@ if __name__ == "__main__":
     )
     pdf_path = sys.argv[1] if len(sys.argv) >= 2 else default_pdf_path
 
-    response = validate_document(agent, pdf_path)
+    response = DOCUMENT_TYPE.validate(pdf_path)
     print(response.model_dump_json(indent=2))
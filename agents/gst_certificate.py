@@ -1,31 +1,22 @@
 from datetime import date
 from pathlib import Path
 import sys
-from typing import Any, Literal, Optional, Union
-from langchain.agents import create_agent
+from typing import Annotated, Literal, Optional, Union
 from pydantic import BaseModel, Field
-from langfuse import Langfuse, get_client
-from langfuse.langchain import CallbackHandler
-import os
 
-from models.gemini import model
-from utils.pdf_to_image import pdf_to_base64_image_parts
-
-Langfuse(
-    public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-    secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-    host=os.getenv("LANGFUSE_HOST", "http://localhost:3000"),
-)
-
-langfuse = get_client()
-langfuse_handler = CallbackHandler()
+from utils.document_type import DocumentType
+from utils.modality import VISUAL
+from utils.page_selection import PageSelection
+from utils.pdf_to_image import ADAPTIVE
+from utils.result_store import IndexedFields
+from utils.text_layer import DATE_PATTERN, GSTIN_PATTERN, TextExtraction, TextFieldRule, parse_date
 
 
 class GstCertificateDetails(BaseModel):
-    digital_signature: Literal["Yes", "No"] = Field(
+    digital_signature: Annotated[Literal["Yes", "No"], VISUAL] = Field(
         description='Whether a valid digital signature is done on the certificate. Use "No" if there is a question mark, "signature not verified", or similar indication; use "Yes" only when the digital signature is verified/done. Otherwise "No".'
     )
-    physical_signature: Literal["Yes", "No"] = Field(
+    physical_signature: Annotated[Literal["Yes", "No"], VISUAL] = Field(
         description='Whether a physical (handwritten/inked) signature is present. Allowed values: "Yes" or "No".'
     )
     registration_number: str = Field(
@@ -47,10 +38,10 @@ class GstCertificateDetails(BaseModel):
         default="date is not mentioned",
         description='Date of issue of the certificate in YYYY-MM-DD format, or the exact text "date is not mentioned".',
     )
-    stamp_present: Literal["present", "not"] = Field(
+    stamp_present: Annotated[Literal["present", "not"], VISUAL] = Field(
         description='Only applies when physical_signature is Yes: whether an official stamp/seal is present alongside the physical signature. If only digital signature is done (no physical signature), use "not". Allowed values: "present" or "not".'
     )
-    stamp_description: Optional[str] = Field(
+    stamp_description: Annotated[Optional[str], VISUAL] = Field(
         default=None,
         description="When stamp_present is 'present', the text or description visible on the stamp/seal (e.g. authority name, office). If no stamp or text not readable, use null.",
     )
@@ -92,50 +83,60 @@ Your task is to extract structured information from the provided document image(
 """
 
 
-agent = create_agent(
-    model=model,
-    response_format=GstCertificateDetails,
-    system_prompt=GST_CERTIFICATE_SYSTEM_PROMPT,
+RENDER_OPTIONS = ADAPTIVE
+PAGE_SELECTION = PageSelection(
+    keywords=(
+        r"\bGSTIN\b",
+        r"Registration Number",
+        r"Legal Name",
+        r"Constitution of Business",
+        r"Principal Place of Business",
+        r"Date of Issue",
+        r"Signature",
+    ),
+)
+TEXT_EXTRACTION = TextExtraction(
+    rules={
+        "registration_number": TextFieldRule(rf"Registration Number\s*:?\s*({GSTIN_PATTERN})", flags=0),
+        "legal_name": TextFieldRule(r"Legal Name\s*\n(.+)"),
+        "constitution_of_business": TextFieldRule(r"Constitution of Business\s*\n(.+)"),
+        "address_of_principal_place_of_business": TextFieldRule(
+            r"Address of Principal Place of\s*Business\s*\n(?:\(Amended\)\s*\n)?([\s\S]+?)\n\s*\d+\.\s*\n?\s*Date of Liability"
+        ),
+        "date_of_issue_of_certificate": TextFieldRule(
+            rf"Date of issue of Certificate\s*\n?\s*({DATE_PATTERN})",
+            normalize=parse_date,
+        ),
+    },
 )
 
 
-def validate_document(agent: Any, document_path: str | Path) -> GstCertificateDetails:
-    image_parts = pdf_to_base64_image_parts(document_path)
-
-    result = agent.invoke(
-        {
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": (
-                                "Extract GST certificate details from this document "
-                                "and return the structured response."
-                            ),
-                        },
-                        *image_parts,
-                    ],
-                }
-            ]
-        },
-        config={
-            "callbacks": [langfuse_handler],
-            "metadata": {
-                "document_path": str(document_path),
-                "agent_type": "gst_certificate",
-            },
-            "tags": ["vlm", "pdf-validation"],
-        },
-    )
-
-    return result["structured_response"]
+DOCUMENT_TYPE = DocumentType(
+    agent_type="gst_certificate",
+    slug="gst-certificate",
+    title="GST certificate",
+    response_format=GstCertificateDetails,
+    system_prompt=GST_CERTIFICATE_SYSTEM_PROMPT,
+    instruction=(
+        "Extract GST certificate details from this document "
+        "and return the structured response."
+    ),
+    filename_patterns=("GST Certificate*",),
+    classifier_keywords=(
+        r"GST REG-06",
+        r"Registration Certificate",
+        r"Constitution of Business",
+    ),
+    render_options=RENDER_OPTIONS,
+    page_selection=PAGE_SELECTION,
+    text_extraction=TEXT_EXTRACTION,
+    indexed_fields=IndexedFields(entity_name="legal_name", gstin="registration_number"),
+)
 
 
 if __name__ == "__main__":
     default_pdf_path = Path(__file__).resolve().parent.parent / "documents" / "pdfs" / "GST Certificate_Cashfree Payments India Private Limited.pdf"
     pdf_path = sys.argv[1] if len(sys.argv) >= 2 else default_pdf_path
 
-    response = validate_document(agent, pdf_path)
+    response = DOCUMENT_TYPE.validate(pdf_path)
     print(response.model_dump_json(indent=2))
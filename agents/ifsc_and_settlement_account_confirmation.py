@@ -1,23 +1,14 @@
 from pathlib import Path
 import sys
-from typing import Any, Literal, Optional
-from langchain.agents import create_agent
+from typing import Annotated, Literal, Optional
 from pydantic import BaseModel, Field
-from langfuse import Langfuse, get_client
-from langfuse.langchain import CallbackHandler
-import os
 
-from models.gemini import model
-from utils.pdf_to_image import pdf_to_base64_image_parts
-
-Langfuse(
-    public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-    secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-    host=os.getenv("LANGFUSE_HOST", "http://localhost:3000"),
-)
-
-langfuse = get_client()
-langfuse_handler = CallbackHandler()
+from utils.document_type import DocumentType
+from utils.modality import VISUAL
+from utils.page_selection import PageSelection
+from utils.pdf_to_image import ADAPTIVE
+from utils.result_store import IndexedFields
+from utils.text_layer import IFSC_PATTERN, TextExtraction, TextFieldRule
 
 
 class IfscAndSettlementAccountConfirmationDetails(BaseModel):
@@ -30,7 +21,7 @@ class IfscAndSettlementAccountConfirmationDetails(BaseModel):
     bank_account_number: str = Field(
         description="Bank account number (settlement account number) as stated in the document."
     )
-    signed: Literal["Yes", "No"] = Field(
+    signed: Annotated[Literal["Yes", "No"], VISUAL] = Field(
         description='Whether the document is signed. Allowed values: "Yes" or "No".'
     )
     name_of_signer: str = Field(
@@ -39,10 +30,10 @@ class IfscAndSettlementAccountConfirmationDetails(BaseModel):
     designation: str = Field(
         description="Designation or title of the person who signed (e.g. Authorized Signatory, Manager)."
     )
-    sealed_or_stamped: Literal["Yes", "No"] = Field(
+    sealed_or_stamped: Annotated[Literal["Yes", "No"], VISUAL] = Field(
         description='Whether the document has a seal or stamp. Allowed values: "Yes" or "No".'
     )
-    stamp_seal_description: Optional[str] = Field(
+    stamp_seal_description: Annotated[Optional[str], VISUAL] = Field(
         default=None,
         description="When sealed_or_stamped is 'Yes', the text or description visible on the stamp/seal. Otherwise null.",
     )
@@ -80,45 +71,45 @@ Your task is to extract structured information from the provided document image(
 """
 
 
-agent = create_agent(
-    model=model,
-    response_format=IfscAndSettlementAccountConfirmationDetails,
-    system_prompt=IFSC_AND_SETTLEMENT_ACCOUNT_CONFIRMATION_SYSTEM_PROMPT,
+RENDER_OPTIONS = ADAPTIVE
+PAGE_SELECTION = PageSelection(
+    keywords=(
+        r"\bIFSC\b",
+        r"(?-i:\b[A-Z]{4}0[A-Z0-9]{6}\b)",
+        r"Settlement",
+        r"Account (No|Number)",
+        r"Authori[sz]ed Signatory",
+    ),
+)
+TEXT_EXTRACTION = TextExtraction(
+    rules={
+        "bank_ifsc_code": TextFieldRule(rf"IFSC(?: Code)?[\s\S]*?\b({IFSC_PATTERN})\b", flags=0),
+    },
 )
 
 
-def validate_document(agent: Any, document_path: str | Path) -> IfscAndSettlementAccountConfirmationDetails:
-    image_parts = pdf_to_base64_image_parts(document_path)
-
-    result = agent.invoke(
-        {
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": (
-                                "Extract IFSC and settlement account confirmation details from this document "
-                                "and return the structured response."
-                            ),
-                        },
-                        *image_parts,
-                    ],
-                }
-            ]
-        },
-        config={
-            "callbacks": [langfuse_handler],
-            "metadata": {
-                "document_path": str(document_path),
-                "agent_type": "ifsc_and_settlement_account_confirmation",
-            },
-            "tags": ["vlm", "pdf-validation"],
-        },
-    )
-
-    return result["structured_response"]
+DOCUMENT_TYPE = DocumentType(
+    agent_type="ifsc_and_settlement_account_confirmation",
+    slug="ifsc-and-settlement-account-confirmation",
+    title="IFSC and settlement account confirmation",
+    response_format=IfscAndSettlementAccountConfirmationDetails,
+    system_prompt=IFSC_AND_SETTLEMENT_ACCOUNT_CONFIRMATION_SYSTEM_PROMPT,
+    instruction=(
+        "Extract IFSC and settlement account confirmation details from this document "
+        "and return the structured response."
+    ),
+    filename_patterns=("IFSC and Settlement*",),
+    classifier_keywords=(
+        r"Settlement Account",
+        r"\bRTGS\b",
+        r"IFSC code confirmation",
+    ),
+    render_options=RENDER_OPTIONS,
+    page_selection=PAGE_SELECTION,
+    text_extraction=TEXT_EXTRACTION,
+    route_by_modality=True,
+    indexed_fields=IndexedFields(ifsc="bank_ifsc_code"),
+)
 
 
 if __name__ == "__main__":
@@ -130,5 +121,5 @@ if __name__ == "__main__":
     )
     pdf_path = sys.argv[1] if len(sys.argv) >= 2 else default_pdf_path
 
-    response = validate_document(agent, pdf_path)
+    response = DOCUMENT_TYPE.validate(pdf_path)
     print(response.model_dump_json(indent=2))
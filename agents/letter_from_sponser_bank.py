@@ -1,23 +1,12 @@
 from pathlib import Path
 import sys
-from typing import Any, Literal, Optional
-from langchain.agents import create_agent
+from typing import Annotated, Literal, Optional
 from pydantic import BaseModel, Field
-from langfuse import Langfuse, get_client
-from langfuse.langchain import CallbackHandler
-import os
 
-from models.gemini import model
-from utils.pdf_to_image import pdf_to_base64_image_parts
-
-Langfuse(
-    public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-    secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-    host=os.getenv("LANGFUSE_HOST", "http://localhost:3000"),
-)
-
-langfuse = get_client()
-langfuse_handler = CallbackHandler()
+from utils.document_type import DocumentType
+from utils.modality import VISUAL
+from utils.page_selection import PageSelection
+from utils.pdf_to_image import ADAPTIVE
 
 
 class LetterFromSponsorBankDetails(BaseModel):
@@ -27,7 +16,7 @@ class LetterFromSponsorBankDetails(BaseModel):
     bank_address: str = Field(
         description="Address of the bank as stated in the letter."
     )
-    signature: Literal["Yes", "No"] = Field(
+    signature: Annotated[Literal["Yes", "No"], VISUAL] = Field(
         description='Whether a signature is present on the letter. Allowed values: "Yes" or "No".'
     )
     designation_of_signer: str = Field(
@@ -76,45 +65,35 @@ Your task is to extract structured information from the provided document image(
 """
 
 
-agent = create_agent(
-    model=model,
-    response_format=LetterFromSponsorBankDetails,
-    system_prompt=LETTER_FROM_SPONSOR_BANK_SYSTEM_PROMPT,
+RENDER_OPTIONS = ADAPTIVE
+PAGE_SELECTION = PageSelection(
+    keywords=(
+        r"Sponsor",
+        r"agreed",
+        r"Authori[sz]ed Signatory",
+    ),
 )
 
 
-def validate_document(agent: Any, document_path: str | Path) -> LetterFromSponsorBankDetails:
-    image_parts = pdf_to_base64_image_parts(document_path)
-
-    result = agent.invoke(
-        {
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": (
-                                "Extract letter from sponsor bank details from this document "
-                                "and return the structured response."
-                            ),
-                        },
-                        *image_parts,
-                    ],
-                }
-            ]
-        },
-        config={
-            "callbacks": [langfuse_handler],
-            "metadata": {
-                "document_path": str(document_path),
-                "agent_type": "letter_from_sponsor_bank",
-            },
-            "tags": ["vlm", "pdf-validation"],
-        },
-    )
-
-    return result["structured_response"]
+DOCUMENT_TYPE = DocumentType(
+    agent_type="letter_from_sponsor_bank",
+    slug="letter-from-sponsor-bank",
+    title="Letter from sponsor bank",
+    response_format=LetterFromSponsorBankDetails,
+    system_prompt=LETTER_FROM_SPONSOR_BANK_SYSTEM_PROMPT,
+    instruction=(
+        "Extract letter from sponsor bank details from this document "
+        "and return the structured response."
+    ),
+    filename_patterns=("Sponsor Bank Letter*", "Letter from sponsor bank*"),
+    classifier_keywords=(
+        r"Sponsor bank",
+        r"Net Debit Cap",
+        r"undertak\w+",
+    ),
+    render_options=RENDER_OPTIONS,
+    page_selection=PAGE_SELECTION,
+)
 
 
 if __name__ == "__main__":
@@ -126,5 +105,5 @@ if __name__ == "__main__":
     )
     pdf_path = sys.argv[1] if len(sys.argv) >= 2 else default_pdf_path
 
-    response = validate_document(agent, pdf_path)
+    response = DOCUMENT_TYPE.validate(pdf_path)
     print(response.model_dump_json(indent=2))
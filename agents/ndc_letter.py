@@ -1,23 +1,12 @@
 from pathlib import Path
 import sys
-from typing import Any, Literal, Optional
-from langchain.agents import create_agent
+from typing import Annotated, Literal, Optional
 from pydantic import BaseModel, Field
-from langfuse import Langfuse, get_client
-from langfuse.langchain import CallbackHandler
-import os
 
-from models.gemini import model
-from utils.pdf_to_image import pdf_to_base64_image_parts
-
-Langfuse(
-    public_key=os.getenv("LANGFUSE_PUBLIC_KEY"),
-    secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
-    host=os.getenv("LANGFUSE_HOST", "http://localhost:3000"),
-)
-
-langfuse = get_client()
-langfuse_handler = CallbackHandler()
+from utils.document_type import DocumentType
+from utils.modality import VISUAL
+from utils.page_selection import PageSelection
+from utils.pdf_to_image import ADAPTIVE
 
 
 class NdcLetterDetails(BaseModel):
@@ -27,7 +16,7 @@ class NdcLetterDetails(BaseModel):
     bank_address: str = Field(
         description="Address of the bank as stated in the letter."
     )
-    signature: Literal["Yes", "No"] = Field(
+    signature: Annotated[Literal["Yes", "No"], VISUAL] = Field(
         description='Whether a signature is present on the letter. Allowed values: "Yes" or "No".'
     )
     designation_of_signer: str = Field(
@@ -76,45 +65,36 @@ Your task is to extract structured information from the provided document image(
 """
 
 
-agent = create_agent(
-    model=model,
-    response_format=NdcLetterDetails,
-    system_prompt=NDC_LETTER_SYSTEM_PROMPT,
+RENDER_OPTIONS = ADAPTIVE
+PAGE_SELECTION = PageSelection(
+    keywords=(
+        r"Net Debit Cap|\bNDC\b",
+        r"Settlement",
+        r"Sponsor",
+        r"Authori[sz]ed Signatory",
+    ),
 )
 
 
-def validate_document(agent: Any, document_path: str | Path) -> NdcLetterDetails:
-    image_parts = pdf_to_base64_image_parts(document_path)
-
-    result = agent.invoke(
-        {
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": (
-                                "Extract NDC letter details from this sponsor letter PDF "
-                                "and return the structured response."
-                            ),
-                        },
-                        *image_parts,
-                    ],
-                }
-            ]
-        },
-        config={
-            "callbacks": [langfuse_handler],
-            "metadata": {
-                "document_path": str(document_path),
-                "agent_type": "ndc_letter",
-            },
-            "tags": ["vlm", "pdf-validation"],
-        },
-    )
-
-    return result["structured_response"]
+DOCUMENT_TYPE = DocumentType(
+    agent_type="ndc_letter",
+    slug="ndc-letter",
+    title="NDC letter",
+    response_format=NdcLetterDetails,
+    system_prompt=NDC_LETTER_SYSTEM_PROMPT,
+    instruction=(
+        "Extract NDC letter details from this sponsor letter PDF "
+        "and return the structured response."
+    ),
+    filename_patterns=("NDC*", "Net Debit Cap*"),
+    classifier_keywords=(
+        r"Net Debit Cap",
+        r"\bNDC\b",
+        r"net cap settlement",
+    ),
+    render_options=RENDER_OPTIONS,
+    page_selection=PAGE_SELECTION,
+)
 
 
 if __name__ == "__main__":
@@ -126,5 +106,5 @@ if __name__ == "__main__":
     )
     pdf_path = sys.argv[1] if len(sys.argv) >= 2 else default_pdf_path
 
-    response = validate_document(agent, pdf_path)
+    response = DOCUMENT_TYPE.validate(pdf_path)
     print(response.model_dump_json(indent=2))
@@ -0,0 +1,39 @@
+from agents import (
+    ai_clearance_from_entity,
+    bbpou_participation,
+    canvas_access_form_with_employee_ids,
+    certificate_of_authorization,
+    commencement_letter_to_rbi,
+    escrow_account_details,
+    gst_certificate,
+    ifsc_and_settlement_account_confirmation,
+    letter_from_sponser_bank,
+    ndc_letter,
+)
+from utils.document_type import DocumentType
+
+# Registration order is also the priority order for filename routing.
+DOCUMENT_TYPES: dict[str, DocumentType] = {
+    module.DOCUMENT_TYPE.slug: module.DOCUMENT_TYPE
+    for module in (
+        bbpou_participation,
+        gst_certificate,
+        letter_from_sponser_bank,
+        ndc_letter,
+        commencement_letter_to_rbi,
+        ifsc_and_settlement_account_confirmation,
+        escrow_account_details,
+        ai_clearance_from_entity,
+        certificate_of_authorization,
+        canvas_access_form_with_employee_ids,
+    )
+}
+
+
+def get_document_type(slug: str) -> DocumentType | None:
+    return DOCUMENT_TYPES.get(slug)
+
+
+def route_filename(name: str) -> DocumentType | None:
+    """First registered document type whose filename patterns match ``name``."""
+    return next((document_type for document_type in DOCUMENT_TYPES.values() if document_type.matches_filename(name)), None)
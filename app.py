@@ -1,210 +1,298 @@
+import asyncio
+import fnmatch
+import json
+import math
+import os
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
 from pathlib import Path
-
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-
-from agents.bbpou_participation import BBPouParticipation, agent, validate_document
-from agents.gst_certificate import GstCertificateDetails, agent as gst_agent, validate_document as validate_gst_document
-from agents.letter_from_sponser_bank import (
-    LetterFromSponsorBankDetails,
-    agent as sponsor_bank_agent,
-    validate_document as validate_sponsor_bank_document,
-)
-from agents.ndc_letter import (
-    NdcLetterDetails,
-    agent as ndc_letter_agent,
-    validate_document as validate_ndc_letter_document,
-)
-from agents.commencement_letter_to_rbi import (
-    CommencementLetterToRbiDetails,
-    agent as commencement_letter_agent,
-    validate_document as validate_commencement_letter_document,
-)
-from agents.ifsc_and_settlement_account_confirmation import (
-    IfscAndSettlementAccountConfirmationDetails,
-    agent as ifsc_settlement_agent,
-    validate_document as validate_ifsc_settlement_document,
-)
-from agents.escrow_account_details import (
-    EscrowAccountDetails,
-    agent as escrow_account_agent,
-    validate_document as validate_escrow_account_document,
-)
-from agents.ai_clearance_from_entity import (
-    AiClearanceFromEntityDetails,
-    agent as ai_clearance_agent,
-    validate_document as validate_ai_clearance_document,
+from typing import Any, Optional
+
+from fastapi import FastAPI, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, HttpUrl
+
+from agents.dossier_checks import DOSSIER_CHECKS
+from agents.registry import DOCUMENT_TYPES, get_document_type, route_filename
+from utils.classifier import CLASSIFIER_MIN_CONFIDENCE, CLASSIFIER_VLM_FALLBACK, aclassify_document
+from utils.concurrency import ModelCallRejected, model_call_limiter, run_in_render_pool
+from utils.document_source import (
+    MAX_UPLOAD_BYTES,
+    DocumentSource,
+    UploadedPdf,
+    UploadRejected,
+    adopt_spool,
+    read_upload,
 )
+from utils.document_type import DocumentType
+from utils.jobs import Job, JobWorkers, WebhookRejected, check_webhook_url, job_queue, store_upload
+from utils.metrics import observe_http_request, render_metrics
+from utils.model_router import model_router
+from utils.multi_extraction import avalidate_many
+from utils.page_cache import page_cache
+from utils.reconciliation import reconcile
+from utils.resilience import resilience_stats
+from utils.result_cache import result_cache
+from utils.result_store import RESULT_STORE_MAX_LIMIT, result_store
+from utils.single_flight import single_flight
+from utils.stages import stage
+from utils.tracing import shutdown_tracing, trace_sampling, tracing_stats
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    job_workers.start()
+    try:
+        yield
+    finally:
+        await job_workers.stop()
+        await asyncio.to_thread(shutdown_tracing)
 
 
 app = FastAPI(
     title="Agents VLM API",
     description="API endpoints for document validation agents.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+UPLOAD_PATH_SUFFIXES = ("/upload", "/raw")
+# Room for multipart boundaries and form fields on top of the file itself.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next: Callable[[Request], Awaitable[Any]]) -> Any:
+    """Refuse uploads whose declared size is over the limit before any of the body is read."""
+    declared = request.headers.get("content-length")
+    if request.url.path.endswith(UPLOAD_PATH_SUFFIXES) and declared and declared.isdigit():
+        if int(declared) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Upload exceeds the {MAX_UPLOAD_BYTES} byte limit."},
+            )
+    return await call_next(request)
+
 
-class ValidateBBPouRequest(BaseModel):
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next: Callable[[Request], Awaitable[Any]]) -> Any:
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # The route template, not the raw path, keeps label cardinality bounded.
+        route = request.scope.get("route")
+        observe_http_request(
+            request.method,
+            getattr(route, "path", "unmatched"),
+            status,
+            time.perf_counter() - started,
+        )
+
+
+class ValidateDocumentRequest(BaseModel):
     document_path: str = Field(
-        description="Absolute or relative path to the BBPOU participation PDF document."
+        description="Absolute or relative path to the PDF document."
     )
 
 
-class ValidateGstCertificateRequest(BaseModel):
+class ValidateAnyDocumentRequest(BaseModel):
     document_path: str = Field(
-        description="Absolute or relative path to the GST certificate PDF document."
+        description="Absolute or relative path to the PDF document."
+    )
+    agent_type: Optional[str] = Field(
+        default=None,
+        description="Skip classification and use this agent type.",
+    )
+    vlm_fallback: bool = Field(
+        default=CLASSIFIER_VLM_FALLBACK,
+        description="Ask the VLM on a downscaled first page when local classification is unsure.",
     )
 
 
-class ValidateLetterFromSponsorBankRequest(BaseModel):
+class ValidateMultiRequest(BaseModel):
     document_path: str = Field(
-        description="Absolute or relative path to the letter from sponsor bank PDF document."
+        description="Absolute or relative path to the PDF document."
+    )
+    agent_types: list[str] = Field(
+        min_length=1,
+        description="Agent types to read from this one document in a single model call, e.g. [\"letter-from-sponsor-bank\", \"ndc-letter\"].",
     )
 
 
-class ValidateNdcLetterRequest(BaseModel):
+class CreateJobRequest(BaseModel):
     document_path: str = Field(
-        description="Absolute or relative path to the NDC letter / sponsor letter PDF document."
+        description="Absolute or relative path to the PDF document."
+    )
+    agent_type: Optional[str] = Field(
+        default=None,
+        description="Agent type to validate with; classified automatically when omitted.",
+    )
+    vlm_fallback: bool = Field(
+        default=CLASSIFIER_VLM_FALLBACK,
+        description="Ask the VLM on a downscaled first page when local classification is unsure.",
+    )
+    webhook_url: Optional[HttpUrl] = Field(
+        default=None,
+        description="Receives a POST with the finished job (same body as GET /jobs/{id}). Must be a public host, or one in JOB_WEBHOOK_ALLOWED_HOSTS.",
     )
 
 
-class ValidateCommencementLetterToRbiRequest(BaseModel):
+class BatchItem(BaseModel):
     document_path: str = Field(
-        description="Absolute or relative path to the commencement letter to RBI PDF document."
+        description="Absolute or relative path to the PDF document."
+    )
+    agent_type: str = Field(
+        description="Agent to validate the document with, e.g. \"gst-certificate\"."
     )
 
 
-class ValidateIfscAndSettlementAccountConfirmationRequest(BaseModel):
-    document_path: str = Field(
-        description="Absolute or relative path to the IFSC and settlement account confirmation PDF document."
+class ValidateBatchRequest(BaseModel):
+    items: list[BatchItem] = Field(
+        default_factory=list,
+        description="Explicit (document_path, agent_type) pairs to validate.",
+    )
+    directory: Optional[str] = Field(
+        default=None,
+        description="Directory holding an onboarding dossier; its PDFs are routed with `routing`.",
+    )
+    routing: dict[str, str] = Field(
+        default_factory=dict,
+        description=(
+            "Filename glob pattern (e.g. \"GST Certificate*\") to agent type. First match wins. "
+            "When empty, each agent's registered filename patterns are used."
+        ),
+    )
+    max_concurrency: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Per-batch concurrency budget; capped at BATCH_MAX_CONCURRENCY.",
+    )
+    reconcile: bool = Field(
+        default=False,
+        description="After the last document, stream one more line with the dossier's cross-document consistency report.",
     )
 
 
-class ValidateEscrowAccountDetailsRequest(BaseModel):
-    document_path: str = Field(
-        description="Absolute or relative path to the escrow account details PDF document."
+class DossierDocument(BaseModel):
+    agent_type: str = Field(
+        description="Agent the result came from, e.g. \"gst-certificate\"."
+    )
+    result: dict[str, Any] = Field(
+        description="The structured response returned by that agent's validate endpoint."
     )
 
 
-class ValidateAiClearanceFromEntityRequest(BaseModel):
-    document_path: str = Field(
-        description="Absolute or relative path to the AI clearance from entity PDF document."
+class ReconcileDossierRequest(BaseModel):
+    documents: list[DossierDocument] = Field(
+        min_length=1,
+        description="Extracted results of one entity's documents; an agent type may appear more than once.",
+    )
+
+
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+
+def model_call_rejected_error(exc: ModelCallRejected) -> HTTPException:
+    return HTTPException(
+        status_code=exc.status_code,
+        detail=str(exc),
+        headers={"Retry-After": str(math.ceil(exc.retry_after_seconds))},
     )
 
 
 @app.get("/health")
-def health() -> dict[str, str]:
+async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
-@app.post("/agents/bbpou-participation/validate", response_model=BBPouParticipation)
-def validate_bbpou_participation(payload: ValidateBBPouRequest) -> BBPouParticipation:
-    path = Path(payload.document_path)
-    if not path.exists():
-        raise HTTPException(
-            status_code=400,
-            detail=f"Document not found at path: {payload.document_path}",
-        )
-    if path.suffix.lower() != ".pdf":
-        raise HTTPException(
-            status_code=400,
-            detail="Only PDF files are supported for this endpoint.",
-        )
+@app.get("/cache/stats")
+async def cache_stats() -> dict[str, Any]:
+    return {
+        "results": await run_in_render_pool(result_cache.stats),
+        "pages": page_cache.stats(),
+        "history": await run_in_render_pool(result_store.stats),
+    }
 
-    try:
-        return validate_document(agent, path)
-    except Exception as exc:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Validation failed: {exc}",
-        ) from exc
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus exposition: per-stage timings, validation latency, pages, payload, image bytes and tokens."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
-@app.post("/agents/gst-certificate/validate", response_model=GstCertificateDetails)
-def validate_gst_certificate(payload: ValidateGstCertificateRequest) -> GstCertificateDetails:
-    path = Path(payload.document_path)
-    if not path.exists():
-        raise HTTPException(
-            status_code=400,
-            detail=f"Document not found at path: {payload.document_path}",
-        )
-    if path.suffix.lower() != ".pdf":
-        raise HTTPException(
-            status_code=400,
-            detail="Only PDF files are supported for this endpoint.",
-        )
 
-    try:
-        return validate_gst_document(gst_agent, path)
-    except Exception as exc:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Validation failed: {exc}",
-        ) from exc
+@app.get("/executor/stats")
+async def executor_stats() -> dict[str, Any]:
+    return {
+        **model_call_limiter.stats(),
+        "single_flight": single_flight.stats(),
+        "jobs": await job_workers.stats(),
+        "providers": {**model_router.stats(), "resilience": resilience_stats()},
+        "tracing": tracing_stats(),
+    }
 
 
-@app.post("/agents/letter-from-sponsor-bank/validate", response_model=LetterFromSponsorBankDetails)
-def validate_letter_from_sponsor_bank(payload: ValidateLetterFromSponsorBankRequest) -> LetterFromSponsorBankDetails:
-    path = Path(payload.document_path)
+def document_path_error(path: Path) -> str | None:
     if not path.exists():
-        raise HTTPException(
-            status_code=400,
-            detail=f"Document not found at path: {payload.document_path}",
-        )
+        return f"Document not found at path: {path}"
     if path.suffix.lower() != ".pdf":
-        raise HTTPException(
-            status_code=400,
-            detail="Only PDF files are supported for this endpoint.",
-        )
+        return "Only PDF files are supported for this endpoint."
+    return None
 
-    try:
-        return validate_sponsor_bank_document(sponsor_bank_agent, path)
-    except Exception as exc:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Validation failed: {exc}",
-        ) from exc
 
+@app.get("/agents")
+async def list_agents() -> list[dict[str, Any]]:
+    return [
+        {
+            "agent_type": document_type.slug,
+            "title": document_type.title,
+            "filename_patterns": list(document_type.filename_patterns),
+        }
+        for document_type in DOCUMENT_TYPES.values()
+    ]
 
-@app.post("/agents/ndc-letter/validate", response_model=NdcLetterDetails)
-def validate_ndc_letter(payload: ValidateNdcLetterRequest) -> NdcLetterDetails:
-    path = Path(payload.document_path)
-    if not path.exists():
-        raise HTTPException(
-            status_code=400,
-            detail=f"Document not found at path: {payload.document_path}",
-        )
-    if path.suffix.lower() != ".pdf":
-        raise HTTPException(
-            status_code=400,
-            detail="Only PDF files are supported for this endpoint.",
-        )
 
-    try:
-        return validate_ndc_letter_document(ndc_letter_agent, path)
-    except Exception as exc:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Validation failed: {exc}",
-        ) from exc
+def path_source(document_path: str) -> Path:
+    path = Path(document_path)
+    with stage("validate_input"):
+        error = document_path_error(path)
+    if error is not None:
+        raise HTTPException(status_code=400, detail=error)
+    return path
 
 
-@app.post("/agents/commencement-letter-to-rbi/validate", response_model=CommencementLetterToRbiDetails)
-def validate_commencement_letter_to_rbi(payload: ValidateCommencementLetterToRbiRequest) -> CommencementLetterToRbiDetails:
-    path = Path(payload.document_path)
-    if not path.exists():
-        raise HTTPException(
-            status_code=400,
-            detail=f"Document not found at path: {payload.document_path}",
-        )
-    if path.suffix.lower() != ".pdf":
-        raise HTTPException(
-            status_code=400,
-            detail="Only PDF files are supported for this endpoint.",
-        )
+async def uploaded_pdf(file: UploadFile) -> UploadedPdf:
+    """Adopt a multipart upload's spooled file, hashing it without another copy."""
+    try:
+        with stage("validate_input"):
+            return await run_in_render_pool(adopt_spool, file.file, file.filename or "upload.pdf")
+    except UploadRejected as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc)) from exc
+
+
+async def streamed_pdf(request: Request, filename: str) -> UploadedPdf:
+    """Stream a raw application/pdf body into memory or a spooled temp file, hashing as it arrives."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type != "application/pdf":
+        raise HTTPException(status_code=415, detail="Send the document as an application/pdf request body.")
+    declared = request.headers.get("content-length")
+    try:
+        with stage("validate_input"):
+            return await read_upload(request.stream(), filename, int(declared) if declared and declared.isdigit() else None)
+    except UploadRejected as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc)) from exc
+
 
+async def validate_with(document_type: DocumentType, source: DocumentSource) -> BaseModel:
     try:
-        return validate_commencement_letter_document(commencement_letter_agent, path)
+        return await document_type.avalidate(source)
+    except ModelCallRejected as exc:
+        raise model_call_rejected_error(exc) from exc
     except Exception as exc:
         raise HTTPException(
             status_code=500,
@@ -212,70 +300,335 @@ def validate_commencement_letter_to_rbi(payload: ValidateCommencementLetterToRbi
         ) from exc
 
 
-@app.post("/agents/ifsc-and-settlement-account-confirmation/validate", response_model=IfscAndSettlementAccountConfirmationDetails)
-def validate_ifsc_and_settlement_account_confirmation(payload: ValidateIfscAndSettlementAccountConfirmationRequest) -> IfscAndSettlementAccountConfirmationDetails:
-    path = Path(payload.document_path)
-    if not path.exists():
-        raise HTTPException(
-            status_code=400,
-            detail=f"Document not found at path: {payload.document_path}",
+def validation_endpoints(document_type: DocumentType) -> dict[str, Callable[..., Awaitable[BaseModel]]]:
+    """Handlers for a server-side path, a multipart upload and a raw application/pdf body."""
+
+    async def by_path(payload: ValidateDocumentRequest) -> BaseModel:
+        return await validate_with(document_type, path_source(payload.document_path))
+
+    async def by_upload(file: UploadFile = File(description="The PDF document.")) -> BaseModel:
+        return await validate_with(document_type, await uploaded_pdf(file))
+
+    async def by_raw_body(request: Request, filename: str = "upload.pdf") -> BaseModel:
+        return await validate_with(document_type, await streamed_pdf(request, filename))
+
+    name = document_type.slug.replace("-", "_")
+    endpoints = {"validate": by_path, "validate/upload": by_upload, "validate/raw": by_raw_body}
+    for suffix, endpoint in endpoints.items():
+        endpoint.__name__ = f"{suffix.replace('/', '_')}_{name}"
+    return endpoints
+
+
+# Concrete routes per registered type keep each response schema in the OpenAPI docs.
+for _document_type in DOCUMENT_TYPES.values():
+    for _suffix, _endpoint in validation_endpoints(_document_type).items():
+        app.add_api_route(
+            f"/agents/{_document_type.slug}/{_suffix}",
+            _endpoint,
+            methods=["POST"],
+            response_model=_document_type.response_format,
+            summary=f"Validate a {_document_type.title}",
         )
-    if path.suffix.lower() != ".pdf":
+
+
+def resolve_batch_items(payload: ValidateBatchRequest) -> tuple[list[BatchItem], list[dict[str, Any]]]:
+    """Expand a batch request into items to run plus directory files no route matched."""
+    items = list(payload.items)
+    skipped: list[dict[str, Any]] = []
+    if payload.directory is not None:
+        directory = Path(payload.directory)
+        if not directory.is_dir():
+            raise HTTPException(
+                status_code=400,
+                detail=f"Directory not found: {payload.directory}",
+            )
+        for path in sorted(directory.iterdir()):
+            if path.suffix.lower() != ".pdf":
+                continue
+            if payload.routing:
+                agent_type = next(
+                    (target for pattern, target in payload.routing.items() if fnmatch.fnmatch(path.name, pattern)),
+                    None,
+                )
+            else:
+                routed = route_filename(path.name)
+                agent_type = routed.slug if routed is not None else None
+            if agent_type is None:
+                skipped.append({"document_path": str(path), "status": "skipped", "error": "No routing rule matched."})
+            else:
+                items.append(BatchItem(document_path=str(path), agent_type=agent_type))
+    if not items and not skipped:
         raise HTTPException(
             status_code=400,
-            detail="Only PDF files are supported for this endpoint.",
+            detail="Provide at least one item or a directory of PDFs.",
         )
-
+    return items, skipped
+
+
+async def run_batch_item(index: int, item: BatchItem, budget: asyncio.Semaphore) -> dict[str, Any]:
+    outcome: dict[str, Any] = {
+        "index": index,
+        "document_path": item.document_path,
+        "agent_type": item.agent_type,
+    }
+    document_type = get_document_type(item.agent_type)
+    path = Path(item.document_path)
+    error = f"Unknown agent type: {item.agent_type}" if document_type is None else document_path_error(path)
+    if error is not None:
+        return {**outcome, "status": "error", "status_code": 400, "error": error}
+
+    started = time.perf_counter()
+    async with budget:
+        try:
+            response = await document_type.avalidate(path)
+        except ModelCallRejected as exc:
+            outcome.update(status="error", status_code=exc.status_code, error=str(exc))
+        except Exception as exc:
+            outcome.update(status="error", status_code=500, error=f"Validation failed: {exc}")
+        else:
+            outcome.update(status="ok", result=response.model_dump(mode="json"))
+    outcome["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return outcome
+
+
+async def stream_batch(
+    items: list[BatchItem],
+    skipped: list[dict[str, Any]],
+    max_concurrency: int,
+    reconcile_results: bool = False,
+) -> AsyncIterator[bytes]:
+    for entry in skipped:
+        yield (json.dumps(entry) + "\n").encode("utf-8")
+
+    budget = asyncio.Semaphore(max_concurrency)
+    tasks = [asyncio.create_task(run_batch_item(index, item, budget)) for index, item in enumerate(items)]
+    extracted: list[tuple[str, dict[str, Any]]] = []
     try:
-        return validate_ifsc_settlement_document(ifsc_settlement_agent, path)
-    except Exception as exc:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Validation failed: {exc}",
-        ) from exc
+        for finished in asyncio.as_completed(tasks):
+            outcome = await finished
+            if outcome["status"] == "ok":
+                extracted.append((outcome["agent_type"], outcome["result"]))
+            yield (json.dumps(outcome) + "\n").encode("utf-8")
+        if reconcile_results:
+            report = reconcile(extracted, DOSSIER_CHECKS)
+            yield (json.dumps({"status": "report", "consistency": report}) + "\n").encode("utf-8")
+    finally:
+        # The client may disconnect mid-stream; don't leave orphaned model calls running.
+        for task in tasks:
+            task.cancel()
+
+
+@app.post("/agents/batch/validate")
+async def validate_batch(payload: ValidateBatchRequest) -> StreamingResponse:
+    """Validate many documents concurrently, streaming one NDJSON line per document as it finishes.
+
+    With ``reconcile``, a last line with status "report" holds the consistency report over the successful results.
+    """
+    items, skipped = resolve_batch_items(payload)
+    max_concurrency = min(payload.max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+    return StreamingResponse(
+        stream_batch(items, skipped, max_concurrency, payload.reconcile),
+        media_type="application/x-ndjson",
+    )
+
 
+@app.post("/dossiers/reconcile")
+async def reconcile_dossier(payload: ReconcileDossierRequest) -> dict[str, Any]:
+    """Cross-check entity names, bank identifiers, signatories and date order across a dossier's results, without a model call."""
+    unknown = sorted({document.agent_type for document in payload.documents if get_document_type(document.agent_type) is None})
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown agent types: {', '.join(unknown)}")
+    return reconcile(((document.agent_type, document.result) for document in payload.documents), DOSSIER_CHECKS)
 
-@app.post("/agents/escrow-account-details/validate", response_model=EscrowAccountDetails)
-def validate_escrow_account_details(payload: ValidateEscrowAccountDetailsRequest) -> EscrowAccountDetails:
+
+async def classify_source(source: DocumentSource, vlm_fallback: bool) -> dict[str, Any]:
+    try:
+        classification = await aclassify_document(source, DOCUMENT_TYPES.values(), vlm_fallback=vlm_fallback)
+    except ModelCallRejected as exc:
+        raise model_call_rejected_error(exc) from exc
+    return classification.to_dict()
+
+
+async def classify_and_validate(source: DocumentSource, agent_type: str | None, vlm_fallback: bool) -> dict[str, Any]:
+    """Classification and validation of one document share a single tracing decision."""
+    with trace_sampling():
+        if agent_type is not None:
+            document_type = get_document_type(agent_type)
+            if document_type is None:
+                raise HTTPException(status_code=400, detail=f"Unknown agent type: {agent_type}")
+            classification = {"agent_type": document_type.slug, "confidence": 1.0, "method": "requested"}
+        else:
+            classification = await classify_source(source, vlm_fallback)
+            if classification["agent_type"] is None or classification["confidence"] < CLASSIFIER_MIN_CONFIDENCE:
+                raise HTTPException(
+                    status_code=422,
+                    detail={"error": "Could not confidently determine the document type.", "classification": classification},
+                )
+            document_type = DOCUMENT_TYPES[classification["agent_type"]]
+
+        response = await validate_with(document_type, source)
+        return {
+            "agent_type": document_type.slug,
+            "classification": classification,
+            "result": response.model_dump(mode="json"),
+        }
+
+
+@app.post("/documents/classify")
+async def classify_document(payload: ValidateAnyDocumentRequest) -> dict[str, Any]:
+    """Predict which agent applies to a document, with a confidence score."""
+    return await classify_source(path_source(payload.document_path), payload.vlm_fallback)
+
+
+@app.post("/documents/validate")
+async def validate_any_document(payload: ValidateAnyDocumentRequest) -> dict[str, Any]:
+    """Classify a document, then validate it with the predicted agent."""
+    return await classify_and_validate(path_source(payload.document_path), payload.agent_type, payload.vlm_fallback)
+
+
+@app.post("/documents/validate/upload")
+async def validate_uploaded_document(
+    file: UploadFile = File(description="The PDF document."),
+    agent_type: Optional[str] = Form(default=None, description="Skip classification and use this agent type."),
+    vlm_fallback: bool = Form(default=CLASSIFIER_VLM_FALLBACK),
+) -> dict[str, Any]:
+    """Classify an uploaded document (its filename is used as a hint), then validate it."""
+    return await classify_and_validate(await uploaded_pdf(file), agent_type, vlm_fallback)
+
+
+@app.post("/documents/validate/multi")
+async def validate_document_multi(payload: ValidateMultiRequest) -> dict[str, Any]:
+    """Validate one document against several agents, sending its page images once."""
+    unknown = [agent_type for agent_type in payload.agent_types if get_document_type(agent_type) is None]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown agent types: {', '.join(unknown)}")
     path = Path(payload.document_path)
-    if not path.exists():
-        raise HTTPException(
-            status_code=400,
-            detail=f"Document not found at path: {payload.document_path}",
-        )
-    if path.suffix.lower() != ".pdf":
-        raise HTTPException(
-            status_code=400,
-            detail="Only PDF files are supported for this endpoint.",
-        )
+    error = document_path_error(path)
+    if error is not None:
+        raise HTTPException(status_code=400, detail=error)
 
+    document_types = [DOCUMENT_TYPES[agent_type] for agent_type in dict.fromkeys(payload.agent_types)]
     try:
-        return validate_escrow_account_document(escrow_account_agent, path)
+        results = await avalidate_many(path, document_types)
+    except ModelCallRejected as exc:
+        raise model_call_rejected_error(exc) from exc
     except Exception as exc:
         raise HTTPException(
             status_code=500,
             detail=f"Validation failed: {exc}",
         ) from exc
+    return {agent_type: response.model_dump(mode="json") for agent_type, response in results.items()}
 
 
-@app.post("/agents/ai-clearance-from-entity/validate", response_model=AiClearanceFromEntityDetails)
-def validate_ai_clearance_from_entity(payload: ValidateAiClearanceFromEntityRequest) -> AiClearanceFromEntityDetails:
-    path = Path(payload.document_path)
-    if not path.exists():
-        raise HTTPException(
-            status_code=400,
-            detail=f"Document not found at path: {payload.document_path}",
-        )
-    if path.suffix.lower() != ".pdf":
-        raise HTTPException(
-            status_code=400,
-            detail="Only PDF files are supported for this endpoint.",
-        )
+async def run_job(request: dict[str, Any]) -> dict[str, Any]:
+    """Job handler: the same classify-then-validate flow as POST /documents/validate."""
+    return await classify_and_validate(
+        path_source(request["document_path"]),
+        request.get("agent_type"),
+        request.get("vlm_fallback", CLASSIFIER_VLM_FALLBACK),
+    )
+
+
+job_workers = JobWorkers(job_queue, run_job)
 
+
+async def accepted_webhook_url(webhook_url: HttpUrl | None) -> str | None:
+    """The webhook URL as a string, or a 400 when it points at a host results may not be sent to."""
+    if webhook_url is None:
+        return None
     try:
-        return validate_ai_clearance_document(ai_clearance_agent, path)
-    except Exception as exc:
+        await run_in_render_pool(check_webhook_url, str(webhook_url))
+    except WebhookRejected as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return str(webhook_url)
+
+
+async def enqueue_job(document_path: str, agent_type: str | None, vlm_fallback: bool, webhook_url: str | None) -> JSONResponse:
+    if agent_type is not None and get_document_type(agent_type) is None:
+        raise HTTPException(status_code=400, detail=f"Unknown agent type: {agent_type}")
+    job = Job.create(
+        {"document_path": document_path, "agent_type": agent_type, "vlm_fallback": vlm_fallback},
+        webhook_url=webhook_url,
+    )
+    await job_queue.put(job)
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job.id, "status": job.status},
+        headers={"Location": f"/jobs/{job.id}"},
+    )
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(payload: CreateJobRequest) -> JSONResponse:
+    """Queue a validation and return its id at once; poll GET /jobs/{id} or wait for the webhook."""
+    path_source(payload.document_path)
+    webhook_url = await accepted_webhook_url(payload.webhook_url)
+    return await enqueue_job(payload.document_path, payload.agent_type, payload.vlm_fallback, webhook_url)
+
+
+@app.post("/jobs/upload", status_code=202)
+async def create_upload_job(
+    file: UploadFile = File(description="The PDF document."),
+    agent_type: Optional[str] = Form(default=None, description="Skip classification and use this agent type."),
+    vlm_fallback: bool = Form(default=CLASSIFIER_VLM_FALLBACK),
+    webhook_url: Optional[HttpUrl] = Form(default=None),
+) -> JSONResponse:
+    """Queue a validation of an uploaded PDF; the upload is stored so the job outlives the request."""
+    accepted_url = await accepted_webhook_url(webhook_url)
+    upload = await uploaded_pdf(file)
+    path = await run_in_render_pool(store_upload, upload.name, upload.data, upload.sha256)
+    return await enqueue_job(str(path), agent_type, vlm_fallback, accepted_url)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> dict[str, Any]:
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job.to_dict()
+
+
+@app.get("/results")
+async def list_results(
+    entity_name: Optional[str] = Query(default=None, description="Entity name or its prefix; case, punctuation and Pvt/Private, Ltd/Limited are ignored."),
+    gstin: Optional[str] = Query(default=None),
+    ifsc: Optional[str] = Query(default=None),
+    document_hash: Optional[str] = Query(default=None, description="SHA-256 of the PDF's bytes."),
+    agent_type: Optional[str] = Query(default=None, description='Internal agent type, e.g. "gst_certificate".'),
+    since: Optional[float] = Query(default=None, description="Only results stored at or after this Unix time."),
+    limit: int = Query(default=100, ge=1, le=RESULT_STORE_MAX_LIMIT),
+    offset: int = Query(default=0, ge=0),
+) -> list[dict[str, Any]]:
+    """Stored validation results, newest first, without calling the model."""
+    return await run_in_render_pool(
+        result_store.query,
+        entity_name=entity_name,
+        gstin=gstin,
+        ifsc=ifsc,
+        document_hash=document_hash,
+        agent_type=agent_type,
+        since=since,
+        limit=limit,
+        offset=offset,
+    )
+
+
+@app.get("/results/{result_id}")
+async def get_result(result_id: int) -> dict[str, Any]:
+    entry = await run_in_render_pool(result_store.get, result_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Unknown result: {result_id}")
+    return entry
+
+
+@app.post("/agents/{agent_type}/validate")
+async def validate_document(agent_type: str, payload: ValidateDocumentRequest) -> dict[str, Any]:
+    """Validate with any registered agent. Declared last so the typed per-agent routes and batch match first."""
+    document_type = get_document_type(agent_type)
+    if document_type is None:
         raise HTTPException(
-            status_code=500,
-            detail=f"Validation failed: {exc}",
-        ) from exc
+            status_code=404,
+            detail=f"Unknown agent type: {agent_type}. Known types: {', '.join(DOCUMENT_TYPES)}",
+        )
+    response = await validate_with(document_type, path_source(payload.document_path))
+    return response.model_dump(mode="json")
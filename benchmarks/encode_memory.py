@@ -0,0 +1,79 @@
+"""Peak RSS per document for the legacy PIL encode path and the native MuPDF path.
+
+Run from the repository root:
+
+    python -m benchmarks.encode_memory [--dpi 300]
+
+Each (document, encoder) pair is rendered in a fresh child process so that
+``ru_maxrss`` is the peak of that document alone.
+"""
+
+import argparse
+import base64
+import resource
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from utils.page_cache import PageCache
+from utils.pdf_to_image import RenderOptions, render_pdf
+
+PDF_DIRECTORY = Path(__file__).resolve().parent.parent / "documents" / "pdfs"
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def encode_legacy(pdf_path: Path, dpi: int) -> int:
+    """The original pipeline: samples copy, convert("RGB"), BytesIO, getvalue, base64, decode."""
+    payload = 0
+    with fitz.open(pdf_path) as document:
+        parts = []
+        for page in document:
+            pixmap = page.get_pixmap(dpi=dpi)
+            image = Image.frombytes("RGB", [pixmap.width, pixmap.height], pixmap.samples)
+            buffer = BytesIO()
+            image.convert("RGB").save(buffer, format="JPEG", quality=75)
+            parts.append(base64.b64encode(buffer.getvalue()).decode("utf-8"))
+        payload = sum(len(part) for part in parts)
+    return payload
+
+
+def encode_native(pdf_path: Path, dpi: int) -> int:
+    rendered = render_pdf(pdf_path, RenderOptions(dpi=dpi), cache=PageCache(None), parallel=False)
+    return sum(len(part["data"]) for part in rendered.image_parts)
+
+
+def measure(encoder: str, pdf_path: Path, dpi: int) -> tuple[int, int]:
+    baseline = peak_rss_bytes()
+    payload = (encode_legacy if encoder == "legacy" else encode_native)(pdf_path, dpi)
+    return peak_rss_bytes() - baseline, payload
+
+
+def in_fresh_process(encoder: str, pdf_path: Path, dpi: int) -> tuple[int, int]:
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(measure, encoder, pdf_path, dpi).result()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dpi", type=int, default=300)
+    args = parser.parse_args()
+
+    mib = 1024 * 1024
+    print(f"{'legacy MiB':>10}  {'native MiB':>10}  {'payload MiB':>11}  document")
+    for pdf_path in sorted(PDF_DIRECTORY.glob("*.pdf")):
+        legacy_peak, _ = in_fresh_process("legacy", pdf_path, args.dpi)
+        native_peak, payload = in_fresh_process("native", pdf_path, args.dpi)
+        print(f"{legacy_peak / mib:>10.1f}  {native_peak / mib:>10.1f}  {payload / mib:>11.2f}  {pdf_path.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Deterministic stand-in for a vision chat model, for benchmarks.
+
+Select it as the model provider with ``MODEL_PROVIDERS=benchmarks.fake_vlm`` and
+build agents with ``install()``, which replaces the registry's LangChain
+``create_agent``.
+Every call sleeps for ``FAKE_VLM_LATENCY_SECONDS`` plus up to
+``FAKE_VLM_JITTER_SECONDS`` either way, then returns a schema-valid structured
+response. Latency is seeded by the request content and ``FAKE_VLM_SEED``, so the
+same document gets the same latency on every run and every commit.
+"""
+
+import asyncio
+import datetime
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import types
+import typing
+from typing import Any
+
+from pydantic import BaseModel
+
+from utils.resilience import ResiliencePolicy
+
+LATENCY_SECONDS = float(os.getenv("FAKE_VLM_LATENCY_SECONDS", "1.0"))
+JITTER_SECONDS = float(os.getenv("FAKE_VLM_JITTER_SECONDS", "0.25"))
+SEED = os.getenv("FAKE_VLM_SEED", "0")
+
+# No quota to respect; the deadline only guards against a stuck benchmark.
+RESILIENCE = ResiliencePolicy(timeout_seconds=120.0, max_attempts=1)
+
+
+def example_value(annotation: Any, name: str) -> Any:
+    """A JSON value that validates against ``annotation``: the first Literal, the first Union member, and so on."""
+    origin = typing.get_origin(annotation)
+    arguments = typing.get_args(annotation)
+    if origin is typing.Annotated:
+        return example_value(arguments[0], name)
+    if origin is typing.Literal:
+        return arguments[0]
+    if origin in (typing.Union, types.UnionType):
+        return example_value(next(argument for argument in arguments if argument is not type(None)), name)
+    if origin in (list, tuple, set, frozenset):
+        return [example_value(arguments[0], name)] if arguments else []
+    if origin is dict:
+        return {}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return example_response(annotation)
+    if annotation is datetime.date:
+        return "2024-01-01"
+    if annotation is bool:
+        return True
+    if annotation in (int, float):
+        return 1
+    return f"sample {name.replace('_', ' ')}"
+
+
+def example_response(response_format: type[BaseModel]) -> dict[str, Any]:
+    return {name: example_value(field.annotation, name) for name, field in response_format.model_fields.items()}
+
+
+def request_bytes(messages: dict[str, Any]) -> tuple[int, str]:
+    """Payload size of a request and a digest of its content, used to seed its latency."""
+    digest = hashlib.sha256()
+    size = 0
+    for message in messages["messages"]:
+        for part in message["content"]:
+            data = part.get("text") or part.get("data") or ""
+            size += len(data)
+            # Length plus a prefix identifies a page image without hashing megabytes per call.
+            digest.update(f"{len(data)}:{data[:4096]}".encode("utf-8"))
+    return size, digest.hexdigest()
+
+
+class FakeAgent:
+    """Agent-shaped object answering with ``{"structured_response": ...}`` like a LangChain agent."""
+
+    def __init__(self, model: "FakeVisionModel", response_format: type[BaseModel]) -> None:
+        self.model = model
+        self.response_format = response_format
+        # What a provider would send back as structured output; parsed on every call like the real thing.
+        self.raw_response = json.dumps(example_response(response_format))
+
+    def _latency(self, messages: dict[str, Any]) -> tuple[float, int]:
+        size, digest = request_bytes(messages)
+        self.model.record(size)
+        rng = random.Random(f"{SEED}:{self.response_format.__name__}:{digest}")
+        latency = self.model.latency_seconds + rng.uniform(-self.model.jitter_seconds, self.model.jitter_seconds)
+        return max(0.0, latency), size
+
+    def _answer(self, request_size: int) -> dict[str, Any]:
+        response = self.response_format.model_validate_json(self.raw_response)
+        # Rough token counts (4 characters per token) in LangChain's usage_metadata shape.
+        usage = {"input_tokens": request_size // 4, "output_tokens": len(self.raw_response) // 4}
+        return {"structured_response": response, "messages": [types.SimpleNamespace(usage_metadata=usage)]}
+
+    def invoke(self, messages: dict[str, Any], config: dict[str, Any] | None = None) -> dict[str, Any]:
+        latency, size = self._latency(messages)
+        time.sleep(latency)
+        return self._answer(size)
+
+    async def ainvoke(self, messages: dict[str, Any], config: dict[str, Any] | None = None) -> dict[str, Any]:
+        latency, size = self._latency(messages)
+        await asyncio.sleep(latency)
+        return self._answer(size)
+
+
+class FakeVisionModel:
+    model = "fake-vlm"
+
+    def __init__(self, latency_seconds: float = LATENCY_SECONDS, jitter_seconds: float = JITTER_SECONDS) -> None:
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.payload_bytes = 0
+
+    def record(self, payload_bytes: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.payload_bytes += payload_bytes
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.payload_bytes = 0
+
+
+def create_agent(model: FakeVisionModel, response_format: type[BaseModel], system_prompt: str) -> FakeAgent:
+    return FakeAgent(model, response_format)
+
+
+def install() -> None:
+    """Build every agent (including failover rebinds) as a FakeAgent instead of a LangChain agent."""
+    import utils.agent_registry
+
+    utils.agent_registry.create_agent = create_agent
+
+
+model = FakeVisionModel()
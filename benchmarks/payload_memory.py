@@ -0,0 +1,104 @@
+"""Peak RSS while building model payloads for concurrent large scanned PDFs.
+
+Run from the repository root:
+
+    python -m benchmarks.payload_memory [--concurrency 10] [--pages 40] [--dpi 300]
+        [--budgets 0 20000000 8000000] [--builders list stream]
+
+A synthetic scan (``--pages`` pages of grainy A4 images, which compress about
+as badly as real scans) is written to a temporary directory. For each payload
+budget (0 meaning unlimited) and message builder, a fresh child process renders
+it ``--concurrency`` times at once on threads, as the render pool does, and
+builds the model message for each, so ``ru_maxrss`` is the peak of that
+configuration alone. The page cache is bypassed and rendering stays on the
+calling threads.
+
+The ``list`` builder takes ``RenderedDocument.image_parts``; ``stream`` builds
+the message from ``iter_image_parts``. Both keep the encoded pages alive until
+the message exists, and rendering dominates the peak either way; the payload
+budget is what bounds it.
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from utils.agent_runner import build_messages
+from utils.page_cache import PageCache
+from utils.pdf_to_image import RenderOptions, render_pdf
+
+A4_POINTS = (595, 842)
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def write_scan(path: Path, pages: int) -> None:
+    """A PDF of grainy page-sized images: noise at a quarter of 300 DPI, upscaled like scanner grain."""
+    with fitz.open() as document:
+        for _ in range(pages):
+            grain = Image.frombytes("L", (620, 877), os.urandom(620 * 877)).resize((2480, 3508))
+            buffer = BytesIO()
+            grain.save(buffer, format="JPEG", quality=85)
+            page = document.new_page(width=A4_POINTS[0], height=A4_POINTS[1])
+            page.insert_image(page.rect, stream=buffer.getvalue())
+        document.save(path)
+
+
+def build_payload(pdf_path: Path, options: RenderOptions, builder: str) -> tuple[int, int]:
+    rendered = render_pdf(pdf_path, options, cache=PageCache(None), parallel=False)
+    parts = rendered.image_parts if builder == "list" else rendered.iter_image_parts()
+    messages = build_messages("Extract the fields.", parts)
+    return len(messages["messages"][0]["content"]) - 1, rendered.payload_bytes
+
+
+def measure(pdf_path: Path, dpi: int, budget: int, builder: str, concurrency: int) -> tuple[int, int, int]:
+    baseline = peak_rss_bytes()
+    options = RenderOptions(dpi=dpi, max_payload_bytes=budget or None)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: build_payload(pdf_path, options, builder), range(concurrency)))
+    pages, payload = results[0]
+    return peak_rss_bytes() - baseline, pages, payload
+
+
+def in_fresh_process(pdf_path: Path, dpi: int, budget: int, builder: str, concurrency: int) -> tuple[int, int, int]:
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(measure, pdf_path, dpi, budget, builder, concurrency).result()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--budgets", type=int, nargs="+", default=[0, 20_000_000, 8_000_000])
+    parser.add_argument("--builders", nargs="+", choices=["list", "stream"], default=["list", "stream"])
+    args = parser.parse_args()
+
+    mib = 1024 * 1024
+    with tempfile.TemporaryDirectory() as directory:
+        pdf_path = Path(directory) / "scan.pdf"
+        write_scan(pdf_path, args.pages)
+        print(f"{args.concurrency} concurrent x {args.pages}-page scan at {args.dpi} DPI")
+        print(f"{'budget MiB':>10}  {'builder':>7}  {'peak MiB':>9}  {'pages sent':>10}  {'payload MiB':>11}")
+        for budget in args.budgets:
+            for builder in args.builders:
+                peak, pages, payload = in_fresh_process(pdf_path, args.dpi, budget, builder, args.concurrency)
+                label = f"{budget / mib:.1f}" if budget else "unlimited"
+                print(f"{label:>10}  {builder:>7}  {peak / mib:>9.1f}  {pages:>10}  {payload / mib:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Compare sequential and process-pool page rasterization on the sample PDFs.
+
+Run from the repository root:
+
+    python -m benchmarks.render_pages [--repeat 3] [--dpi 300 | --adaptive]
+
+The page cache is bypassed so every run measures real rendering work.
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from utils.page_cache import PageCache
+from utils.pdf_to_image import ADAPTIVE, RENDER_PROCESSES, RenderOptions, render_pdf, render_process_pool
+
+PDF_DIRECTORY = Path(__file__).resolve().parent.parent / "documents" / "pdfs"
+NO_CACHE = PageCache(None)
+
+
+def time_render(pdf_path: Path, options: RenderOptions, parallel: bool, repeat: int) -> tuple[float, int]:
+    timings = []
+    pages = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rendered = render_pdf(pdf_path, options, cache=NO_CACHE, parallel=parallel)
+        timings.append(time.perf_counter() - started)
+        pages = len(rendered.page_numbers)
+    return statistics.median(timings), pages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--adaptive", action="store_true", help="Use adaptive DPI instead of a fixed DPI")
+    args = parser.parse_args()
+
+    options = ADAPTIVE if args.adaptive else RenderOptions(dpi=args.dpi)
+    # Start the workers up front so pool start-up is not billed to the first PDF.
+    render_process_pool().submit(int).result()
+
+    print(f"{RENDER_PROCESSES} render processes, options={options}")
+    print(f"{'pages':>5}  {'sequential':>10}  {'parallel':>10}  {'speedup':>7}  document")
+    total_sequential = total_parallel = 0.0
+    for pdf_path in sorted(PDF_DIRECTORY.glob("*.pdf")):
+        sequential, pages = time_render(pdf_path, options, parallel=False, repeat=args.repeat)
+        parallel, _ = time_render(pdf_path, options, parallel=True, repeat=args.repeat)
+        total_sequential += sequential
+        total_parallel += parallel
+        print(f"{pages:>5}  {sequential:>9.3f}s  {parallel:>9.3f}s  {sequential / parallel:>6.2f}x  {pdf_path.name}")
+    print(f"{'total':>5}  {total_sequential:>9.3f}s  {total_parallel:>9.3f}s  {total_sequential / total_parallel:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
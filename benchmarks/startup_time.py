@@ -0,0 +1,62 @@
+"""Import-time cost of the API (what each uvicorn worker pays at start-up).
+
+Run from the repository root:
+
+    python -m benchmarks.startup_time [--module app] [--repeat 5] [--top 15]
+
+Each run imports the module in a fresh interpreter with ``-X importtime``;
+the report shows the median wall time and the slowest imports by cumulative
+time, so the before/after of lazy agent construction can be compared.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def import_once(module: str) -> tuple[float, dict[str, int]]:
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if completed.returncode != 0:
+        tail = "\n".join(completed.stderr.strip().splitlines()[-5:])
+        raise SystemExit(f"import {module} failed:\n{tail}")
+
+    cumulative: dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        cumulative[name.strip()] = int(cumulative_us)
+    return elapsed, cumulative
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [import_once(args.module) for _ in range(args.repeat)]
+    wall = statistics.median(elapsed for elapsed, _ in runs)
+    modules = runs[-1][1]
+    print(f"import {args.module}: median {wall * 1000:.0f} ms wall over {args.repeat} runs (includes interpreter start)")
+    print(f"{'cumulative ms':>13}  module")
+    for name, micros in sorted(modules.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+        print(f"{micros / 1000:>13.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+"""End-to-end validation latency and throughput against a fake VLM.
+
+Run from the repository root:
+
+    python -m benchmarks.validation_latency [--concurrency 1 8] [--requests 20]
+        [--latency 0.5] [--jitter 0.1] [--scenarios agent:gst-certificate api:/jobs ...]
+        [--output results.json] [--baseline previous.json]
+
+Every agent in agents/registry.py is driven directly and every route in app.py
+is driven in-process over ASGI, using the sample PDFs in documents/pdfs and the
+deterministic model in benchmarks/fake_vlm.py, so no provider quota is spent.
+For each scenario and concurrency level the report has p50/p95/p99 latency,
+throughput, per-stage time (open, rasterize, encode, base64, model, ...), model calls,
+payload bytes and peak RSS. Results are written as JSON (by default under
+benchmarks/results/, named after the commit) for comparison across commits.
+
+The result cache, page cache and single-flight coalescing are turned off so
+that every request does the full work; pass --warm-cache to keep the caches.
+Job scenarios time enqueue-to-completion; their stage timings are recorded by
+the job workers, not the request, and so read as zero. Results are stored in an
+in-memory result store unless RESULT_STORE_PATH is set, and api:/results times
+looking them up by document hash.
+"""
+
+import argparse
+import asyncio
+import datetime
+import hashlib
+import importlib
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+PDF_DIRECTORY = ROOT / "documents" / "pdfs"
+RESULTS_DIRECTORY = Path(__file__).resolve().parent / "results"
+STAGES = ("validate_input", "open", "rasterize", "encode", "base64", "model")
+JOB_POLL_SECONDS = 0.05
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Point the service at the fake VLM; must run before any service module is imported."""
+    os.environ["MODEL_PROVIDERS"] = "benchmarks.fake_vlm"
+    os.environ["FAKE_VLM_LATENCY_SECONDS"] = str(args.latency)
+    os.environ["FAKE_VLM_JITTER_SECONDS"] = str(args.jitter)
+    os.environ["FAKE_VLM_SEED"] = str(args.seed)
+    # Empty keys win over .env (load_dotenv does not override), so tracing stays off.
+    os.environ["LANGFUSE_PUBLIC_KEY"] = ""
+    os.environ["LANGFUSE_SECRET_KEY"] = ""
+    os.environ.setdefault("JOB_QUEUE_BACKEND", "memory")
+    # Results are still stored (so writes are timed) but never into the real history.
+    os.environ.setdefault("RESULT_STORE_PATH", ":memory:")
+    if not args.warm_cache:
+        os.environ["RESULT_CACHE_ENABLED"] = "false"
+        os.environ["PAGE_CACHE_ENABLED"] = "false"
+        os.environ["SINGLE_FLIGHT_ENABLED"] = "false"
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    return {
+        "p50": round(percentile(values, 0.50) * 1000, 2),
+        "p95": round(percentile(values, 0.95) * 1000, 2),
+        "p99": round(percentile(values, 0.99) * 1000, 2),
+        "mean": round(statistics.fmean(values) * 1000, 2) if values else 0.0,
+        "max": round(max(values, default=0.0) * 1000, 2),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+@dataclass
+class Target:
+    slug: str
+    path: Path
+
+
+@dataclass
+class Scenario:
+    name: str
+    # One request: returns an HTTP-style status code.
+    run: Callable[[Target], Awaitable[int]]
+    # Documents to cycle through; None means every sample.
+    targets: list[Target] | None = None
+
+
+def sample_targets() -> list[Target]:
+    """Each sample PDF that a registered document type claims by filename."""
+    from agents.registry import route_filename
+
+    targets = []
+    for path in sorted(PDF_DIRECTORY.glob("*.pdf")):
+        document_type = route_filename(path.name)
+        if document_type is not None:
+            targets.append(Target(document_type.slug, path))
+    return targets
+
+
+def build_scenarios(client: Any, targets: list[Target]) -> list[Scenario]:
+    from agents.registry import DOCUMENT_TYPES
+
+    pdf_bytes = {target.path: target.path.read_bytes() for target in targets}
+    pdf_hashes = {path: hashlib.sha256(data).hexdigest() for path, data in pdf_bytes.items()}
+    slugs = [target.slug for target in targets]
+
+    def direct(document_type: Any) -> Callable[[Target], Awaitable[int]]:
+        async def run(target: Target) -> int:
+            await document_type.avalidate(target.path)
+            return 200
+
+        return run
+
+    async def post_json(url: str, payload: dict[str, Any]) -> int:
+        return (await client.post(url, json=payload)).status_code
+
+    async def post_file(url: str, target: Target, data: dict[str, str] | None = None) -> int:
+        files = {"file": (target.path.name, pdf_bytes[target.path], "application/pdf")}
+        return (await client.post(url, files=files, data=data or {})).status_code
+
+    async def agent_validate(target: Target) -> int:
+        return await post_json(f"/agents/{target.slug}/validate", {"document_path": str(target.path)})
+
+    async def agent_upload(target: Target) -> int:
+        return await post_file(f"/agents/{target.slug}/validate/upload", target)
+
+    async def agent_raw(target: Target) -> int:
+        response = await client.post(
+            f"/agents/{target.slug}/validate/raw",
+            params={"filename": target.path.name},
+            content=pdf_bytes[target.path],
+            headers={"Content-Type": "application/pdf"},
+        )
+        return response.status_code
+
+    async def classify(target: Target) -> int:
+        return await post_json("/documents/classify", {"document_path": str(target.path)})
+
+    async def classify_and_validate(target: Target) -> int:
+        return await post_json("/documents/validate", {"document_path": str(target.path)})
+
+    async def classify_and_validate_upload(target: Target) -> int:
+        return await post_file("/documents/validate/upload", target)
+
+    async def multi(target: Target) -> int:
+        other = next(slug for slug in slugs if slug != target.slug)
+        return await post_json(
+            "/documents/validate/multi", {"document_path": str(target.path), "agent_types": [target.slug, other]}
+        )
+
+    async def batch(target: Target) -> int:
+        payload = {"items": [{"document_path": str(target.path), "agent_type": target.slug}]}
+        async with client.stream("POST", "/agents/batch/validate", json=payload) as response:
+            async for _ in response.aiter_lines():
+                pass
+            return response.status_code
+
+    async def reconcile_dossier(target: Target) -> int:
+        payload = {"items": [{"document_path": str(target.path), "agent_type": target.slug}], "reconcile": True}
+        async with client.stream("POST", "/agents/batch/validate", json=payload) as response:
+            lines = [json.loads(line) async for line in response.aiter_lines() if line]
+        documents = [{"agent_type": line["agent_type"], "result": line["result"]} for line in lines if line["status"] == "ok"]
+        if not documents:
+            return response.status_code
+        return await post_json("/dossiers/reconcile", {"documents": documents})
+
+    async def job(target: Target) -> int:
+        response = await client.post("/jobs", json={"document_path": str(target.path), "agent_type": target.slug})
+        if response.status_code != 202:
+            return response.status_code
+        return await wait_for_job(response.json()["job_id"])
+
+    async def upload_job(target: Target) -> int:
+        response = await client.post(
+            "/jobs/upload",
+            files={"file": (target.path.name, pdf_bytes[target.path], "application/pdf")},
+            data={"agent_type": target.slug},
+        )
+        if response.status_code != 202:
+            return response.status_code
+        return await wait_for_job(response.json()["job_id"])
+
+    async def wait_for_job(job_id: str) -> int:
+        while True:
+            job = (await client.get(f"/jobs/{job_id}")).json()
+            if job["status"] == "succeeded":
+                return 200
+            if job["status"] == "failed":
+                return job["error"]["status_code"]
+            await asyncio.sleep(JOB_POLL_SECONDS)
+
+    async def stored_results(target: Target) -> int:
+        response = await client.get("/results", params={"document_hash": pdf_hashes[target.path], "limit": 1})
+        if response.status_code != 200 or not response.json():
+            return response.status_code
+        return (await client.get(f"/results/{response.json()[0]['id']}")).status_code
+
+    def get(url: str) -> Callable[[Target], Awaitable[int]]:
+        async def run(target: Target) -> int:
+            return (await client.get(url)).status_code
+
+        return run
+
+    scenarios = [
+        Scenario(f"agent:{slug}", direct(document_type), [target for target in targets if target.slug == slug])
+        for slug, document_type in DOCUMENT_TYPES.items()
+        if slug in slugs
+    ]
+    scenarios += [
+        Scenario("api:/agents/{slug}/validate", agent_validate),
+        Scenario("api:/agents/{slug}/validate/upload", agent_upload),
+        Scenario("api:/agents/{slug}/validate/raw", agent_raw),
+        Scenario("api:/agents/batch/validate", batch),
+        Scenario("api:/documents/classify", classify),
+        Scenario("api:/documents/validate", classify_and_validate),
+        Scenario("api:/documents/validate/upload", classify_and_validate_upload),
+        Scenario("api:/documents/validate/multi", multi),
+        Scenario("api:/dossiers/reconcile", reconcile_dossier),
+        Scenario("api:/jobs", job),
+        Scenario("api:/jobs/upload", upload_job),
+        Scenario("api:/results", stored_results),
+        Scenario("api:/health", get("/health")),
+        Scenario("api:/agents", get("/agents")),
+        Scenario("api:/cache/stats", get("/cache/stats")),
+        Scenario("api:/executor/stats", get("/executor/stats")),
+        Scenario("api:/metrics", get("/metrics")),
+    ]
+    return scenarios
+
+
+def uncovered_routes(app: Any, scenarios: list[Scenario]) -> list[str]:
+    """Routes in app.py that no scenario drives, so the suite can be kept in step with the API."""
+    from agents.registry import DOCUMENT_TYPES
+
+    driven = {scenario.name.removeprefix("api:") for scenario in scenarios}
+    for slug in DOCUMENT_TYPES:
+        driven |= {path.replace("{slug}", slug) for path in list(driven)}
+    # Polled by the job and results scenarios; the catch-all is shadowed by the typed per-agent routes.
+    driven |= {"/jobs/{job_id}", "/results/{result_id}", "/agents/{agent_type}/validate"}
+    documentation = {"/openapi.json", "/docs", "/docs/oauth2-redirect", "/redoc"}
+    return sorted(
+        route.path for route in app.routes if route.path not in driven and route.path not in documentation
+    )
+
+
+async def run_scenario(scenario: Scenario, targets: list[Target], requests: int, concurrency: int) -> dict[str, Any]:
+    from benchmarks.fake_vlm import model as fake_model
+    from utils.stages import record_stages
+
+    targets = scenario.targets or targets
+    fake_model.reset()
+    budget = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    stage_seconds: dict[str, list[float]] = {name: [] for name in STAGES}
+    statuses: Counter[int] = Counter()
+
+    async def one(index: int) -> None:
+        target = targets[index % len(targets)]
+        async with budget:
+            with record_stages() as timings:
+                started = time.perf_counter()
+                try:
+                    status = await scenario.run(target)
+                except Exception as exc:
+                    status = getattr(exc, "status_code", 599)
+                latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+            recorded = timings.to_dict()
+            for name in STAGES:
+                stage_seconds[name].append(recorded.get(name, {}).get("seconds", 0.0))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    wall = time.perf_counter() - started
+    return {
+        "scenario": scenario.name,
+        "concurrency": concurrency,
+        "requests": requests,
+        "ok": sum(count for status, count in statuses.items() if status < 400),
+        "status_counts": {str(status): count for status, count in sorted(statuses.items())},
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(requests / wall, 2) if wall else 0.0,
+        "latency_ms": summarize(latencies),
+        "stages_ms": {name: summarize(values) for name, values in stage_seconds.items()},
+        "model_calls": fake_model.calls,
+        "payload_bytes": fake_model.payload_bytes,
+        "payload_bytes_per_request": fake_model.payload_bytes // requests if requests else 0,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def selected(scenarios: list[Scenario], patterns: list[str] | None) -> list[Scenario]:
+    if not patterns:
+        return scenarios
+    return [scenario for scenario in scenarios if any(pattern in scenario.name for pattern in patterns)]
+
+
+async def run_benchmarks(args: argparse.Namespace) -> dict[str, Any]:
+    import httpx
+
+    from benchmarks import fake_vlm
+
+    fake_vlm.install()
+    app_module = importlib.import_module("app")
+    targets = sample_targets()
+    if len(targets) < 2:
+        raise SystemExit(f"Need at least two routable sample PDFs in {PDF_DIRECTORY}")
+
+    results = []
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with app_module.app.router.lifespan_context(app_module.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            scenarios = build_scenarios(client, targets)
+            for concurrency in args.concurrency:
+                for scenario in selected(scenarios, args.scenarios):
+                    result = await run_scenario(scenario, targets, args.requests, concurrency)
+                    results.append(result)
+                    print_result(result)
+            missing = uncovered_routes(app_module.app, scenarios)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "documents": [str(target.path.relative_to(ROOT)) for target in targets],
+            "settings": {
+                "concurrency": args.concurrency,
+                "requests": args.requests,
+                "latency_seconds": args.latency,
+                "jitter_seconds": args.jitter,
+                "seed": args.seed,
+                "warm_cache": args.warm_cache,
+            },
+        },
+        "uncovered_routes": missing,
+        "results": results,
+    }
+
+
+def print_result(result: dict[str, Any]) -> None:
+    latency = result["latency_ms"]
+    stages = "  ".join(f"{name} {result['stages_ms'][name]['mean']:>7.1f}" for name in STAGES)
+    print(
+        f"c={result['concurrency']:<3} {result['scenario']:<40} ok {result['ok']:>3}/{result['requests']:<3} "
+        f"p50 {latency['p50']:>8.1f}  p95 {latency['p95']:>8.1f}  p99 {latency['p99']:>8.1f} ms  "
+        f"{result['throughput_rps']:>6.2f} req/s  {stages}  "
+        f"{result['payload_bytes_per_request'] / 1024:>7.0f} KiB/req"
+    )
+
+
+def compare(report: dict[str, Any], baseline_path: Path) -> None:
+    """Print p50, p95 and throughput changes against an earlier run."""
+    baseline = json.loads(baseline_path.read_text())
+    previous = {(entry["scenario"], entry["concurrency"]): entry for entry in baseline["results"]}
+    print(f"\nAgainst {baseline_path.name} (commit {baseline['meta']['commit']}):")
+    for entry in report["results"]:
+        before = previous.get((entry["scenario"], entry["concurrency"]))
+        if before is None:
+            continue
+        deltas = []
+        for label, now, then in (
+            ("p50", entry["latency_ms"]["p50"], before["latency_ms"]["p50"]),
+            ("p95", entry["latency_ms"]["p95"], before["latency_ms"]["p95"]),
+            ("rps", entry["throughput_rps"], before["throughput_rps"]),
+        ):
+            change = (now - then) / then * 100 if then else 0.0
+            deltas.append(f"{label} {change:+6.1f}%")
+        print(f"c={entry['concurrency']:<3} {entry['scenario']:<40} {'  '.join(deltas)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--requests", type=int, default=20, help="Requests per scenario and concurrency level")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake VLM base latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Fake VLM latency jitter in seconds, either way")
+    parser.add_argument("--seed", default="0")
+    parser.add_argument("--scenarios", nargs="*", help="Only scenarios whose name contains one of these")
+    parser.add_argument("--warm-cache", action="store_true", help="Keep the result/page caches and coalescing on")
+    parser.add_argument("--output", type=Path, help="JSON report path (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--baseline", type=Path, help="Earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    report = asyncio.run(run_benchmarks(args))
+
+    output = args.output
+    if output is None:
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIRECTORY / f"validation_latency-{report['meta']['commit']}-{stamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nWrote {output}")
+    if report["uncovered_routes"]:
+        print(f"Routes without a scenario: {', '.join(report['uncovered_routes'])}")
+    if args.baseline is not None:
+        compare(report, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
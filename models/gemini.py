@@ -2,11 +2,25 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
 from dotenv import load_dotenv
 
+from utils.resilience import ResiliencePolicy
+
 
 load_dotenv()
 
+# Tier-1 quota for gemini-2.5-flash is 1000 requests/minute; override with GEMINI_* variables.
+RESILIENCE = ResiliencePolicy.from_env(
+    "GEMINI",
+    timeout_seconds=60.0,
+    max_attempts=4,
+    rate_per_second=16.0,
+    burst=16,
+)
+
 model = ChatGoogleGenerativeAI(
     model="gemini-2.5-flash",
     temperature=0,
     max_tokens=None,
+    # Retries are handled by utils.resilience; the client timeout bounds sync calls.
+    timeout=RESILIENCE.timeout_seconds,
+    max_retries=0,
 )
\ No newline at end of file
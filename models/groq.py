@@ -7,6 +7,21 @@ from langchain_groq import ChatGroq
 from langchain_core.messages import HumanMessage
 from PIL import Image
 
+from utils.resilience import ResiliencePolicy
+
 load_dotenv()
 
-model = ChatGroq(model="meta-llama/llama-4-scout-17b-16e-instruct")
\ No newline at end of file
+# Free-tier quota for llama-4-scout is 30 requests/minute; override with GROQ_* variables.
+RESILIENCE = ResiliencePolicy.from_env(
+    "GROQ",
+    timeout_seconds=30.0,
+    max_attempts=4,
+    rate_per_second=0.5,
+    burst=2,
+)
+
+model = ChatGroq(
+    model="meta-llama/llama-4-scout-17b-16e-instruct",
+    timeout=RESILIENCE.timeout_seconds,
+    max_retries=0,
+)
\ No newline at end of file
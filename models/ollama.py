@@ -7,4 +7,18 @@ from langchain_core.output_parsers import StrOutputParser
 from langchain_ollama import ChatOllama
 from PIL import Image
 
-model = ChatOllama(model="qwen3-vl:2b", temperature=0)
\ No newline at end of file
+from utils.resilience import ResiliencePolicy
+
+# A local server has no quota, but a cold model load can take minutes; override with OLLAMA_* variables.
+RESILIENCE = ResiliencePolicy.from_env(
+    "OLLAMA",
+    timeout_seconds=180.0,
+    max_attempts=2,
+    breaker_failure_threshold=3,
+)
+
+model = ChatOllama(
+    model="qwen3-vl:2b",
+    temperature=0,
+    client_kwargs={"timeout": RESILIENCE.timeout_seconds},
+)
\ No newline at end of file
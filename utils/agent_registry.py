@@ -0,0 +1,90 @@
+import importlib
+import os
+import threading
+from types import ModuleType
+from typing import Any
+
+from pydantic import BaseModel
+
+# Modules under models/ in order of preference, e.g. "gemini,groq,ollama". The
+# first is the primary every agent is built with; the rest are failover and
+# hedging targets for utils.model_router. A dotted name is imported as given
+# (the benchmarks use "benchmarks.fake_vlm").
+MODEL_PROVIDERS = [
+    name.strip()
+    for name in os.getenv("MODEL_PROVIDERS", os.getenv("AGENT_MODEL_MODULE", "gemini")).split(",")
+    if name.strip()
+]
+MODEL_MODULE = MODEL_PROVIDERS[0]
+
+_model_lock = threading.Lock()
+_models: dict[str, Any] = {}
+
+
+def provider_module(provider: str) -> ModuleType:
+    return importlib.import_module(provider if "." in provider else f"models.{provider}")
+
+
+def load_model(provider: str) -> Any:
+    """A provider's chat model client from models/<provider>.py, imported and constructed on first use."""
+    with _model_lock:
+        model = _models.get(provider)
+        if model is None:
+            model = provider_module(provider).model
+            _models[provider] = model
+        return model
+
+
+def shared_model() -> Any:
+    """The primary provider's chat model client, shared by all agents."""
+    return load_model(MODEL_MODULE)
+
+
+def create_agent(model: Any, response_format: type[BaseModel], system_prompt: str) -> Any:
+    """A LangChain agent with structured output; LangChain is imported on first use."""
+    from langchain.agents import create_agent as build_agent
+
+    return build_agent(model=model, response_format=response_format, system_prompt=system_prompt)
+
+
+class AgentRegistry:
+    """Builds LangChain agents on first use and memoizes them.
+
+    Agents are keyed by (name, response format, system prompt, model), so the
+    full per-document agents and the partial-schema agents used for modality
+    routing share one cache. Importing an agent module no longer touches
+    LangChain, the model client or Langfuse.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._agents: dict[tuple[str, type[BaseModel], str, int], Any] = {}
+        self._specs: dict[int, tuple[str, type[BaseModel], str]] = {}
+
+    def get(
+        self,
+        name: str,
+        response_format: type[BaseModel],
+        system_prompt: str,
+        model: Any = None,
+    ) -> Any:
+        model = model if model is not None else shared_model()
+        key = (name, response_format, system_prompt, id(model))
+        with self._lock:
+            agent = self._agents.get(key)
+            if agent is None:
+                agent = create_agent(model, response_format, system_prompt)
+                self._agents[key] = agent
+                self._specs[id(agent)] = (name, response_format, system_prompt)
+            return agent
+
+    def rebind(self, agent: Any, model: Any) -> Any:
+        """The same agent (name, schema, prompt) built on another model; unknown agents are returned as-is."""
+        with self._lock:
+            spec = self._specs.get(id(agent))
+        if spec is None:
+            return agent
+        return self.get(*spec, model=model)
+
+
+agent_registry = AgentRegistry()
@@ -0,0 +1,377 @@
+import asyncio
+import functools
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterable, TypeVar
+
+from pydantic import BaseModel, create_model
+
+from utils.agent_registry import agent_registry
+from utils.concurrency import model_call_limiter, run_in_render_pool
+from utils.metrics import observe_render, observe_validation
+from utils.modality import TEXT, field_modality
+from utils.model_router import ainvoke_agent, invoke_agent
+from utils.page_selection import PageSelection
+from utils.pdf_to_image import FIXED_300_DPI, RenderedDocument, RenderOptions, render_pdf
+from utils.document_source import DocumentSource, source_name, source_sha256
+from utils.result_cache import ResultCache, describe_model, result_cache
+from utils.result_store import NOT_INDEXED, IndexedFields, ResultStore, result_store
+from utils.single_flight import single_flight
+from utils.text_layer import MIN_CHARS_PER_PAGE, MIN_CONFIDENCE, TextExtraction, extract_fields, read_text_layer
+
+ResponseT = TypeVar("ResponseT", bound=BaseModel)
+
+# The text route sends the text layer inline; keep pathological documents bounded.
+MAX_TEXT_ROUTE_CHARS = 60_000
+
+
+@dataclass
+class ExtractionPlan:
+    """Which parts of a schema are filled by regex, by a text-only call and by a vision call."""
+
+    text_values: dict[str, Any] = field(default_factory=dict)
+    text_agent: Any = None
+    text_message: str = ""
+    vision_agent: Any = None
+    vision_instruction: str = ""
+
+
+def build_messages(instruction: str, image_parts: Iterable[dict[str, str]]) -> dict[str, Any]:
+    """User message with the instruction followed by the page images.
+
+    ``image_parts`` may be a generator (``RenderedDocument.iter_image_parts``).
+    """
+    content: list[dict[str, str]] = [{"type": "text", "text": instruction}]
+    content.extend(image_parts)
+    return {"messages": [{"role": "user", "content": content}]}
+
+
+def pipeline_key(
+    render_options: RenderOptions,
+    page_selection: PageSelection | None,
+    text_extraction: TextExtraction | None,
+    route_by_modality: bool,
+) -> str:
+    selection_key = page_selection.cache_key() if page_selection is not None else "all-pages"
+    extraction_key = text_extraction.cache_key() if text_extraction is not None else "vlm-only"
+    routing_key = "modality-routed" if route_by_modality else "single-call"
+    return f"{render_options.cache_key()}|{selection_key}|{extraction_key}|{routing_key}"
+
+
+def build_config(
+    document_path: DocumentSource,
+    agent_type: str,
+    callbacks: list[Any],
+    rendered: RenderedDocument,
+    text_fields: list[str] | None = None,
+) -> dict[str, Any]:
+    return {
+        "callbacks": callbacks,
+        "metadata": {
+            "document_path": str(document_path),
+            "agent_type": agent_type,
+            "page_count": rendered.total_pages,
+            "pages_sent": [number + 1 for number in rendered.page_numbers],
+            "pages_dropped": [number + 1 for number in rendered.dropped_pages],
+            "page_dpis": rendered.page_dpis,
+            "payload_bytes": rendered.payload_bytes,
+            "text_layer_fields": text_fields or [],
+        },
+        "tags": ["vlm", "pdf-validation"],
+    }
+
+
+def build_text_config(
+    document_path: DocumentSource,
+    agent_type: str,
+    callbacks: list[Any],
+    plan: ExtractionPlan,
+) -> dict[str, Any]:
+    return {
+        "callbacks": callbacks,
+        "metadata": {
+            "document_path": str(document_path),
+            "agent_type": agent_type,
+            "text_layer_fields": list(plan.text_values),
+            "text_chars": len(plan.text_message),
+        },
+        "tags": ["llm", "text-route", "pdf-validation"],
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def partial_schema(response_format: type[BaseModel], fields: tuple[str, ...], suffix: str) -> type[BaseModel]:
+    """Sub-model of ``response_format`` holding only ``fields``, with their original descriptions."""
+    model_fields = response_format.model_fields
+    return create_model(
+        f"{response_format.__name__}{suffix}",
+        **{name: (model_fields[name].annotation, model_fields[name]) for name in fields},
+    )
+
+
+def partial_agent(model: Any, schema: type[BaseModel], system_prompt: str) -> Any:
+    return agent_registry.get(schema.__name__, schema, system_prompt, model)
+
+
+def known_values_note(text_values: dict[str, Any]) -> str:
+    if not text_values:
+        return ""
+    known = "\n".join(f"- {name}: {value}" for name, value in text_values.items())
+    return f"\n\nThe following fields were already read from the document's text layer:\n{known}"
+
+
+def plan_invocation(
+    agent: Any,
+    document_path: DocumentSource,
+    *,
+    response_format: type[BaseModel],
+    system_prompt: str,
+    instruction: str,
+    model: Any,
+    text_extraction: TextExtraction | None,
+    route_by_modality: bool = False,
+) -> ExtractionPlan:
+    """Split the extraction across the text-layer fast path, a text-only call and a vision call.
+
+    Without a trustworthy text layer (or any routing configured) this is the
+    original single vision call with the full agent. Trust is judged by the
+    type's ``text_extraction`` thresholds, or the module defaults without one.
+    """
+    if text_extraction is None and not route_by_modality:
+        return ExtractionPlan(vision_agent=agent, vision_instruction=instruction)
+
+    layer = read_text_layer(document_path)
+    text_values = (extract_fields(layer, text_extraction) if text_extraction is not None else None) or {}
+    remaining = tuple(name for name in response_format.model_fields if name not in text_values)
+    min_chars_per_page = text_extraction.min_chars_per_page if text_extraction is not None else MIN_CHARS_PER_PAGE
+    min_confidence = text_extraction.min_confidence if text_extraction is not None else MIN_CONFIDENCE
+    if route_by_modality and layer.confidence(min_chars_per_page) >= min_confidence:
+        text_fields = tuple(name for name in remaining if field_modality(response_format, name) == TEXT)
+        vision_fields = tuple(name for name in remaining if name not in text_fields)
+    else:
+        text_fields, vision_fields = (), remaining
+
+    plan = ExtractionPlan(text_values=text_values)
+    note = known_values_note(text_values)
+    if text_fields:
+        plan.text_agent = partial_agent(model, partial_schema(response_format, text_fields, "Text"), system_prompt)
+        plan.text_message = (
+            f"{instruction}{note}\n\nDetermine only these fields from the document text below: "
+            f"{', '.join(text_fields)}.\n\n--- Document text ---\n{layer.text[:MAX_TEXT_ROUTE_CHARS]}"
+        )
+    if vision_fields == tuple(response_format.model_fields):
+        plan.vision_agent, plan.vision_instruction = agent, instruction
+    elif vision_fields:
+        plan.vision_agent = partial_agent(model, partial_schema(response_format, vision_fields, "Visual"), system_prompt)
+        plan.vision_instruction = (
+            f"{instruction}{note}\n\nOnly determine these remaining fields from the images: {', '.join(vision_fields)}."
+        )
+    return plan
+
+
+def merge_response(
+    response_format: type[ResponseT],
+    plan: ExtractionPlan,
+    text_response: BaseModel | None,
+    vision_response: BaseModel | None,
+) -> ResponseT:
+    if plan.text_agent is None and not plan.text_values:
+        return vision_response
+    values: dict[str, Any] = {}
+    for partial in (text_response, vision_response):
+        if partial is not None:
+            values.update(partial.model_dump())
+    values.update(plan.text_values)
+    return response_format.model_validate(values)
+
+
+def run_validation(
+    agent: Any,
+    document_path: DocumentSource,
+    *,
+    agent_type: str,
+    response_format: type[ResponseT],
+    system_prompt: str,
+    instruction: str,
+    model: Any,
+    callbacks: list[Any],
+    render_options: RenderOptions = FIXED_300_DPI,
+    page_selection: PageSelection | None = None,
+    text_extraction: TextExtraction | None = None,
+    route_by_modality: bool = False,
+    indexed_fields: IndexedFields = NOT_INDEXED,
+    cache: ResultCache = result_cache,
+    store: ResultStore = result_store,
+) -> ResponseT:
+    """Validate a PDF with an agent, serving repeat documents from the result cache.
+
+    Identical requests already in flight are coalesced onto one model call.
+
+    With ``text_extraction`` set, fields readable from a born-digital text layer
+    are filled deterministically. With ``route_by_modality``, the remaining
+    textual fields are read from the text layer by a text-only call and only
+    fields annotated as VISUAL are sent with page images. Every response the
+    model produced (not cache hits) is appended to the result store, indexed by
+    ``indexed_fields``.
+    """
+    started = time.perf_counter()
+    file_hash = source_sha256(document_path)
+    cache_key = cache.build_key(
+        document_path,
+        agent_type=agent_type,
+        response_format=response_format,
+        system_prompt=system_prompt,
+        model_name=describe_model(model),
+        render_key=pipeline_key(render_options, page_selection, text_extraction, route_by_modality),
+        file_hash=file_hash,
+    )
+    cached = cache.get(cache_key, response_format)
+    if cached is not None:
+        observe_validation(agent_type, time.perf_counter() - started, cache_hit=True)
+        return cached
+
+    def compute() -> ResponseT:
+        plan = plan_invocation(
+            agent,
+            document_path,
+            response_format=response_format,
+            system_prompt=system_prompt,
+            instruction=instruction,
+            model=model,
+            text_extraction=text_extraction,
+            route_by_modality=route_by_modality,
+        )
+        text_response = None
+        vision_response = None
+        if plan.text_agent is not None:
+            result = invoke_agent(
+                plan.text_agent,
+                build_messages(plan.text_message, []),
+                config=build_text_config(document_path, agent_type, callbacks, plan),
+            )
+            text_response = result["structured_response"]
+        if plan.vision_agent is not None:
+            rendered = render_pdf(document_path, render_options, page_selection, file_hash=file_hash)
+            observe_render(agent_type, rendered)
+            result = invoke_agent(
+                plan.vision_agent,
+                build_messages(plan.vision_instruction, rendered.iter_image_parts()),
+                config=build_config(document_path, agent_type, callbacks, rendered, list(plan.text_values)),
+            )
+            vision_response = result["structured_response"]
+
+        response = merge_response(response_format, plan, text_response, vision_response)
+        cache.put(cache_key, agent_type, response)
+        store.try_record(
+            document_hash=file_hash,
+            document_name=source_name(document_path),
+            agent_type=agent_type,
+            model_name=describe_model(model),
+            response=response,
+            latency_seconds=time.perf_counter() - started,
+            indexed_fields=indexed_fields,
+        )
+        return response
+
+    response = single_flight.run_sync(cache_key, compute)
+    observe_validation(agent_type, time.perf_counter() - started, cache_hit=False)
+    return response
+
+
+async def arun_validation(
+    agent: Any,
+    document_path: DocumentSource,
+    *,
+    agent_type: str,
+    response_format: type[ResponseT],
+    system_prompt: str,
+    instruction: str,
+    model: Any,
+    callbacks: list[Any],
+    render_options: RenderOptions = FIXED_300_DPI,
+    page_selection: PageSelection | None = None,
+    text_extraction: TextExtraction | None = None,
+    route_by_modality: bool = False,
+    indexed_fields: IndexedFields = NOT_INDEXED,
+    cache: ResultCache = result_cache,
+    store: ResultStore = result_store,
+) -> ResponseT:
+    """Async variant of run_validation.
+
+    Hashing, text-layer reading and rasterization run in the dedicated render
+    pool, the text and vision calls run concurrently, and each model call is
+    admitted through the global/per-agent limiter.
+    """
+    started = time.perf_counter()
+    file_hash = await run_in_render_pool(source_sha256, document_path)
+    cache_key = cache.build_key(
+        document_path,
+        agent_type=agent_type,
+        response_format=response_format,
+        system_prompt=system_prompt,
+        model_name=describe_model(model),
+        render_key=pipeline_key(render_options, page_selection, text_extraction, route_by_modality),
+        file_hash=file_hash,
+    )
+    cached = await run_in_render_pool(cache.get, cache_key, response_format)
+    if cached is not None:
+        observe_validation(agent_type, time.perf_counter() - started, cache_hit=True)
+        return cached
+
+    async def compute() -> ResponseT:
+        plan = await run_in_render_pool(
+            plan_invocation,
+            agent,
+            document_path,
+            response_format=response_format,
+            system_prompt=system_prompt,
+            instruction=instruction,
+            model=model,
+            text_extraction=text_extraction,
+            route_by_modality=route_by_modality,
+        )
+
+        async def text_call() -> BaseModel | None:
+            if plan.text_agent is None:
+                return None
+            async with model_call_limiter.slot(agent_type):
+                result = await ainvoke_agent(
+                    plan.text_agent,
+                    build_messages(plan.text_message, []),
+                    config=build_text_config(document_path, agent_type, callbacks, plan),
+                )
+            return result["structured_response"]
+
+        async def vision_call() -> BaseModel | None:
+            if plan.vision_agent is None:
+                return None
+            rendered = await run_in_render_pool(
+                render_pdf, document_path, render_options, page_selection, file_hash=file_hash
+            )
+            observe_render(agent_type, rendered)
+            async with model_call_limiter.slot(agent_type):
+                result = await ainvoke_agent(
+                    plan.vision_agent,
+                    build_messages(plan.vision_instruction, rendered.iter_image_parts()),
+                    config=build_config(document_path, agent_type, callbacks, rendered, list(plan.text_values)),
+                )
+            return result["structured_response"]
+
+        text_response, vision_response = await asyncio.gather(text_call(), vision_call())
+        response = merge_response(response_format, plan, text_response, vision_response)
+        await run_in_render_pool(cache.put, cache_key, agent_type, response)
+        await run_in_render_pool(
+            store.try_record,
+            document_hash=file_hash,
+            document_name=source_name(document_path),
+            agent_type=agent_type,
+            model_name=describe_model(model),
+            response=response,
+            latency_seconds=time.perf_counter() - started,
+            indexed_fields=indexed_fields,
+        )
+        return response
+
+    response = await single_flight.run(cache_key, compute)
+    observe_validation(agent_type, time.perf_counter() - started, cache_hit=False)
+    return response
@@ -0,0 +1,192 @@
+import functools
+import logging
+import os
+import re
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass, field
+from typing import Any, Literal
+
+from pydantic import BaseModel, Field, create_model
+
+from utils.agent_registry import agent_registry
+from utils.agent_runner import build_messages
+from utils.concurrency import model_call_limiter, run_in_render_pool
+from utils.document_source import DocumentSource, open_pdf, source_name
+from utils.document_type import DocumentType
+from utils.model_router import ainvoke_agent, invoke_agent
+from utils.pdf_to_image import MIME_TYPES, RenderedDocument, RenderOptions, page_dpi, render_page
+from utils.stages import agent_scope
+from utils.tracing import trace_sampling, tracing_callbacks
+
+logger = logging.getLogger(__name__)
+
+# Below this, the local stage defers to the VLM on a downscaled first page.
+CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("CLASSIFIER_MIN_CONFIDENCE", "0.6"))
+CLASSIFIER_VLM_FALLBACK = os.getenv("CLASSIFIER_VLM_FALLBACK", "true").lower() not in {"0", "false", "no"}
+# Only the opening pages identify a document; reading the rest is wasted work.
+CLASSIFIER_TEXT_PAGES = 2
+THUMBNAIL = RenderOptions(dpi=None, max_long_edge=768, max_total_pixels=768 * 768, min_dpi=36, quality=60)
+
+UNKNOWN = "unknown"
+CLASSIFIER_AGENT_TYPE = "document_classifier"
+CLASSIFY_INSTRUCTION = "Which document type is this? Return the structured response."
+
+
+@dataclass
+class Classification:
+    agent_type: str | None
+    confidence: float
+    method: Literal["filename", "text", "filename+text", "vlm", "none"]
+    scores: dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def first_pages_text(pdf_path: DocumentSource, pages: int = CLASSIFIER_TEXT_PAGES) -> str:
+    with open_pdf(pdf_path) as document:
+        return "\n".join(document[number].get_text() for number in range(min(pages, document.page_count)))
+
+
+def keyword_score(text: str, keywords: tuple[str, ...]) -> float:
+    """Fraction of a type's distinguishing keywords found in the text."""
+    if not keywords or not text:
+        return 0.0
+    return sum(1 for keyword in keywords if re.search(keyword, text, re.IGNORECASE)) / len(keywords)
+
+
+def classify_locally(pdf_path: DocumentSource, document_types: Iterable[DocumentType]) -> Classification:
+    """Score every type from the filename and the text layer of the first pages.
+
+    A unique filename match is strong evidence; the text layer confirms it or,
+    when another type matches better, scales the confidence down by the margin,
+    so a filename the text clearly contradicts falls below the threshold. Without
+    a filename match the confidence is the best text score less half the
+    runner-up's, so ambiguous documents fall below the threshold.
+    """
+    document_types = list(document_types)
+    text = first_pages_text(pdf_path)
+    scores = {document_type.slug: keyword_score(text, document_type.classifier_keywords) for document_type in document_types}
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    by_filename = [document_type.slug for document_type in document_types if document_type.matches_filename(source_name(pdf_path))]
+
+    if len(by_filename) == 1:
+        slug = by_filename[0]
+        best_other = max((score for other, score in scores.items() if other != slug), default=0.0)
+        # Scaled rather than subtracted: a filename contradicted by the text (another type's keywords
+        # match, this one's do not) must fall below CLASSIFIER_MIN_CONFIDENCE and defer to the VLM.
+        contradiction = max(0.0, best_other - scores[slug])
+        confidence = (0.85 + 0.15 * scores[slug]) * (1.0 - contradiction)
+        method = "filename+text" if scores[slug] > 0 else "filename"
+        return Classification(slug, round(min(1.0, confidence), 3), method, scores)
+
+    if ranked and scores[ranked[0]] > 0:
+        runner_up = scores[ranked[1]] if len(ranked) > 1 else 0.0
+        confidence = scores[ranked[0]] - 0.5 * runner_up
+        return Classification(ranked[0], round(max(0.0, confidence), 3), "text", scores)
+    return Classification(None, 0.0, "none", scores)
+
+
+@functools.lru_cache(maxsize=None)
+def classification_schema(slugs: tuple[str, ...]) -> type[BaseModel]:
+    return create_model(
+        "DocumentClassification",
+        agent_type=(
+            Literal[(*slugs, UNKNOWN)],
+            Field(description=f'The document type, or "{UNKNOWN}" if none of the listed types applies.'),
+        ),
+        confidence=(float, Field(ge=0.0, le=1.0, description="Confidence in the chosen type, 0 to 1.")),
+    )
+
+
+def classification_prompt(document_types: list[DocumentType]) -> str:
+    listing = "\n".join(f"- {document_type.slug}: {document_type.title}" for document_type in document_types)
+    return (
+        "You classify onboarding documents for the Bharat Bill Payment System. "
+        "Given a low-resolution image of the first page, pick which of these document types it is:\n"
+        f"{listing}\n"
+        f'Answer "{UNKNOWN}" if none applies. Do not extract any fields.'
+    )
+
+
+def render_thumbnail(pdf_path: DocumentSource) -> RenderedDocument:
+    """First page only, downscaled: enough to tell document types apart, a fraction of a full render."""
+    with open_pdf(pdf_path) as document:
+        page = document[0]
+        dpi = page_dpi(page, THUMBNAIL, THUMBNAIL.max_total_pixels)
+        return RenderedDocument(
+            mime_type=MIME_TYPES[THUMBNAIL.image_format],
+            encoded_pages=[render_page(page, dpi, THUMBNAIL.image_format, THUMBNAIL.quality)],
+            page_numbers=[0],
+            total_pages=document.page_count,
+            page_dpis=[dpi],
+        )
+
+
+def classifier_agent(document_types: list[DocumentType]) -> Any:
+    slugs = tuple(document_type.slug for document_type in document_types)
+    return agent_registry.get(CLASSIFIER_AGENT_TYPE, classification_schema(slugs), classification_prompt(document_types))
+
+
+def classifier_config(pdf_path: DocumentSource, rendered: RenderedDocument) -> dict[str, Any]:
+    return {
+        "callbacks": tracing_callbacks(),
+        "metadata": {
+            "document_path": str(pdf_path),
+            "agent_type": CLASSIFIER_AGENT_TYPE,
+            "page_dpis": rendered.page_dpis,
+            "payload_bytes": rendered.payload_bytes,
+        },
+        "tags": ["vlm", "classification"],
+    }
+
+
+def merge_vlm_answer(local: Classification, answer: BaseModel) -> Classification:
+    if answer.agent_type == UNKNOWN:
+        return Classification(None, 0.0, "vlm", local.scores)
+    return Classification(answer.agent_type, round(answer.confidence, 3), "vlm", local.scores)
+
+
+def classify_document(
+    pdf_path: DocumentSource,
+    document_types: Iterable[DocumentType],
+    vlm_fallback: bool = CLASSIFIER_VLM_FALLBACK,
+) -> Classification:
+    """Predict which document type applies, asking the VLM only when the local stage is unsure."""
+    document_types = list(document_types)
+    local = classify_locally(pdf_path, document_types)
+    if local.confidence >= CLASSIFIER_MIN_CONFIDENCE or not vlm_fallback:
+        return local
+
+    agent = classifier_agent(document_types)
+    with agent_scope(CLASSIFIER_AGENT_TYPE), trace_sampling():
+        rendered = render_thumbnail(pdf_path)
+        result = invoke_agent(agent, build_messages(CLASSIFY_INSTRUCTION, rendered.iter_image_parts()), config=classifier_config(pdf_path, rendered))
+    classification = merge_vlm_answer(local, result["structured_response"])
+    logger.info("Classified %s via VLM as %s (%.2f)", source_name(pdf_path), classification.agent_type, classification.confidence)
+    return classification
+
+
+async def aclassify_document(
+    pdf_path: DocumentSource,
+    document_types: Iterable[DocumentType],
+    vlm_fallback: bool = CLASSIFIER_VLM_FALLBACK,
+) -> Classification:
+    """Async variant of classify_document; local work runs in the render pool, the VLM call through the limiter."""
+    document_types = list(document_types)
+    local = await run_in_render_pool(classify_locally, pdf_path, document_types)
+    if local.confidence >= CLASSIFIER_MIN_CONFIDENCE or not vlm_fallback:
+        return local
+
+    agent = classifier_agent(document_types)
+    with agent_scope(CLASSIFIER_AGENT_TYPE), trace_sampling():
+        rendered = await run_in_render_pool(render_thumbnail, pdf_path)
+        async with model_call_limiter.slot(CLASSIFIER_AGENT_TYPE):
+            result = await ainvoke_agent(
+                agent,
+                build_messages(CLASSIFY_INSTRUCTION, rendered.iter_image_parts()),
+                config=classifier_config(pdf_path, rendered),
+            )
+    classification = merge_vlm_answer(local, result["structured_response"])
+    logger.info("Classified %s via VLM as %s (%.2f)", source_name(pdf_path), classification.agent_type, classification.confidence)
+    return classification
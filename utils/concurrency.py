@@ -0,0 +1,131 @@
+import asyncio
+import contextvars
+import functools
+import os
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class ModelCallRejected(Exception):
+    """Raised when a model call cannot be admitted by the limiter."""
+
+    def __init__(self, message: str, status_code: int, retry_after_seconds: float) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after_seconds = retry_after_seconds
+
+
+class ModelCallLimiter:
+    """Bounds in-flight model calls globally and per agent, with a bounded wait queue.
+
+    Callers that arrive while every slot is busy and ``max_queue`` callers are
+    already waiting are rejected immediately (429); callers that wait longer than
+    ``queue_timeout_seconds`` are rejected with 503.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_concurrency_per_agent: int,
+        max_queue: int,
+        queue_timeout_seconds: float,
+        retry_after_seconds: float = 5.0,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_agent = max_concurrency_per_agent
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._per_agent: dict[str, asyncio.Semaphore] = {}
+        self._waiting = 0
+        self._in_flight = 0
+        self._in_flight_per_agent: dict[str, int] = {}
+        self._rejected = {"queue_full": 0, "queue_timeout": 0}
+
+    def _agent_semaphore(self, agent_type: str) -> asyncio.Semaphore:
+        semaphore = self._per_agent.get(agent_type)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency_per_agent)
+            self._per_agent[agent_type] = semaphore
+        return semaphore
+
+    async def _acquire(self, agent_semaphore: asyncio.Semaphore) -> None:
+        await agent_semaphore.acquire()
+        try:
+            await self._global.acquire()
+        except BaseException:
+            agent_semaphore.release()
+            raise
+
+    @asynccontextmanager
+    async def slot(self, agent_type: str) -> AsyncIterator[None]:
+        agent_semaphore = self._agent_semaphore(agent_type)
+        if self._waiting + self._in_flight >= self.max_concurrency + self.max_queue:
+            self._rejected["queue_full"] += 1
+            raise ModelCallRejected(
+                "Too many validations in progress; queue is full.",
+                status_code=429,
+                retry_after_seconds=self.retry_after_seconds,
+            )
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._acquire(agent_semaphore), self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self._rejected["queue_timeout"] += 1
+            raise ModelCallRejected(
+                f"Timed out after {self.queue_timeout_seconds:g}s waiting for a model slot.",
+                status_code=503,
+                retry_after_seconds=self.retry_after_seconds,
+            ) from None
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        self._in_flight_per_agent[agent_type] = self._in_flight_per_agent.get(agent_type, 0) + 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._in_flight_per_agent[agent_type] -= 1
+            self._global.release()
+            agent_semaphore.release()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_concurrency_per_agent": self.max_concurrency_per_agent,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "in_flight_per_agent": {k: v for k, v in self._in_flight_per_agent.items() if v},
+            "waiting": self._waiting,
+            "rejected": dict(self._rejected),
+        }
+
+
+# Dedicated pool for PDF rasterization and file hashing so that CPU-bound work
+# never competes with the AnyIO threadpool that serves sync endpoints.
+render_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RENDER_POOL_WORKERS", str(min(8, (os.cpu_count() or 1) + 2)))),
+    thread_name_prefix="pdf-render",
+)
+
+model_call_limiter = ModelCallLimiter(
+    max_concurrency=int(os.getenv("VLM_MAX_CONCURRENCY", "16")),
+    max_concurrency_per_agent=int(os.getenv("VLM_MAX_CONCURRENCY_PER_AGENT", "8")),
+    max_queue=int(os.getenv("VLM_MAX_QUEUE", "64")),
+    queue_timeout_seconds=float(os.getenv("VLM_QUEUE_TIMEOUT_SECONDS", "30")),
+    retry_after_seconds=float(os.getenv("VLM_RETRY_AFTER_SECONDS", "5")),
+)
+
+
+async def run_in_render_pool(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    # Run in a copy of the caller's context so per-request state (stage timings) follows the work.
+    context = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(render_executor, functools.partial(context.run, func, *args, **kwargs))
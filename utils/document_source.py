@@ -0,0 +1,142 @@
+import hashlib
+import mmap
+import os
+import tempfile
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any
+
+import fitz  # PyMuPDF
+
+from utils.result_cache import file_sha256
+from utils.stages import stage
+
+# Uploads larger than this are rejected; smaller than UPLOAD_SPOOL_BYTES stay in memory.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(8 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+PDF_MAGIC = b"%PDF-"
+
+
+class UploadRejected(Exception):
+    """An upload that is too large or not a PDF; carries the HTTP status to return."""
+
+    def __init__(self, message: str, status_code: int) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass(frozen=True)
+class UploadedPdf:
+    """A PDF received over HTTP, held in memory or in a spooled temp file.
+
+    ``data`` is the document's bytes (or a read-only mmap view of the spool),
+    handed to PyMuPDF with ``fitz.open(stream=...)`` so the upload is never
+    written to disk a second time. ``sha256`` was computed while streaming and
+    stands in for the file hash in the result and page caches.
+    """
+
+    name: str
+    data: bytes | memoryview
+    sha256: str
+    _spool: IO[bytes] | None = field(default=None, repr=False, compare=False)
+
+    def __str__(self) -> str:
+        return f"upload:{self.name}"
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Process-pool workers get a plain bytes copy; the mmap and spool stay here.
+        return (UploadedPdf, (self.name, bytes(self.data), self.sha256))
+
+
+DocumentSource = str | Path | UploadedPdf
+
+
+def open_pdf(source: DocumentSource) -> fitz.Document:
+    with stage("open"):
+        if isinstance(source, UploadedPdf):
+            return fitz.open(stream=source.data, filetype="pdf")
+        return fitz.open(source)
+
+
+def source_sha256(source: DocumentSource) -> str:
+    return source.sha256 if isinstance(source, UploadedPdf) else file_sha256(source)
+
+
+def source_name(source: DocumentSource) -> str:
+    return source.name if isinstance(source, UploadedPdf) else Path(source).name
+
+
+def check_pdf_path(source: DocumentSource) -> None:
+    """Raise for a missing or non-PDF path; uploads are checked when they are read."""
+    if isinstance(source, UploadedPdf):
+        return
+    path = Path(source)
+    if not path.exists():
+        raise FileNotFoundError(f"PDF file not found: {path}")
+    if path.suffix.lower() != ".pdf":
+        raise ValueError(f"Expected a PDF file, got: {path.suffix}")
+
+
+async def read_upload(
+    chunks: AsyncIterator[bytes],
+    name: str,
+    declared_size: int | None = None,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+) -> UploadedPdf:
+    """Stream an upload into a spooled temp file, hashing it and enforcing ``max_bytes`` as it arrives."""
+    if declared_size is not None and declared_size > max_bytes:
+        raise UploadRejected(f"Upload of {declared_size} bytes exceeds the {max_bytes} byte limit.", 413)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            if size == 0 and not chunk.startswith(PDF_MAGIC[: len(chunk)]):
+                raise UploadRejected("Only PDF files are supported for this endpoint.", 415)
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadRejected(f"Upload exceeds the {max_bytes} byte limit.", 413)
+            digest.update(chunk)
+            spool.write(chunk)
+        if size < len(PDF_MAGIC):
+            raise UploadRejected("Only PDF files are supported for this endpoint.", 415)
+    except BaseException:
+        spool.close()
+        raise
+    return UploadedPdf(name=name, data=spooled_bytes(spool), sha256=digest.hexdigest(), _spool=spool)
+
+
+def adopt_spool(spool: Any, name: str, max_bytes: int = MAX_UPLOAD_BYTES) -> UploadedPdf:
+    """Wrap an upload the web framework already spooled (multipart), hashing it in place rather than copying it."""
+    spool.seek(0, os.SEEK_END)
+    size = spool.tell()
+    if size > max_bytes:
+        raise UploadRejected(f"Upload of {size} bytes exceeds the {max_bytes} byte limit.", 413)
+    spool.seek(0)
+    if spool.read(len(PDF_MAGIC)) != PDF_MAGIC:
+        raise UploadRejected("Only PDF files are supported for this endpoint.", 415)
+    spool.seek(0)
+    digest = hashlib.sha256()
+    while chunk := spool.read(UPLOAD_CHUNK_BYTES):
+        digest.update(chunk)
+    return UploadedPdf(name=name, data=spooled_bytes(spool), sha256=digest.hexdigest(), _spool=spool)
+
+
+def spooled_bytes(spool: Any) -> bytes | memoryview:
+    """Contents of a spooled upload: read into memory up to UPLOAD_SPOOL_BYTES, an mmap of its file (no copy) above.
+
+    ``fileno()`` rolls an in-memory spool over to disk, so larger uploads are
+    mapped from a real file whichever spool threshold they arrived under.
+    """
+    spool.flush()
+    size = spool.seek(0, os.SEEK_END)
+    if size <= UPLOAD_SPOOL_BYTES:
+        spool.seek(0)
+        return spool.read()
+    return memoryview(mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ))
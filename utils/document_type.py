@@ -0,0 +1,76 @@
+import fnmatch
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic import BaseModel
+
+from utils.agent_registry import agent_registry, shared_model
+from utils.agent_runner import arun_validation, run_validation
+from utils.document_source import DocumentSource
+from utils.page_selection import PageSelection
+from utils.pdf_to_image import ADAPTIVE, RenderOptions
+from utils.result_store import NOT_INDEXED, IndexedFields
+from utils.stages import agent_scope
+from utils.text_layer import TextExtraction
+from utils.tracing import trace_sampling, tracing_callbacks
+
+
+@dataclass(frozen=True)
+class DocumentType:
+    """Everything that distinguishes one kind of onboarding document.
+
+    A document type declares its schema, prompt, instruction and routing hints;
+    building the agent, caching, rendering, concurrency limits and tracing are
+    handled by the shared engine in ``utils.agent_runner``.
+
+    ``agent_type`` identifies the type in caches, limiter stats and traces;
+    ``slug`` is its URL segment. ``filename_patterns`` are case-insensitive
+    globs used to route dossier files to this type, and ``classifier_keywords``
+    case-insensitive regexes that distinguish its text layer from the others.
+    ``indexed_fields`` names the response fields holding the entity name, GSTIN
+    and IFSC that its stored results are looked up by.
+    """
+
+    agent_type: str
+    slug: str
+    title: str
+    response_format: type[BaseModel]
+    system_prompt: str
+    instruction: str
+    filename_patterns: tuple[str, ...] = ()
+    classifier_keywords: tuple[str, ...] = ()
+    render_options: RenderOptions = ADAPTIVE
+    page_selection: PageSelection | None = None
+    text_extraction: TextExtraction | None = None
+    route_by_modality: bool = False
+    indexed_fields: IndexedFields = NOT_INDEXED
+
+    def get_agent(self) -> Any:
+        return agent_registry.get(self.agent_type, self.response_format, self.system_prompt)
+
+    def matches_filename(self, name: str) -> bool:
+        name = name.lower()
+        return any(fnmatch.fnmatch(name, pattern.lower()) for pattern in self.filename_patterns)
+
+    def _run_kwargs(self) -> dict[str, Any]:
+        return {
+            "agent_type": self.agent_type,
+            "response_format": self.response_format,
+            "system_prompt": self.system_prompt,
+            "instruction": self.instruction,
+            "model": shared_model(),
+            "callbacks": tracing_callbacks(),
+            "render_options": self.render_options,
+            "page_selection": self.page_selection,
+            "text_extraction": self.text_extraction,
+            "route_by_modality": self.route_by_modality,
+            "indexed_fields": self.indexed_fields,
+        }
+
+    def validate(self, document_path: DocumentSource) -> BaseModel:
+        with agent_scope(self.agent_type), trace_sampling():
+            return run_validation(self.get_agent(), document_path, **self._run_kwargs())
+
+    async def avalidate(self, document_path: DocumentSource) -> BaseModel:
+        with agent_scope(self.agent_type), trace_sampling():
+            return await arun_validation(self.get_agent(), document_path, **self._run_kwargs())
@@ -0,0 +1,530 @@
+import asyncio
+import fnmatch
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Awaitable, Callable, Collection
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Literal, Protocol
+from urllib.parse import urlsplit
+
+import httpx
+
+from utils.concurrency import run_in_render_pool
+
+logger = logging.getLogger(__name__)
+
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+FINISHED: tuple[JobStatus, ...] = ("succeeded", "failed")
+
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "memory").lower()
+JOB_QUEUE_PATH = os.getenv(
+    "JOB_QUEUE_PATH",
+    str(Path(__file__).resolve().parent.parent / ".cache" / "jobs.sqlite3"),
+)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Finished jobs are kept this long for polling, then pruned.
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+JOB_UPLOAD_DIR = Path(
+    os.getenv("JOB_UPLOAD_DIR", str(Path(__file__).resolve().parent.parent / ".cache" / "job_uploads"))
+)
+# A running job whose owner has not renewed its lease for this long is re-queued.
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Writers wait this long for another process's lock on the job database instead of failing.
+JOB_QUEUE_BUSY_TIMEOUT_MS = int(os.getenv("JOB_QUEUE_BUSY_TIMEOUT_MS", "5000"))
+# Pause before a worker retries after the queue itself failed (e.g. the database stayed locked).
+JOB_QUEUE_ERROR_BACKOFF_SECONDS = float(os.getenv("JOB_QUEUE_ERROR_BACKOFF_SECONDS", "1"))
+JOB_QUEUE_WRITE_ATTEMPTS = 3
+JOB_WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("JOB_WEBHOOK_TIMEOUT_SECONDS", "10"))
+JOB_WEBHOOK_ATTEMPTS = int(os.getenv("JOB_WEBHOOK_ATTEMPTS", "3"))
+# When set, webhook bodies are signed with HMAC-SHA256 in the X-Signature-SHA256 header.
+JOB_WEBHOOK_SECRET = os.getenv("JOB_WEBHOOK_SECRET", "")
+# Comma-separated hosts webhooks may go to ("*.example.com" patterns allowed). Unset,
+# any host is accepted as long as every address it resolves to is public.
+JOB_WEBHOOK_ALLOWED_HOSTS = tuple(
+    host.strip().lower() for host in os.getenv("JOB_WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()
+)
+
+
+class WebhookRejected(Exception):
+    """A webhook URL the service will not post job results to."""
+
+
+def check_webhook_url(url: str) -> None:
+    """Raise WebhookRejected unless ``url`` is http(s) to an allow-listed host, or to one with only public addresses.
+
+    Resolves the host (blocking), so callers on the event loop run it off the loop.
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or not host:
+        raise WebhookRejected(f"Webhook URL must be http(s) with a host: {url}")
+    if JOB_WEBHOOK_ALLOWED_HOSTS:
+        if not any(fnmatch.fnmatchcase(host, pattern) for pattern in JOB_WEBHOOK_ALLOWED_HOSTS):
+            raise WebhookRejected(f"Webhook host {host} is not in JOB_WEBHOOK_ALLOWED_HOSTS.")
+        return
+    try:
+        infos = socket.getaddrinfo(host, parts.port or (443 if parts.scheme == "https" else 80), type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as exc:
+        raise WebhookRejected(f"Webhook host {host} does not resolve.") from exc
+    for *_, sockaddr in infos:
+        address = ipaddress.ip_address(sockaddr[0].split("%", 1)[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast or address.is_reserved:
+            raise WebhookRejected(f"Webhook host {host} resolves to a non-public address ({address}).")
+
+
+@dataclass
+class Job:
+    """A queued validation: what to run, where it is, and how it ended."""
+
+    id: str
+    request: dict[str, Any]
+    webhook_url: str | None = None
+    status: JobStatus = "queued"
+    result: dict[str, Any] | None = None
+    error: dict[str, Any] | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    attempts: int = 0
+
+    @classmethod
+    def create(cls, request: dict[str, Any], webhook_url: str | None = None) -> "Job":
+        return cls(id=uuid.uuid4().hex, request=request, webhook_url=webhook_url)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class JobQueue(Protocol):
+    """Storage and hand-off of jobs between the API and the workers.
+
+    Every method is a coroutine so that backends doing blocking I/O can run it
+    off the event loop.
+    """
+
+    async def put(self, job: Job) -> None: ...
+
+    async def get(self, job_id: str) -> Job | None: ...
+
+    async def claim(self) -> Job: ...
+
+    async def finish(self, job: Job) -> None: ...
+
+    async def heartbeat(self, job_ids: Collection[str]) -> None: ...
+
+    async def requeue_expired(self) -> int: ...
+
+    async def release(self) -> None: ...
+
+    async def stats(self) -> dict[str, Any]: ...
+
+
+class MemoryJobQueue:
+    """In-process queue; jobs are lost when the server restarts."""
+
+    backend = "memory"
+
+    def __init__(self, retention_seconds: float = JOB_RETENTION_SECONDS) -> None:
+        self.retention_seconds = retention_seconds
+        self._jobs: dict[str, Job] = {}
+        self._pending: asyncio.Queue[str] | None = None
+
+    def _queue(self) -> asyncio.Queue[str]:
+        # Created lazily so it binds to the server's event loop, not the importer's.
+        if self._pending is None:
+            self._pending = asyncio.Queue()
+        return self._pending
+
+    async def put(self, job: Job) -> None:
+        self._prune()
+        self._jobs[job.id] = job
+        self._queue().put_nowait(job.id)
+
+    async def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    async def claim(self) -> Job:
+        while True:
+            job = self._jobs.get(await self._queue().get())
+            if job is not None and job.status == "queued":
+                job.status = "running"
+                job.started_at = time.time()
+                job.attempts += 1
+                return job
+
+    async def finish(self, job: Job) -> None:
+        self._jobs[job.id] = job
+
+    async def heartbeat(self, job_ids: Collection[str]) -> None:
+        pass
+
+    async def requeue_expired(self) -> int:
+        return 0
+
+    async def release(self) -> None:
+        pass
+
+    async def stats(self) -> dict[str, Any]:
+        counts: dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"backend": self.backend, **counts}
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED and (job.finished_at or 0) < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class SQLiteJobQueue:
+    """Durable queue in SQLite; queued jobs survive restarts.
+
+    A claimed job is leased to this queue instance, which renews the lease
+    while it runs (``heartbeat``). Running jobs whose lease has lapsed (their
+    process died) are put back in the queue by a periodic sweep
+    (``requeue_expired``), so a validation is never silently dropped, while jobs
+    another live process is running are left alone. Workers in this process are
+    woken on ``put``; the poll interval covers jobs enqueued by another process
+    sharing the database. SQLite statements run in the render pool, never on
+    the event loop.
+    """
+
+    backend = "sqlite"
+
+    def __init__(
+        self,
+        path: str | Path,
+        retention_seconds: float = JOB_RETENTION_SECONDS,
+        poll_interval_seconds: float = 1.0,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+    ) -> None:
+        self.retention_seconds = retention_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._wakeup: asyncio.Event | None = None
+        db_path = Path(path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        # Several uvicorn workers share the file: WAL keeps pollers from blocking writers.
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(f"PRAGMA busy_timeout={JOB_QUEUE_BUSY_TIMEOUT_MS}")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                finished_at REAL,
+                owner TEXT,
+                lease_expires_at REAL
+            )
+            """
+        )
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in (("owner", "TEXT"), ("lease_expires_at", "REAL")):
+            if column not in columns:
+                self._connection.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+        self._connection.commit()
+
+    def _event(self) -> asyncio.Event:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return self._wakeup
+
+    def _write(self, job: Job) -> None:
+        self._connection.execute(
+            "INSERT OR REPLACE INTO jobs (id, status, payload, created_at, finished_at) VALUES (?, ?, ?, ?, ?)",
+            (job.id, job.status, json.dumps(job.to_dict()), job.created_at, job.finished_at),
+        )
+
+    def _put(self, job: Job) -> None:
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?",
+                (time.time() - self.retention_seconds,),
+            )
+            self._write(job)
+            self._connection.commit()
+
+    async def put(self, job: Job) -> None:
+        await run_in_render_pool(self._put, job)
+        self._event().set()
+
+    def _get(self, job_id: str) -> Job | None:
+        with self._lock:
+            row = self._connection.execute("SELECT status, payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = Job(**json.loads(row[1]))
+        # The status column is authoritative: lease expiry re-queues running jobs without rewriting the payload.
+        job.status = row[0]
+        return job
+
+    async def get(self, job_id: str) -> Job | None:
+        return await run_in_render_pool(self._get, job_id)
+
+    def _claim_next(self) -> Job | None:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, lease_expires_at = ? WHERE id = ("
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ") RETURNING payload",
+                (self.owner, now + self.lease_seconds),
+            ).fetchone()
+            if row is None:
+                # Nothing was claimed; end the implicit read transaction without a write.
+                self._connection.rollback()
+                return None
+            job = Job(**json.loads(row[0]))
+            job.status = "running"
+            job.started_at = time.time()
+            job.attempts += 1
+            self._connection.execute("UPDATE jobs SET payload = ? WHERE id = ?", (json.dumps(job.to_dict()), job.id))
+            self._connection.commit()
+            return job
+
+    async def claim(self) -> Job:
+        wakeup = self._event()
+        while True:
+            job = await run_in_render_pool(self._claim_next)
+            if job is not None:
+                return job
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), self.poll_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def _finish(self, job: Job) -> None:
+        with self._lock:
+            self._write(job)
+            self._connection.commit()
+
+    async def finish(self, job: Job) -> None:
+        await run_in_render_pool(self._finish, job)
+
+    def _heartbeat(self, job_ids: Collection[str]) -> None:
+        if not job_ids:
+            return
+        with self._lock:
+            self._connection.executemany(
+                "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND status = 'running' AND owner = ?",
+                [(time.time() + self.lease_seconds, job_id, self.owner) for job_id in job_ids],
+            )
+            self._connection.commit()
+
+    async def heartbeat(self, job_ids: Collection[str]) -> None:
+        """Renew the lease on the given jobs, the ones this instance's workers are running."""
+        await run_in_render_pool(self._heartbeat, list(job_ids))
+
+    def _requeue_expired(self) -> int:
+        with self._lock:
+            # Jobs from before leases existed have no expiry and count as abandoned.
+            requeued = self._connection.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, lease_expires_at = NULL "
+                "WHERE status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                (time.time(),),
+            ).rowcount
+            self._connection.commit()
+        return requeued
+
+    async def requeue_expired(self) -> int:
+        """Put running jobs whose lease lapsed back in the queue; returns how many."""
+        requeued = await run_in_render_pool(self._requeue_expired)
+        if requeued:
+            self._event().set()
+        return requeued
+
+    def _release(self) -> None:
+        with self._lock:
+            self._connection.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, lease_expires_at = NULL "
+                "WHERE status = 'running' AND owner = ?",
+                (self.owner,),
+            )
+            self._connection.commit()
+
+    async def release(self) -> None:
+        """Hand this instance's running jobs back to the queue at once (on shutdown) rather than at lease expiry."""
+        await run_in_render_pool(self._release)
+
+    def _stats(self) -> dict[str, Any]:
+        with self._lock:
+            rows = self._connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {"backend": self.backend, **dict(rows)}
+
+    async def stats(self) -> dict[str, Any]:
+        return await run_in_render_pool(self._stats)
+
+JobHandler = Callable[[dict[str, Any]], Awaitable[dict[str, Any]]]
+
+
+class JobWorkers:
+    """A fixed number of asyncio workers draining a job queue.
+
+    The handler receives the job's request and returns its JSON result; an
+    exception fails the job, recorded with the ``status_code`` the synchronous
+    endpoint would have returned. Workers run on the server's event loop,
+    independent of the HTTP request that enqueued the job.
+    """
+
+    def __init__(self, queue: JobQueue, handler: JobHandler, concurrency: int = JOB_WORKERS) -> None:
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self._tasks: list[asyncio.Task[None]] = []
+        # Ids of the jobs the workers are running; only their leases are renewed.
+        self._active: set[str] = set()
+        # Webhook deliveries run on their own so a slow endpoint never holds a worker.
+        self._webhooks: set[asyncio.Task[None]] = set()
+        self._heartbeat_task: asyncio.Task[None] | None = None
+        self._client: httpx.AsyncClient | None = None
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._client = httpx.AsyncClient(timeout=JOB_WEBHOOK_TIMEOUT_SECONDS)
+        self._tasks = [asyncio.create_task(self._work(), name=f"job-worker-{n}") for n in range(self.concurrency)]
+        self._heartbeat_task = asyncio.create_task(self._heartbeat(), name="job-lease-heartbeat")
+
+    async def stop(self) -> None:
+        tasks = [*self._tasks, *self._webhooks, *([self._heartbeat_task] if self._heartbeat_task else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._webhooks.clear()
+        self._heartbeat_task = None
+        self._active.clear()
+        await self.queue.release()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _heartbeat(self) -> None:
+        """Renew the running jobs' leases and re-queue jobs whose owner stopped renewing theirs."""
+        while True:
+            try:
+                await self.queue.heartbeat(set(self._active))
+                requeued = await self.queue.requeue_expired()
+                if requeued:
+                    logger.warning("Re-queued %d jobs whose lease expired", requeued)
+            except Exception:
+                logger.exception("Renewing job leases failed")
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                job = await self.queue.claim()
+            except Exception:
+                logger.exception("Claiming a job failed; retrying in %.1fs", JOB_QUEUE_ERROR_BACKOFF_SECONDS)
+                await asyncio.sleep(JOB_QUEUE_ERROR_BACKOFF_SECONDS)
+                continue
+            self._active.add(job.id)
+            try:
+                await self._run(job)
+            finally:
+                self._active.discard(job.id)
+
+    async def _run(self, job: Job) -> None:
+        try:
+            job.result = await self.handler(job.request)
+            job.status = "succeeded"
+        except asyncio.CancelledError:
+            # Shutting down mid-job: stop() hands it back to a durable queue for another run.
+            raise
+        except Exception as exc:
+            job.status = "failed"
+            job.error = {"status_code": getattr(exc, "status_code", 500), "detail": getattr(exc, "detail", str(exc))}
+            logger.warning("Job %s failed: %s", job.id, job.error["detail"])
+        job.finished_at = time.time()
+        for attempt in range(JOB_QUEUE_WRITE_ATTEMPTS):
+            try:
+                await self.queue.finish(job)
+                break
+            except Exception:
+                logger.exception("Recording job %s as %s failed (attempt %d)", job.id, job.status, attempt + 1)
+                await asyncio.sleep(JOB_QUEUE_ERROR_BACKOFF_SECONDS * 2**attempt)
+        else:
+            # Its lease is no longer renewed, so the sweep re-queues it and it runs again.
+            logger.error("Giving up recording job %s; it will be re-run once its lease expires", job.id)
+            return
+        if job.webhook_url:
+            webhook = asyncio.create_task(self.notify(job), name=f"job-webhook-{job.id}")
+            self._webhooks.add(webhook)
+            webhook.add_done_callback(self._webhooks.discard)
+
+    async def notify(self, job: Job) -> None:
+        """POST the finished job to its webhook, retrying with backoff; failures are logged, not raised."""
+        assert self._client is not None
+        body = json.dumps(job.to_dict()).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if JOB_WEBHOOK_SECRET:
+            headers["X-Signature-SHA256"] = hmac.new(JOB_WEBHOOK_SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        try:
+            # Checked again at delivery: the host may resolve elsewhere than when the job was accepted.
+            await run_in_render_pool(check_webhook_url, job.webhook_url)
+        except WebhookRejected as exc:
+            logger.error("Not posting job %s to its webhook: %s", job.id, exc)
+            return
+        for attempt in range(JOB_WEBHOOK_ATTEMPTS):
+            try:
+                response = await self._client.post(job.webhook_url, content=body, headers=headers)
+                if response.status_code < 500:
+                    return
+            except httpx.HTTPError as exc:
+                logger.warning("Webhook for job %s failed: %s", job.id, exc)
+            await asyncio.sleep(2**attempt)
+        logger.error("Giving up on webhook for job %s after %d attempts", job.id, JOB_WEBHOOK_ATTEMPTS)
+
+    async def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.concurrency,
+            # Not "running": the queue's per-status counts below use that key for jobs.
+            "workers_alive": sum(not task.done() for task in self._tasks),
+            "active_jobs": len(self._active),
+            "pending_webhooks": len(self._webhooks),
+            **await self.queue.stats(),
+        }
+
+
+def store_upload(name: str, data: bytes | memoryview, sha256: str) -> Path:
+    """Persist an uploaded PDF so a queued job can read it after the request (or the process) ends."""
+    directory = JOB_UPLOAD_DIR / sha256
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / (Path(name).name or "upload.pdf")
+    if path.suffix.lower() != ".pdf":
+        path = path.with_name(f"{path.name}.pdf")
+    if not path.exists():
+        path.write_bytes(data)
+    return path
+
+
+def _build_default_queue() -> JobQueue:
+    if JOB_QUEUE_BACKEND == "sqlite":
+        return SQLiteJobQueue(JOB_QUEUE_PATH)
+    if JOB_QUEUE_BACKEND != "memory":
+        raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {JOB_QUEUE_BACKEND} (expected 'memory' or 'sqlite')")
+    return MemoryJobQueue()
+
+
+job_queue = _build_default_queue()
@@ -0,0 +1,116 @@
+from typing import Any
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+
+from utils.pdf_to_image import RenderedDocument
+from utils.stages import add_observer, current_agent_type
+
+registry = CollectorRegistry()
+
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+REQUEST_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+PAGE_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+BYTE_BUCKETS = tuple(2**power for power in range(14, 27, 2))  # 16 KiB .. 64 MiB
+
+stage_seconds = Histogram(
+    "vlm_stage_seconds",
+    "Wall time of one pipeline stage: validate_input, open, rasterize, encode, base64, model.",
+    ["stage", "agent_type"],
+    buckets=STAGE_BUCKETS,
+    registry=registry,
+)
+validation_seconds = Histogram(
+    "vlm_validation_seconds",
+    "End-to-end validation time per document, by whether the result cache answered.",
+    ["agent_type", "cache"],
+    buckets=REQUEST_BUCKETS,
+    registry=registry,
+)
+pages_sent = Histogram(
+    "vlm_pages_sent",
+    "Page images sent to the model per vision call.",
+    ["agent_type"],
+    buckets=PAGE_BUCKETS,
+    registry=registry,
+)
+payload_bytes = Histogram(
+    "vlm_payload_bytes",
+    "Base64 image payload per vision call.",
+    ["agent_type"],
+    buckets=BYTE_BUCKETS,
+    registry=registry,
+)
+image_bytes = Counter(
+    "vlm_image_bytes",
+    "Encoded page image bytes sent to the model.",
+    ["agent_type"],
+    registry=registry,
+)
+model_tokens = Counter(
+    "vlm_model_tokens",
+    "Tokens reported by the provider, by direction (input or output).",
+    ["agent_type", "provider", "direction"],
+    registry=registry,
+)
+model_calls = Counter(
+    "vlm_model_calls",
+    "Model calls by provider and outcome (ok or error).",
+    ["agent_type", "provider", "outcome"],
+    registry=registry,
+)
+http_request_seconds = Histogram(
+    "vlm_http_request_seconds",
+    "HTTP request time by route template, method and status.",
+    ["method", "route", "status"],
+    buckets=REQUEST_BUCKETS,
+    registry=registry,
+)
+
+
+def observe_stage(stage: str, agent_type: str, seconds: float) -> None:
+    stage_seconds.labels(stage, agent_type).observe(seconds)
+
+
+add_observer(observe_stage)
+
+
+def observe_render(agent_type: str, rendered: RenderedDocument) -> None:
+    pages_sent.labels(agent_type).observe(len(rendered.encoded_pages))
+    payload_bytes.labels(agent_type).observe(rendered.payload_bytes)
+    image_bytes.labels(agent_type).inc(sum(len(page) for page in rendered.encoded_pages))
+
+
+def observe_validation(agent_type: str, seconds: float, cache_hit: bool) -> None:
+    validation_seconds.labels(agent_type, "hit" if cache_hit else "miss").observe(seconds)
+
+
+def token_usage(result: dict[str, Any]) -> tuple[int, int]:
+    """Input and output tokens summed over the agent's messages (LangChain ``usage_metadata``)."""
+    input_tokens = output_tokens = 0
+    for message in result.get("messages", []):
+        usage = getattr(message, "usage_metadata", None) or {}
+        input_tokens += usage.get("input_tokens", 0)
+        output_tokens += usage.get("output_tokens", 0)
+    return input_tokens, output_tokens
+
+
+def observe_model_call(provider: str, result: dict[str, Any] | None) -> None:
+    agent_type = current_agent_type()
+    if result is None:
+        model_calls.labels(agent_type, provider, "error").inc()
+        return
+    model_calls.labels(agent_type, provider, "ok").inc()
+    input_tokens, output_tokens = token_usage(result)
+    if input_tokens:
+        model_tokens.labels(agent_type, provider, "input").inc(input_tokens)
+    if output_tokens:
+        model_tokens.labels(agent_type, provider, "output").inc(output_tokens)
+
+
+def observe_http_request(method: str, route: str, status: int, seconds: float) -> None:
+    http_request_seconds.labels(method, route, str(status)).observe(seconds)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """The Prometheus text exposition of every metric above, and its content type."""
+    return generate_latest(registry), CONTENT_TYPE_LATEST
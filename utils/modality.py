@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+
+from pydantic import BaseModel
+
+
+@dataclass(frozen=True)
+class Modality:
+    """Marker placed in a schema field's ``Annotated`` metadata to say how it is read.
+
+    Pydantic keeps unknown metadata on the FieldInfo without putting it in the JSON
+    schema, so the marker never reaches the model's structured-output definition.
+    """
+
+    name: str
+
+
+TEXT = Modality("text")
+VISUAL = Modality("visual")
+
+
+def field_modality(response_format: type[BaseModel], name: str) -> Modality:
+    """Modality of one field; fields without a marker are textual."""
+    metadata = response_format.model_fields[name].metadata
+    return next((item for item in metadata if isinstance(item, Modality)), TEXT)
+
@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from utils.agent_registry import MODEL_PROVIDERS, agent_registry, load_model
+from utils.metrics import observe_model_call
+from utils.resilience import CircuitOpen, breaker_state, resilient_caller
+from utils.stages import stage
+
+logger = logging.getLogger(__name__)
+
+# Hedging fires a second request to another provider once the first has run
+# longer than its recent p95 latency. Off by default: it spends extra quota.
+HEDGE_ENABLED = os.getenv("MODEL_HEDGE_ENABLED", "false").lower() in {"1", "true", "yes"}
+HEDGE_QUANTILE = float(os.getenv("MODEL_HEDGE_QUANTILE", "0.95"))
+# Until a provider has this many samples its p95 is a guess; use the fixed delay instead.
+HEDGE_MIN_SAMPLES = int(os.getenv("MODEL_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("MODEL_HEDGE_DEFAULT_DELAY_SECONDS", "20"))
+# Providers failing more often than this over the recent window are tried after healthy ones.
+ROUTER_MAX_ERROR_RATE = float(os.getenv("MODEL_ROUTER_MAX_ERROR_RATE", "0.5"))
+ROUTER_WINDOW = int(os.getenv("MODEL_ROUTER_WINDOW", "200"))
+
+
+class NoStructuredResponse(Exception):
+    """A provider answered without a structured response; the next provider is tried."""
+
+
+class ProviderStats:
+    """Recent latencies of successful calls and outcomes of all calls for one provider."""
+
+    def __init__(self, window: int = ROUTER_WINDOW) -> None:
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.hedges_won = 0
+
+    def record(self, ok: bool, latency: float | None = None) -> None:
+        with self._lock:
+            self._outcomes.append(ok)
+            if ok and latency is not None:
+                self._latencies.append(latency)
+
+    def quantile(self, q: float) -> float | None:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def samples(self) -> int:
+        with self._lock:
+            return len(self._latencies)
+
+    def error_rate(self) -> float:
+        with self._lock:
+            outcomes = list(self._outcomes)
+        return outcomes.count(False) / len(outcomes) if outcomes else 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        p50, p95 = self.quantile(0.5), self.quantile(0.95)
+        return {
+            "samples": self.samples(),
+            "error_rate": round(self.error_rate(), 3),
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "hedges_won": self.hedges_won,
+        }
+
+
+class ModelRouter:
+    """Sends each model call to the best available provider, failing over and optionally hedging.
+
+    Providers are tried in the configured order (``MODEL_PROVIDERS``), except
+    that ones whose circuit breaker is open, or whose recent error rate is over
+    ``ROUTER_MAX_ERROR_RATE``, go to the back. Each attempt runs under that
+    provider's retry/deadline policy; if it still fails, the next provider gets
+    the same agent rebuilt on its model. With hedging on, a slow async call is
+    raced against the next provider once it outlives the primary's p95 latency
+    and the first valid structured response wins.
+    """
+
+    def __init__(self, providers: list[str], hedge_enabled: bool = HEDGE_ENABLED) -> None:
+        self.providers = providers
+        self.hedge_enabled = hedge_enabled
+        self._stats = {provider: ProviderStats() for provider in providers}
+        self._unavailable: dict[str, str] = {}
+        self._hedges = 0
+
+    def ranked(self) -> list[str]:
+        available = [provider for provider in self.providers if provider not in self._unavailable]
+
+        def demoted(provider: str) -> bool:
+            breaker_open = breaker_state(provider) == "open"
+            return breaker_open or self._stats[provider].error_rate() > ROUTER_MAX_ERROR_RATE
+
+        # sorted() is stable, so healthy providers keep their configured order.
+        return sorted(available, key=demoted)
+
+    def hedge_delay(self, provider: str) -> float:
+        stats = self._stats[provider]
+        latency = stats.quantile(HEDGE_QUANTILE)
+        if latency is None or stats.samples() < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY_SECONDS
+        return latency
+
+    def _agent_for(self, provider: str, agent: Any) -> Any | None:
+        """The agent rebuilt on this provider's model, or None if the provider cannot be loaded."""
+        try:
+            model = load_model(provider)
+        except Exception as exc:
+            # Missing SDK or credentials: leave the provider out for the life of the process.
+            self._unavailable[provider] = f"{type(exc).__name__}: {exc}"
+            logger.warning("Model provider %s unavailable: %s", provider, exc)
+            return None
+        return agent_registry.rebind(agent, model)
+
+    @staticmethod
+    def _config(config: dict[str, Any], provider: str) -> dict[str, Any]:
+        return {**config, "metadata": {**config.get("metadata", {}), "provider": provider}}
+
+    def _finish(self, provider: str, started: float, result: Any) -> Any:
+        observe_model_call(provider, result)
+        if result.get("structured_response") is None:
+            self._stats[provider].record(False)
+            raise NoStructuredResponse(f"{provider} returned no structured response.")
+        self._stats[provider].record(True, time.monotonic() - started)
+        return result
+
+    def candidates(self, agent: Any) -> list[tuple[str, Any]]:
+        """(provider, agent on that provider's model) in routing order, skipping providers that cannot load."""
+        loaded = [(provider, self._agent_for(provider, agent)) for provider in self.ranked()]
+        candidates = [(provider, provider_agent) for provider, provider_agent in loaded if provider_agent is not None]
+        if not candidates:
+            raise RuntimeError(f"No model provider could be loaded: {self._unavailable}")
+        return candidates
+
+    def invoke(self, agent: Any, messages: dict[str, Any], config: dict[str, Any]) -> Any:
+        """Sync call with failover; hedging needs the event loop and only applies to ``ainvoke``."""
+        error: Exception | None = None
+        for provider, provider_agent in self.candidates(agent):
+            started = time.monotonic()
+            try:
+                with stage("model"):
+                    result = resilient_caller(provider).call(
+                        lambda: provider_agent.invoke(messages, config=self._config(config, provider))
+                    )
+            except CircuitOpen as exc:
+                # Never reached the provider: not an outcome for its error rate.
+                error = exc
+                continue
+            except Exception as exc:
+                self._stats[provider].record(False)
+                observe_model_call(provider, None)
+                logger.warning("Model provider %s failed (%s); failing over", provider, exc)
+                error = exc
+                continue
+            try:
+                return self._finish(provider, started, result)
+            except NoStructuredResponse as exc:
+                error = exc
+        raise error
+
+    async def _attempt(self, provider: str, provider_agent: Any, messages: dict[str, Any], config: dict[str, Any]) -> Any:
+        started = time.monotonic()
+        try:
+            with stage("model"):
+                result = await resilient_caller(provider).acall(
+                    lambda: provider_agent.ainvoke(messages, config=self._config(config, provider))
+                )
+        except CircuitOpen:
+            # Never reached the provider: not an outcome for its error rate.
+            raise
+        except Exception:
+            self._stats[provider].record(False)
+            observe_model_call(provider, None)
+            raise
+        return self._finish(provider, started, result)
+
+    async def ainvoke(self, agent: Any, messages: dict[str, Any], config: dict[str, Any]) -> Any:
+        candidates = self.candidates(agent)
+        error: BaseException | None = None
+        while candidates:
+            primary, primary_agent = candidates.pop(0)
+            running = {asyncio.ensure_future(self._attempt(primary, primary_agent, messages, config)): primary}
+            hedge_after = self.hedge_delay(primary) if self.hedge_enabled and candidates else None
+            try:
+                while running:
+                    done, _ = await asyncio.wait(running, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        hedge, hedge_agent = candidates.pop(0)
+                        self._hedges += 1
+                        logger.info("%s slower than %.1fs; hedging with %s", primary, hedge_after, hedge)
+                        running[asyncio.ensure_future(self._attempt(hedge, hedge_agent, messages, config))] = hedge
+                        hedge_after = None
+                        continue
+                    for task in done:
+                        provider = running.pop(task)
+                        if task.exception() is None:
+                            if provider != primary:
+                                self._stats[provider].hedges_won += 1
+                            return task.result()
+                        error = task.exception()
+                        logger.warning("Model provider %s failed (%s); failing over", provider, error)
+                    # The primary failed before the hedge timer: fail over straight away.
+                    hedge_after = None
+            finally:
+                # Losing hedges are cancelled; the resilience layer releases a cancelled
+                # breaker probe and records no outcome for it, so this is breaker-safe.
+                for task in running:
+                    task.cancel()
+        raise error
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "providers": self.providers,
+            "order": self.ranked(),
+            "hedge_enabled": self.hedge_enabled,
+            "hedges": self._hedges,
+            "unavailable": dict(self._unavailable),
+            "latency": {provider: stats.snapshot() for provider, stats in self._stats.items()},
+        }
+
+
+model_router = ModelRouter(MODEL_PROVIDERS)
+
+
+def invoke_agent(agent: Any, messages: dict[str, Any], config: dict[str, Any]) -> Any:
+    return model_router.invoke(agent, messages, config)
+
+
+async def ainvoke_agent(agent: Any, messages: dict[str, Any], config: dict[str, Any]) -> Any:
+    return await model_router.ainvoke(agent, messages, config)
@@ -0,0 +1,189 @@
+import functools
+import time
+from typing import Any
+
+from pydantic import BaseModel, Field, create_model
+
+from utils.agent_registry import agent_registry, shared_model
+from utils.agent_runner import build_config, build_messages, pipeline_key
+from utils.concurrency import model_call_limiter, run_in_render_pool
+from utils.document_type import DocumentType
+from utils.metrics import observe_render, observe_validation
+from utils.model_router import ainvoke_agent, invoke_agent
+from utils.page_selection import PageSelection
+from utils.pdf_to_image import render_pdf
+from utils.document_source import DocumentSource, source_name, source_sha256
+from utils.result_cache import ResultCache, describe_model, result_cache
+from utils.result_store import ResultStore, result_store
+from utils.single_flight import single_flight
+from utils.stages import agent_scope
+from utils.tracing import trace_sampling, tracing_callbacks
+
+
+class MultiExtraction:
+    """Several document types read from one PDF with a single vision call.
+
+    The schemas are composed into one Pydantic model with a field per agent
+    type, the union of the types' page selections is rendered once, and the
+    structured response is split back into each type's own response model.
+    Text-layer fast paths and modality routing are per-type optimizations and
+    are not applied here; the first type's render options are used.
+    """
+
+    def __init__(self, document_types: list[DocumentType]) -> None:
+        if len(document_types) < 2:
+            raise ValueError("Multi-schema extraction needs at least two document types.")
+        if len({document_type.agent_type for document_type in document_types}) != len(document_types):
+            raise ValueError("Document types must be distinct.")
+        self.document_types = document_types
+        self.agent_type = "+".join(document_type.agent_type for document_type in document_types)
+        self.response_format = composite_schema(
+            tuple((document_type.agent_type, document_type.response_format, document_type.title) for document_type in document_types)
+        )
+        self.system_prompt = composite_prompt(document_types)
+        self.instruction = (
+            "Extract every section of the structured response from this document: "
+            + "; ".join(f"{document_type.agent_type} ({document_type.title})" for document_type in document_types)
+            + "."
+        )
+        self.render_options = document_types[0].render_options
+        self.page_selection = merged_page_selection(document_types)
+
+    def get_agent(self) -> Any:
+        return agent_registry.get(self.agent_type, self.response_format, self.system_prompt)
+
+    def cache_key(self, document_path: DocumentSource, file_hash: str, cache: ResultCache) -> str:
+        return cache.build_key(
+            document_path,
+            agent_type=self.agent_type,
+            response_format=self.response_format,
+            system_prompt=self.system_prompt,
+            model_name=describe_model(shared_model()),
+            render_key=pipeline_key(self.render_options, self.page_selection, None, False),
+            file_hash=file_hash,
+        )
+
+    def split(self, response: BaseModel) -> dict[str, BaseModel]:
+        return {document_type.slug: getattr(response, document_type.agent_type) for document_type in self.document_types}
+
+    def record(self, store: ResultStore, document_path: DocumentSource, file_hash: str, response: BaseModel, started: float) -> None:
+        """Store each section under its own agent type, as if it had been validated on its own."""
+        latency_seconds = time.perf_counter() - started
+        for document_type in self.document_types:
+            store.try_record(
+                document_hash=file_hash,
+                document_name=source_name(document_path),
+                agent_type=document_type.agent_type,
+                model_name=describe_model(shared_model()),
+                response=getattr(response, document_type.agent_type),
+                latency_seconds=latency_seconds,
+                indexed_fields=document_type.indexed_fields,
+            )
+
+    def validate(
+        self,
+        document_path: DocumentSource,
+        cache: ResultCache = result_cache,
+        store: ResultStore = result_store,
+    ) -> dict[str, BaseModel]:
+        started = time.perf_counter()
+        file_hash = source_sha256(document_path)
+        cache_key = self.cache_key(document_path, file_hash, cache)
+        response = cache.get(cache_key, self.response_format)
+        if response is not None:
+            observe_validation(self.agent_type, time.perf_counter() - started, cache_hit=True)
+            return self.split(response)
+
+        def compute() -> BaseModel:
+            rendered = render_pdf(document_path, self.render_options, self.page_selection, file_hash=file_hash)
+            observe_render(self.agent_type, rendered)
+            result = invoke_agent(
+                self.get_agent(),
+                build_messages(self.instruction, rendered.iter_image_parts()),
+                config=build_config(document_path, self.agent_type, tracing_callbacks(), rendered),
+            )
+            response = result["structured_response"]
+            cache.put(cache_key, self.agent_type, response)
+            self.record(store, document_path, file_hash, response, started)
+            return response
+
+        with agent_scope(self.agent_type), trace_sampling():
+            response = single_flight.run_sync(cache_key, compute)
+        observe_validation(self.agent_type, time.perf_counter() - started, cache_hit=False)
+        return self.split(response)
+
+    async def avalidate(
+        self,
+        document_path: DocumentSource,
+        cache: ResultCache = result_cache,
+        store: ResultStore = result_store,
+    ) -> dict[str, BaseModel]:
+        started = time.perf_counter()
+        file_hash = await run_in_render_pool(source_sha256, document_path)
+        cache_key = self.cache_key(document_path, file_hash, cache)
+        response = await run_in_render_pool(cache.get, cache_key, self.response_format)
+        if response is not None:
+            observe_validation(self.agent_type, time.perf_counter() - started, cache_hit=True)
+            return self.split(response)
+
+        async def compute() -> BaseModel:
+            rendered = await run_in_render_pool(
+                render_pdf, document_path, self.render_options, self.page_selection, file_hash=file_hash
+            )
+            observe_render(self.agent_type, rendered)
+            async with model_call_limiter.slot(self.agent_type):
+                result = await ainvoke_agent(
+                    self.get_agent(),
+                    build_messages(self.instruction, rendered.iter_image_parts()),
+                    config=build_config(document_path, self.agent_type, tracing_callbacks(), rendered),
+                )
+            response = result["structured_response"]
+            await run_in_render_pool(cache.put, cache_key, self.agent_type, response)
+            await run_in_render_pool(self.record, store, document_path, file_hash, response, started)
+            return response
+
+        with agent_scope(self.agent_type), trace_sampling():
+            response = await single_flight.run(cache_key, compute)
+        observe_validation(self.agent_type, time.perf_counter() - started, cache_hit=False)
+        return self.split(response)
+
+
+@functools.lru_cache(maxsize=None)
+def composite_schema(sections: tuple[tuple[str, type[BaseModel], str], ...]) -> type[BaseModel]:
+    """One model with a field per (agent type, response model, title) section."""
+    return create_model(
+        "".join(response_format.__name__ for _, response_format, _ in sections),
+        **{
+            agent_type: (response_format, Field(description=f"Details read as a {title}."))
+            for agent_type, response_format, title in sections
+        },
+    )
+
+
+def composite_prompt(document_types: list[DocumentType]) -> str:
+    sections = "\n\n".join(
+        f"# Section `{document_type.agent_type}`: {document_type.title}\n\n{document_type.system_prompt.strip()}"
+        for document_type in document_types
+    )
+    return (
+        "You read one document and fill several independent sections of the structured response. "
+        "Each section below has its own extraction rules; apply each section's rules only to that section, "
+        "reading the same document for all of them.\n\n"
+        f"{sections}"
+    )
+
+
+def merged_page_selection(document_types: list[DocumentType]) -> PageSelection | None:
+    """Union of the types' keywords; any type that needs every page makes the union every page."""
+    selections = [document_type.page_selection for document_type in document_types]
+    if any(selection is None for selection in selections):
+        return None
+    keywords = tuple(dict.fromkeys(keyword for selection in selections for keyword in selection.keywords))
+    return PageSelection(keywords=keywords, top_k=max(selection.top_k for selection in selections))
+
+
+async def avalidate_many(document_path: DocumentSource, document_types: list[DocumentType]) -> dict[str, BaseModel]:
+    """One call for all types when there are several, otherwise the type's own pipeline."""
+    if len(document_types) == 1:
+        return {document_types[0].slug: await document_types[0].avalidate(document_path)}
+    return await MultiExtraction(document_types).avalidate(document_path)
@@ -0,0 +1,126 @@
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any
+
+
+class PageCache:
+    """On-disk cache of encoded page images, shared by every worker process.
+
+    Each entry is one file named after the hash of (file hash, page index, DPI,
+    format, quality). Hits are served through a read-only ``mmap`` so concurrent
+    uvicorn workers share the OS page cache instead of holding private copies.
+    Recency is tracked through file mtimes, which lets eviction by total bytes
+    work across processes without a coordinator.
+    """
+
+    def __init__(self, directory: str | Path | None, max_bytes: int = 512 * 1024 * 1024) -> None:
+        self.directory = Path(directory) if directory is not None else None
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approx_bytes: int | None = None
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    @staticmethod
+    def build_key(file_hash: str, page_index: int, dpi: int, image_format: str, quality: int) -> str:
+        raw = f"{file_hash}:{page_index}:{dpi}:{image_format}:{quality}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        assert self.directory is not None
+        return self.directory / f"{key}.bin"
+
+    def get(self, key: str) -> memoryview | None:
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as handle:
+                mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path)
+        except (FileNotFoundError, ValueError, OSError):
+            with self._lock:
+                self._counters["misses"] += 1
+            return None
+        with self._lock:
+            self._counters["hits"] += 1
+        return memoryview(mapped)
+
+    def put(self, key: str, data: bytes) -> None:
+        if self.directory is None:
+            return
+        path = self._path(key)
+        descriptor, temp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as handle:
+            handle.write(data)
+        os.replace(temp_name, path)
+        with self._lock:
+            self._counters["stores"] += 1
+            if self._approx_bytes is None:
+                self._approx_bytes = self._scan_bytes()
+            else:
+                self._approx_bytes += len(data)
+            if self._approx_bytes > self.max_bytes:
+                self._evict()
+
+    def _scan_bytes(self) -> int:
+        assert self.directory is not None
+        return sum(entry.stat().st_size for entry in self.directory.glob("*.bin"))
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache is back under 90% of max_bytes."""
+        assert self.directory is not None
+        entries = []
+        for entry in self.directory.glob("*.bin"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, entry in entries:
+            if total <= target:
+                break
+            try:
+                entry.unlink()
+            except OSError:
+                # Another worker removed it, or (on Windows) it is still mapped.
+                continue
+            total -= size
+            self._counters["evictions"] += 1
+        self._approx_bytes = total
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "max_bytes": self.max_bytes,
+                "approx_bytes": self._approx_bytes,
+                **self._counters,
+            }
+
+
+def _build_default_cache() -> PageCache:
+    enabled = os.getenv("PAGE_CACHE_ENABLED", "true").lower() not in {"0", "false", "no"}
+    directory = os.getenv(
+        "PAGE_CACHE_DIR",
+        str(Path(__file__).resolve().parent.parent / ".cache" / "pages"),
+    )
+    return PageCache(
+        directory=directory if enabled else None,
+        max_bytes=int(os.getenv("PAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024))),
+    )
+
+
+page_cache = _build_default_cache()
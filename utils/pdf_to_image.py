@@ -1,38 +1,452 @@
 import base64
+import json
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
 from io import BytesIO
-from pathlib import Path
+from typing import Iterator, Literal
 
 import fitz  # PyMuPDF
 from PIL import Image
 
+from utils.page_cache import PageCache, page_cache
+from utils.page_selection import PageSelection, select_pages
+from utils.document_source import DocumentSource, check_pdf_path, open_pdf, source_name, source_sha256
+from utils.stages import observe, record_stages, stage
 
-def image_to_base64(image: Image.Image) -> str:
-    """Convert a PIL image to base64 encoded JPEG."""
+logger = logging.getLogger(__name__)
+
+ImageFormat = Literal["jpeg", "webp", "png-gray"]
+
+# Below this many pages to render, process-pool start-up and pickling cost more
+# than rendering on the calling thread.
+PARALLEL_RENDER_MIN_PAGES = int(os.getenv("PARALLEL_RENDER_MIN_PAGES", "6"))
+# Every uvicorn worker has its own pool, so by default they split the cores
+# between them (uvicorn takes its worker count from WEB_CONCURRENCY).
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+RENDER_PROCESSES = int(os.getenv("RENDER_PROCESSES", str(max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY))))
+# Cap on the base64 image payload (and so on the page images held in memory) of
+# one validation request; 0 disables it. Defaults to Gemini's 20 MB inline limit.
+# Only render options that opt in (the request-path presets) carry it.
+RENDER_MAX_PAYLOAD_BYTES = int(os.getenv("RENDER_MAX_PAYLOAD_BYTES", "20000000"))
+REQUEST_PAYLOAD_BUDGET = RENDER_MAX_PAYLOAD_BYTES or None
+
+MIME_TYPES: dict[str, str] = {
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "png-gray": "image/png",
+}
+
+
+@dataclass(frozen=True)
+class RenderOptions:
+    """How PDF pages are rasterized for the VLM.
+
+    With ``dpi`` set, every page is rendered at that resolution (the legacy
+    behaviour). With ``dpi=None`` the resolution is picked per page from its
+    physical size so that the longest edge stays within ``max_long_edge`` pixels
+    and the whole document within ``max_total_pixels``, never exceeding
+    ``max_dpi`` or dropping below ``min_dpi``.
+
+    ``max_payload_bytes``, unbounded unless set, caps the base64 payload of one
+    document: a page larger than its share of what is left is re-rendered at a
+    lower DPI (not below ``min_dpi``), and once a page does not fit in what is
+    left even at ``min_dpi``, it and every later page are dropped. The first
+    page is always kept. ``ADAPTIVE`` and the document types' own options set
+    it to ``REQUEST_PAYLOAD_BUDGET``; ``FIXED_300_DPI`` leaves it unbounded.
+    """
+
+    dpi: int | None = 300
+    max_long_edge: int = 2000
+    max_total_pixels: int = 16_000_000
+    min_dpi: int = 100
+    max_dpi: int = 300
+    image_format: ImageFormat = "jpeg"
+    quality: int = 75
+    max_payload_bytes: int | None = None
+
+    def cache_key(self) -> str:
+        return json.dumps(asdict(self), sort_keys=True)
+
+
+FIXED_300_DPI = RenderOptions()
+ADAPTIVE = RenderOptions(dpi=None, quality=80, max_payload_bytes=REQUEST_PAYLOAD_BUDGET)
+
+
+@dataclass
+class RenderedDocument:
+    """Encoded pages of one PDF; base64 image parts are only built when first requested."""
+
+    mime_type: str = "image/jpeg"
+    encoded_pages: list[bytes | memoryview] = field(default_factory=list)
+    page_numbers: list[int] = field(default_factory=list)
+    total_pages: int = 0
+    page_dpis: list[int] = field(default_factory=list)
+    page_sizes: list[tuple[int, int]] = field(default_factory=list)
+    dropped_pages: list[int] = field(default_factory=list)
+    _image_parts: list[dict[str, str]] | None = field(default=None, repr=False)
+
+    @property
+    def payload_bytes(self) -> int:
+        """Size of the base64 payload, computed without encoding it."""
+        return sum(base64_size(page) for page in self.encoded_pages)
+
+    @property
+    def image_parts(self) -> list[dict[str, str]]:
+        if self._image_parts is None:
+            self._image_parts = list(self.iter_image_parts())
+        return self._image_parts
+
+    def iter_image_parts(self) -> Iterator[dict[str, str]]:
+        """Yield base64 image parts one page at a time, without keeping them on the document.
+
+        The encoded pages stay alive until the document is dropped, so this does
+        not lower peak memory much: rendering dominates it, and the payload
+        budget (``max_payload_bytes``) is what bounds it.
+        """
+        if self._image_parts is not None:
+            yield from self._image_parts
+            return
+        for page in self.encoded_pages:
+            with stage("base64"):
+                data = base64.b64encode(page).decode("ascii")
+            yield {"type": "image", "source_type": "base64", "data": data, "mime_type": self.mime_type}
+
+
+def base64_size(encoded: bytes | memoryview) -> int:
+    return 4 * math.ceil(len(encoded) / 3)
+
+
+def encode_image(image: Image.Image, image_format: ImageFormat = "jpeg", quality: int = 75) -> bytes:
+    """Encode a PIL image as JPEG, WebP or grayscale PNG, converting only when the mode differs."""
     buffer = BytesIO()
-    image.convert("RGB").save(buffer, format="JPEG")
-    return base64.b64encode(buffer.getvalue()).decode("utf-8")
-
-
-def pdf_to_base64_image_parts(pdf_path: str | Path, dpi: int = 300) -> list[dict[str, str]]:
-    """Convert all pages of a PDF into LangChain-compatible base64 image parts."""
-    input_path = Path(pdf_path)
-    if not input_path.exists():
-        raise FileNotFoundError(f"PDF file not found: {input_path}")
-    if input_path.suffix.lower() != ".pdf":
-        raise ValueError(f"Expected a PDF file, got: {input_path.suffix}")
-
-    image_parts: list[dict[str, str]] = []
-    with fitz.open(input_path) as document:
-        for page in document:
-            pixmap = page.get_pixmap(dpi=dpi)
-            image = Image.frombytes("RGB", [pixmap.width, pixmap.height], pixmap.samples)
-            image_parts.append(
-                {
-                    "type": "image",
-                    "source_type": "base64",
-                    "data": image_to_base64(image),
-                    "mime_type": "image/jpeg",
-                }
-            )
-
-    return image_parts
\ No newline at end of file
+    if image_format == "png-gray":
+        (image if image.mode == "L" else image.convert("L")).save(buffer, format="PNG", optimize=True)
+    else:
+        image = image if image.mode == "RGB" else image.convert("RGB")
+        image.save(buffer, format="WEBP" if image_format == "webp" else "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def image_to_base64(image: Image.Image, image_format: ImageFormat = "jpeg", quality: int = 75) -> str:
+    """Convert a PIL image to a base64 encoded JPEG, WebP or grayscale PNG."""
+    return base64.b64encode(encode_image(image, image_format, quality)).decode("utf-8")
+
+
+def page_dpi(page: fitz.Page, options: RenderOptions, page_pixel_budget: float) -> int:
+    """Pick a DPI for one page under the long-edge and pixel-budget caps."""
+    if options.dpi is not None:
+        return options.dpi
+
+    width_in = page.rect.width / 72
+    height_in = page.rect.height / 72
+    dpi_for_edge = options.max_long_edge / max(width_in, height_in)
+    dpi_for_budget = math.sqrt(page_pixel_budget / (width_in * height_in))
+    dpi = min(options.max_dpi, dpi_for_edge, dpi_for_budget)
+    return max(options.min_dpi, int(dpi))
+
+
+def page_pixel_size(page: fitz.Page, dpi: int) -> tuple[int, int]:
+    """Pixel size ``get_pixmap(dpi=dpi)`` produces for a page, without rendering it."""
+    rect = (page.rect * fitz.Matrix(dpi / 72, dpi / 72)).irect
+    return rect.width, rect.height
+
+
+def render_page(page: fitz.Page, dpi: int, image_format: ImageFormat, quality: int) -> bytes:
+    """Rasterize and encode one page.
+
+    JPEG and PNG are encoded natively by MuPDF straight from the pixmap. WebP,
+    which MuPDF cannot write, goes through a PIL image that borrows the pixmap's
+    sample buffer instead of copying it.
+    """
+    colorspace = fitz.csGRAY if image_format == "png-gray" else fitz.csRGB
+    with stage("rasterize"):
+        pixmap = page.get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False)
+    try:
+        with stage("encode"):
+            if image_format == "jpeg":
+                return pixmap.tobytes("jpeg", jpg_quality=quality)
+            if image_format == "png-gray":
+                return pixmap.tobytes("png")
+            image = Image.frombuffer("RGB", (pixmap.width, pixmap.height), pixmap.samples_mv, "raw", "RGB", pixmap.stride, 1)
+            try:
+                return encode_image(image, image_format, quality)
+            finally:
+                image.close()
+    finally:
+        # Free the raw samples now rather than whenever the frame is collected.
+        del pixmap
+
+
+def fit_page(page: fitz.Page, dpi: int, size: int, budget: int, options: RenderOptions) -> tuple[bytes, int] | None:
+    """Re-render a page whose ``size``-byte payload overruns ``budget``, at the DPI that should fit.
+
+    Payload scales roughly with pixel count, so the DPI shrinks with the square
+    root of the overrun. Returns (encoded, dpi), or None when no DPI from
+    ``min_dpi`` up fits.
+    """
+    while budget > 0:
+        dpi = int(dpi * math.sqrt(budget / size) * 0.9)
+        if dpi < options.min_dpi:
+            return None
+        encoded = render_page(page, dpi, options.image_format, options.quality)
+        size = base64_size(encoded)
+        if size <= budget:
+            return encoded, dpi
+    return None
+
+
+def _render_pages_in_worker(
+    pdf_path: DocumentSource,
+    jobs: list[tuple[int, int]],
+    image_format: ImageFormat,
+    quality: int,
+) -> tuple[list[bytes], list[tuple[str, float]]]:
+    """Process-pool entry point: open the PDF locally and render (page, dpi) jobs in order.
+
+    The worker's stage observations are returned alongside the pages so the
+    parent can credit them to the request (and metrics) that asked for the render.
+    """
+    with record_stages() as timings, open_pdf(pdf_path) as document:
+        pages = [render_page(document[page_number], dpi, image_format, quality) for page_number, dpi in jobs]
+    return pages, timings.observations
+
+
+_process_pool: ProcessPoolExecutor | None = None
+
+
+def render_process_pool() -> ProcessPoolExecutor:
+    """Pool started from a clean forkserver (spawn where unavailable), never forked.
+
+    The pool is created from request threads; forking a threaded process can
+    copy a lock another thread holds (logging, PyMuPDF, the page cache) into a
+    child that then deadlocks on it.
+    """
+    global _process_pool
+    if _process_pool is None:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _process_pool = ProcessPoolExecutor(max_workers=RENDER_PROCESSES, mp_context=multiprocessing.get_context(method))
+    return _process_pool
+
+
+def render_jobs_in_parallel(
+    pdf_path: DocumentSource,
+    jobs: list[tuple[int, int]],
+    options: RenderOptions,
+) -> list[bytes]:
+    """Split (page, dpi) jobs into contiguous chunks, one per worker, preserving page order."""
+    chunk_count = min(RENDER_PROCESSES, len(jobs))
+    chunk_size = math.ceil(len(jobs) / chunk_count)
+    chunks = [jobs[index : index + chunk_size] for index in range(0, len(jobs), chunk_size)]
+    pool = render_process_pool()
+    futures = [
+        pool.submit(_render_pages_in_worker, pdf_path, chunk, options.image_format, options.quality)
+        for chunk in chunks
+    ]
+    encoded_pages = []
+    for future in futures:
+        pages, observations = future.result()
+        encoded_pages.extend(pages)
+        for name, seconds in observations:
+            observe(name, seconds)
+    return encoded_pages
+
+
+class RenderWindow:
+    """Cache misses rendered in the process pool one page per task, at most ``RENDER_PROCESSES`` in flight.
+
+    Used when a payload budget applies, so pages are dispatched only as the
+    budget leaves room for them rather than all up front.
+    """
+
+    def __init__(self, pdf_path: DocumentSource, options: RenderOptions) -> None:
+        self.pdf_path = pdf_path
+        self.options = options
+        self.pool = render_process_pool()
+        self.futures: dict[int, Future] = {}
+
+    @property
+    def full(self) -> bool:
+        return len(self.futures) >= RENDER_PROCESSES
+
+    def submit(self, slot: int, page_number: int, dpi: int) -> None:
+        self.futures[slot] = self.pool.submit(
+            _render_pages_in_worker, self.pdf_path, [(page_number, dpi)], self.options.image_format, self.options.quality
+        )
+
+    def take(self, slot: int) -> bytes:
+        pages, observations = self.futures.pop(slot).result()
+        for name, seconds in observations:
+            observe(name, seconds)
+        return pages[0]
+
+    def cancel(self) -> None:
+        """Drop pages that are no longer wanted; a page a worker already started is finished and discarded."""
+        for future in self.futures.values():
+            future.cancel()
+        self.futures.clear()
+
+
+def render_pdf(
+    pdf_path: DocumentSource,
+    options: RenderOptions = FIXED_300_DPI,
+    selection: PageSelection | None = None,
+    cache: PageCache = page_cache,
+    file_hash: str | None = None,
+    parallel: bool | None = None,
+) -> RenderedDocument:
+    """Rasterize a PDF into encoded page images and report payload size.
+
+    When ``selection`` is given, only the pages it picks are rendered. Encoded
+    pages are looked up in (and written to) the shared on-disk page cache. Cache
+    misses are rendered in a process pool when ``parallel`` is True, or when it
+    is None and there are at least ``PARALLEL_RENDER_MIN_PAGES`` of them, and
+    otherwise one at a time on the calling thread.
+
+    Under a payload budget (``options.max_payload_bytes``) pages are rendered
+    and checked against it in order, and a page is only dispatched to the pool
+    while the budget, less what the pages before it are expected to take, has
+    room for it; pages dropped for the budget are never rendered and are listed
+    in ``dropped_pages``. Without a budget every miss is rendered at once.
+    """
+    check_pdf_path(pdf_path)
+    rendered = RenderedDocument(mime_type=MIME_TYPES[options.image_format])
+    if cache.enabled and file_hash is None:
+        file_hash = source_sha256(pdf_path)
+    with open_pdf(pdf_path) as document:
+        rendered.total_pages = document.page_count
+        page_numbers = select_pages(document, selection, source=source_name(pdf_path))
+        page_pixel_budget = options.max_total_pixels / max(1, len(page_numbers))
+
+        encoded_pages: list[bytes | memoryview | None] = []
+        misses: list[int] = []
+        cache_keys: list[str] = []
+        for page_number in page_numbers:
+            page = document[page_number]
+            dpi = page_dpi(page, options, page_pixel_budget)
+            cache_key = ""
+            encoded = None
+            if cache.enabled:
+                cache_key = cache.build_key(file_hash, page_number, dpi, options.image_format, options.quality)
+                encoded = cache.get(cache_key)
+            if encoded is None:
+                misses.append(len(encoded_pages))
+            encoded_pages.append(encoded)
+            cache_keys.append(cache_key)
+            rendered.page_numbers.append(page_number)
+            rendered.page_dpis.append(dpi)
+            rendered.page_sizes.append(page_pixel_size(page, dpi))
+
+        def set_dpi(slot: int, page: fitz.Page, dpi: int) -> None:
+            rendered.page_dpis[slot] = dpi
+            rendered.page_sizes[slot] = page_pixel_size(page, dpi)
+            if cache.enabled:
+                cache_keys[slot] = cache.build_key(file_hash, page.number, dpi, options.image_format, options.quality)
+
+        budget = options.max_payload_bytes
+        # Once a page had to be downsampled, later pages start at that DPI instead of rendering twice.
+        dpi_ceiling: int | None = None
+        use_pool = parallel if parallel is not None else len(misses) >= PARALLEL_RENDER_MIN_PAGES
+        pooled = None
+        window = None
+        if use_pool and len(misses) > 1 and RENDER_PROCESSES > 1:
+            if budget is None:
+                # Nothing can be dropped, so every miss is rendered at once.
+                jobs = [(rendered.page_numbers[slot], rendered.page_dpis[slot]) for slot in misses]
+                pooled = iter(render_jobs_in_parallel(pdf_path, jobs, options))
+            else:
+                window = RenderWindow(pdf_path, options)
+        # Payload per pixel of the pages rendered so far, to estimate the pages still in flight.
+        pixels_rendered = bytes_rendered = 0
+        dispatched = 0
+
+        def expected_size(slot: int) -> int:
+            if encoded_pages[slot] is not None:
+                return base64_size(encoded_pages[slot])
+            width, height = rendered.page_sizes[slot]
+            return bytes_rendered * width * height // pixels_rendered
+
+        def dispatch(current: int) -> None:
+            """Keep the pool busy with the next misses while the budget left has room for them."""
+            nonlocal dispatched
+            while dispatched < len(misses) and not window.full:
+                slot = misses[dispatched]
+                if slot > current and pixels_rendered and sum(map(expected_size, range(current, slot))) >= budget:
+                    return
+                if dpi_ceiling is not None and dpi_ceiling < rendered.page_dpis[slot]:
+                    set_dpi(slot, document[rendered.page_numbers[slot]], dpi_ceiling)
+                window.submit(slot, rendered.page_numbers[slot], rendered.page_dpis[slot])
+                dispatched += 1
+
+        try:
+            for slot, encoded in enumerate(encoded_pages):
+                if slot > 0 and budget is not None and budget <= 0:
+                    del encoded_pages[slot:]
+                    break
+                page = document[rendered.page_numbers[slot]]
+                rendered_now = encoded is None
+                if rendered_now and pooled is not None:
+                    encoded = next(pooled)
+                elif rendered_now and window is not None:
+                    dispatch(slot)
+                    encoded = window.take(slot)
+                elif rendered_now:
+                    if dpi_ceiling is not None and dpi_ceiling < rendered.page_dpis[slot]:
+                        set_dpi(slot, page, dpi_ceiling)
+                    encoded = render_page(page, rendered.page_dpis[slot], options.image_format, options.quality)
+                if rendered_now:
+                    width, height = rendered.page_sizes[slot]
+                    pixels_rendered += width * height
+                    bytes_rendered += base64_size(encoded)
+                size = base64_size(encoded)
+                # Each page gets a fair share of what is left, so early pages cannot crowd out later ones.
+                share = budget // (len(encoded_pages) - slot) if budget is not None else None
+                if share is not None and size > share:
+                    fitted = fit_page(page, rendered.page_dpis[slot], size, share, options)
+                    if fitted is None:
+                        # Over its share even at min_dpi: still send it if the budget as a whole allows.
+                        # The first page always goes, so the model is never sent nothing.
+                        smallest = render_page(page, options.min_dpi, options.image_format, options.quality)
+                        if slot > 0 and base64_size(smallest) > budget:
+                            del encoded_pages[slot:]
+                            break
+                        fitted = smallest, options.min_dpi
+                    encoded, dpi = fitted
+                    rendered_now = True
+                    size = base64_size(encoded)
+                    set_dpi(slot, page, dpi)
+                    dpi_ceiling = dpi
+                if rendered_now and cache.enabled:
+                    cache.put(cache_keys[slot], encoded)
+                encoded_pages[slot] = encoded
+                if budget is not None:
+                    budget -= size
+        finally:
+            if window is not None:
+                window.cancel()
+
+    kept = len(encoded_pages)
+    if kept < len(rendered.page_numbers):
+        rendered.dropped_pages = rendered.page_numbers[kept:]
+        logger.warning(
+            "%s: payload budget of %s bytes reached; dropped pages %s",
+            source_name(pdf_path),
+            options.max_payload_bytes,
+            [number + 1 for number in rendered.dropped_pages],
+        )
+        del rendered.page_numbers[kept:], rendered.page_dpis[kept:], rendered.page_sizes[kept:]
+    rendered.encoded_pages = encoded_pages
+    return rendered
+
+
+def pdf_to_base64_image_parts(
+    pdf_path: DocumentSource,
+    dpi: int = 300,
+    options: RenderOptions | None = None,
+    selection: PageSelection | None = None,
+) -> list[dict[str, str]]:
+    """Convert the pages of a PDF (all, or those picked by ``selection``) into base64 image parts."""
+    return render_pdf(pdf_path, options or RenderOptions(dpi=dpi), selection).image_parts
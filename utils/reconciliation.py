@@ -0,0 +1,174 @@
+import re
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from datetime import date, datetime
+from difflib import SequenceMatcher
+from typing import Any, Literal
+
+from pydantic import BaseModel
+
+from utils.result_store import entity_key, identifier_key
+from utils.text_layer import parse_date
+
+CheckKind = Literal["identifier", "name", "date_order"]
+Severity = Literal["error", "warning"]
+CheckStatus = Literal["pass", "fail", "skipped"]
+
+# What the agents answer when a field is not in the document; such values are not compared.
+MISSING_VALUES = {"", "values missing", "value missing", "not stated", "not mentioned", "date is not mentioned", "n/a", "na"}
+# Names at least this similar (difflib ratio over normalized names) are the same entity.
+NAME_MATCH_THRESHOLD = 0.88
+# Words that qualify a name without changing whom it refers to, e.g. "<entity> Escrow Account".
+NAME_QUALIFIERS = {"escrow", "account", "a", "c", "ac", "nodal", "settlement", "m", "s", "ms", "the"}
+DATE_FORMATS = ("%d %B %Y", "%d %b %Y", "%B %d %Y", "%b %d %Y", "%d/%m/%y")
+
+
+@dataclass(frozen=True)
+class FieldRef:
+    """A field of one document type's result; ``path`` may be dotted into nested models."""
+
+    slug: str
+    path: str
+
+    def read(self, result: Mapping[str, Any]) -> Any:
+        value: Any = result
+        for part in self.path.split("."):
+            if not isinstance(value, Mapping):
+                return None
+            value = value.get(part)
+        return value
+
+    def __str__(self) -> str:
+        return f"{self.slug}.{self.path}"
+
+
+@dataclass(frozen=True)
+class ConsistencyCheck:
+    """Fields across a dossier that must agree.
+
+    ``identifier`` values must be equal ignoring case and whitespace, ``name``
+    values must match fuzzily (see ``names_match``), and ``date_order`` fields,
+    each taken at its earliest date when several documents state it, must not
+    decrease in the order they are listed. A check with fewer than two values
+    present is skipped.
+    """
+
+    name: str
+    kind: CheckKind
+    fields: tuple[FieldRef, ...]
+    severity: Severity = "error"
+
+
+def is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and value.strip().casefold() in MISSING_VALUES)
+
+
+def name_similarity(left: str, right: str) -> float:
+    """1.0 when one normalized name is the other plus qualifiers, else their difflib ratio."""
+    left_key, right_key = entity_key(left), entity_key(right)
+    if left_key == right_key:
+        return 1.0
+    left_words, right_words = set(left_key.split()), set(right_key.split())
+    shorter, longer = sorted((left_words, right_words), key=len)
+    if shorter and shorter <= longer and longer - shorter <= NAME_QUALIFIERS:
+        return 1.0
+    return SequenceMatcher(None, left_key, right_key).ratio()
+
+
+def names_match(left: str, right: str) -> bool:
+    return name_similarity(left, right) >= NAME_MATCH_THRESHOLD
+
+
+def coerce_date(value: Any) -> date | None:
+    """Dates as the agents return them: ISO, DD/MM/YYYY (or - .), or spelled-out months."""
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str):
+        return None
+    text = re.sub(r"(\d)(st|nd|rd|th)\b", r"\1", value.strip().replace(",", " "))
+    text = re.sub(r"\s+", " ", text)
+    for parse in (date.fromisoformat, parse_date):
+        try:
+            return parse(text)
+        except ValueError:
+            pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            pass
+    return None
+
+
+def run_check(check: ConsistencyCheck, results: Mapping[str, list[Mapping[str, Any]]]) -> dict[str, Any]:
+    values = [
+        {"field": str(field), "value": value}
+        for field in check.fields
+        for result in results.get(field.slug, [])
+        if not is_missing(value := field.read(result))
+    ]
+    outcome: dict[str, Any] = {"name": check.name, "kind": check.kind, "severity": check.severity, "values": values}
+    if len(values) < 2:
+        return {**outcome, "status": "skipped", "detail": "Fewer than two documents state this."}
+
+    if check.kind == "identifier":
+        distinct = sorted({identifier_key(str(entry["value"])) for entry in values})
+        failed = len(distinct) > 1
+        detail = f"Differing values: {', '.join(distinct)}." if failed else ""
+    elif check.kind == "name":
+        reference = str(values[0]["value"])
+        scores = [round(name_similarity(reference, str(entry["value"])), 3) for entry in values[1:]]
+        for entry, score in zip(values[1:], scores):
+            entry["similarity"] = score
+        mismatched = [entry for entry in values[1:] if entry["similarity"] < NAME_MATCH_THRESHOLD]
+        failed = bool(mismatched)
+        detail = (
+            f"{', '.join(entry['field'] for entry in mismatched)} do not match {values[0]['field']}." if failed else ""
+        )
+    else:
+        dated = [(entry, coerce_date(entry["value"])) for entry in values]
+        unparsed = [entry["field"] for entry, parsed in dated if parsed is None]
+        dated = [(entry, parsed) for entry, parsed in dated if parsed is not None]
+        if len(dated) < 2:
+            return {**outcome, "status": "skipped", "detail": f"Unreadable dates: {', '.join(unparsed)}."}
+        earliest: dict[str, date] = {}
+        for entry, parsed in dated:
+            entry["date"] = parsed.isoformat()
+            earliest[entry["field"]] = min(parsed, earliest.get(entry["field"], parsed))
+        # Documents of one slug are not ordered among themselves; each field is ordered by its earliest date.
+        ordered = [(field, earliest[field]) for field in map(str, check.fields) if field in earliest]
+        if len(ordered) < 2:
+            return {**outcome, "status": "skipped", "detail": "Fewer than two of the fields are stated."}
+        inversions = [
+            f"{earlier} ({earlier_date}) is after {later} ({later_date})"
+            for (earlier, earlier_date), (later, later_date) in zip(ordered, ordered[1:])
+            if earlier_date > later_date
+        ]
+        failed = bool(inversions)
+        detail = "; ".join(inversions) + "." if failed else ""
+    return {**outcome, "status": "fail" if failed else "pass", "detail": detail}
+
+
+def reconcile(
+    results: Iterable[tuple[str, BaseModel | Mapping[str, Any]]],
+    checks: Iterable[ConsistencyCheck],
+) -> dict[str, Any]:
+    """Run consistency checks over a dossier's (slug, structured result) pairs; no model is called.
+
+    A slug may appear several times (e.g. two GST certificates); every value
+    found takes part in the check. ``consistent`` is False when an error-level
+    check fails; warnings are reported but do not flip it.
+    """
+    by_slug: dict[str, list[Mapping[str, Any]]] = {}
+    for slug, result in results:
+        by_slug.setdefault(slug, []).append(
+            result.model_dump(mode="json") if isinstance(result, BaseModel) else result
+        )
+    outcomes = [run_check(check, by_slug) for check in checks]
+    counts = {status: sum(outcome["status"] == status for outcome in outcomes) for status in ("pass", "fail", "skipped")}
+    return {
+        "consistent": not any(outcome["status"] == "fail" and outcome["severity"] == "error" for outcome in outcomes),
+        "documents": {slug: len(entries) for slug, entries in by_slug.items()},
+        "summary": counts,
+        "checks": outcomes,
+    }
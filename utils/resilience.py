@@ -0,0 +1,315 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, fields
+from typing import Any, TypeVar
+
+import httpx
+
+from utils.agent_registry import MODEL_MODULE, provider_module
+from utils.concurrency import ModelCallRejected
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+# Provider SDKs raise their own exception types; these name fragments cover
+# google-genai/google-api-core, groq/openai-style clients and ollama.
+RETRYABLE_ERROR_NAMES = (
+    "RateLimit",
+    "ResourceExhausted",
+    "TooManyRequests",
+    "ServiceUnavailable",
+    "InternalServerError",
+    "DeadlineExceeded",
+    "APIConnectionError",
+    "APITimeoutError",
+    "Timeout",
+)
+
+
+@dataclass(frozen=True)
+class ResiliencePolicy:
+    """Deadline, retry, rate-limit and circuit-breaker settings for one model provider.
+
+    ``rate_per_second`` of 0 disables client-side rate limiting. Each provider
+    module under ``models/`` declares its own policy as ``RESILIENCE``.
+    """
+
+    timeout_seconds: float = 60.0
+    max_attempts: int = 4
+    backoff_base_seconds: float = 1.0
+    backoff_max_seconds: float = 20.0
+    rate_per_second: float = 0.0
+    burst: int = 1
+    breaker_failure_threshold: int = 5
+    breaker_reset_seconds: float = 30.0
+
+    @classmethod
+    def from_env(cls, prefix: str, **defaults: Any) -> "ResiliencePolicy":
+        """Policy from ``defaults``, each overridable by ``<PREFIX>_<FIELD>`` (e.g. GEMINI_TIMEOUT_SECONDS)."""
+        values = dict(defaults)
+        for spec in fields(cls):
+            raw = os.getenv(f"{prefix}_{spec.name}".upper())
+            if raw is not None:
+                values[spec.name] = int(raw) if spec.type in (int, "int") else float(raw)
+        return cls(**values)
+
+
+class TokenBucket:
+    """Client-side rate limiter; ``reserve`` takes a token and returns how long to wait for it."""
+
+    def __init__(self, rate_per_second: float, burst: int) -> None:
+        self.rate_per_second = rate_per_second
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        if self.rate_per_second <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_second)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate_per_second
+
+
+class CircuitOpen(ModelCallRejected):
+    """The provider has failed repeatedly; calls fail fast until the breaker's reset timeout passes."""
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive retryable failures -> half-open after a cool-down.
+
+    While half-open a single probe call is let through; its success closes the
+    breaker and its failure re-opens it for another cool-down.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if now - self._opened_at >= self.reset_seconds else "open"
+
+    def before_call(self, provider: str) -> bool:
+        """Admit a call or raise CircuitOpen; True when the admitted call is the half-open probe."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(now)
+            if state == "closed":
+                return False
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            remaining = max(1.0, self.reset_seconds - (now - self._opened_at))
+        raise CircuitOpen(
+            f"Model provider {provider} is unavailable; failing fast.",
+            status_code=503,
+            retry_after_seconds=remaining,
+        )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """Free the probe slot of a call that ended without a verdict (cancelled), leaving the state as is."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+def error_status(exc: BaseException) -> int | None:
+    for candidate in (exc, getattr(exc, "response", None)):
+        for attribute in ("status_code", "code", "status"):
+            value = getattr(candidate, attribute, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Timeouts, connection errors, 429 and 5xx are transient; anything else (bad schema, 400, auth) is not."""
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    status = error_status(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    return any(name in type(exc).__name__ for name in RETRYABLE_ERROR_NAMES)
+
+
+class ResilientCaller:
+    """Runs model calls for one provider under its ResiliencePolicy."""
+
+    def __init__(self, provider: str, policy: ResiliencePolicy) -> None:
+        self.provider = provider
+        self.policy = policy
+        self.bucket = TokenBucket(policy.rate_per_second, policy.burst)
+        self.breaker = CircuitBreaker(policy.breaker_failure_threshold, policy.breaker_reset_seconds)
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "retries": 0, "timeouts": 0, "failures": 0, "short_circuited": 0, "throttled_seconds": 0.0}
+
+    def _count(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given (zero-based) attempt."""
+        ceiling = min(self.policy.backoff_max_seconds, self.policy.backoff_base_seconds * 2**attempt)
+        return random.uniform(0, ceiling)
+
+    def _admit(self) -> tuple[float, bool]:
+        """Pass the breaker and take a rate-limit token; returns (delay, whether this call is the probe)."""
+        try:
+            probe = self.breaker.before_call(self.provider)
+        except CircuitOpen:
+            self._count("short_circuited")
+            raise
+        self._count("calls")
+        delay = self.bucket.reserve()
+        if delay:
+            self._count("throttled_seconds", delay)
+        return delay, probe
+
+    def _failed(self, exc: BaseException, attempt: int) -> float | None:
+        """Record a failed attempt; return the backoff before the next one, or None to give up."""
+        if not is_retryable(exc):
+            # The provider answered; a malformed structured response is not an outage.
+            self.breaker.record_success()
+            return None
+        self.breaker.record_failure()
+        if attempt + 1 >= self.policy.max_attempts:
+            self._count("failures")
+            return None
+        self._count("retries")
+        delay = self.backoff(attempt)
+        logger.warning("%s call failed (%s); retry %d in %.1fs", self.provider, type(exc).__name__, attempt + 1, delay)
+        return delay
+
+    def _exhausted(self, exc: BaseException) -> Exception:
+        status = error_status(exc)
+        if isinstance(exc, (TimeoutError, asyncio.TimeoutError)):
+            message, status_code = f"Model provider {self.provider} timed out after {self.policy.timeout_seconds:g}s.", 504
+        elif status == 429:
+            message, status_code = f"Model provider {self.provider} is rate limiting requests.", 429
+        else:
+            message, status_code = f"Model provider {self.provider} is unavailable: {exc}", 503
+        return ModelCallRejected(message, status_code=status_code, retry_after_seconds=self.policy.backoff_max_seconds)
+
+    def call(self, func: Callable[[], T]) -> T:
+        """Sync calls rely on the client's own request timeout (set from the policy in models/)."""
+        for attempt in range(self.policy.max_attempts):
+            delay, probe = self._admit()
+            try:
+                if delay:
+                    time.sleep(delay)
+                result = func()
+            except Exception as exc:
+                backoff = self._failed(exc, attempt)
+                if backoff is None:
+                    if is_retryable(exc):
+                        raise self._exhausted(exc) from exc
+                    raise
+                time.sleep(backoff)
+            except BaseException:
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+        raise AssertionError("unreachable")
+
+    async def acall(self, factory: Callable[[], Awaitable[T]]) -> T:
+        for attempt in range(self.policy.max_attempts):
+            delay, probe = self._admit()
+            try:
+                if delay:
+                    await asyncio.sleep(delay)
+                result = await asyncio.wait_for(factory(), self.policy.timeout_seconds)
+            except asyncio.TimeoutError as exc:
+                self._count("timeouts")
+                backoff = self._failed(exc, attempt)
+                if backoff is None:
+                    raise self._exhausted(exc) from exc
+                await asyncio.sleep(backoff)
+            except Exception as exc:
+                backoff = self._failed(exc, attempt)
+                if backoff is None:
+                    if is_retryable(exc):
+                        raise self._exhausted(exc) from exc
+                    raise
+                await asyncio.sleep(backoff)
+            except BaseException:
+                # Cancelled (a losing hedge, a client disconnect): no verdict on the provider,
+                # but a probe must give its slot back or the breaker stays half-open for good.
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+        raise AssertionError("unreachable")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        counters["throttled_seconds"] = round(counters["throttled_seconds"], 3)
+        return {"breaker": self.breaker.state, **counters}
+
+
+_callers_lock = threading.Lock()
+_callers: dict[str, ResilientCaller] = {}
+
+
+def resilient_caller(provider: str | None = None) -> ResilientCaller:
+    """Caller for a provider under ``models/`` (default: the shared model's), using its RESILIENCE policy."""
+    provider = provider or MODEL_MODULE
+    with _callers_lock:
+        caller = _callers.get(provider)
+        if caller is None:
+            policy = getattr(provider_module(provider), "RESILIENCE", ResiliencePolicy())
+            caller = ResilientCaller(provider, policy)
+            _callers[provider] = caller
+        return caller
+
+
+def breaker_state(provider: str) -> str:
+    """Breaker state without loading the provider; one never called is closed."""
+    with _callers_lock:
+        caller = _callers.get(provider)
+    return caller.breaker.state if caller is not None else "closed"
+
+
+def resilience_stats() -> dict[str, Any]:
+    with _callers_lock:
+        callers = list(_callers.values())
+    return {caller.provider: caller.stats() for caller in callers}
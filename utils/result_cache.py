@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, TypeVar
+
+from pydantic import BaseModel
+
+ResponseT = TypeVar("ResponseT", bound=BaseModel)
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: str | Path) -> str:
+    """Return the hex SHA-256 digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def schema_version(response_format: type[BaseModel]) -> str:
+    """Fingerprint a Pydantic schema so cached results are invalidated when it changes."""
+    schema = json.dumps(response_format.model_json_schema(), sort_keys=True)
+    return text_sha256(schema)[:16]
+
+
+def describe_model(model: Any) -> str:
+    """Best-effort model identifier for LangChain chat models (Gemini, Groq, Ollama)."""
+    for attribute in ("model", "model_name"):
+        value = getattr(model, attribute, None)
+        if isinstance(value, str) and value:
+            return f"{type(model).__name__}:{value}"
+    return type(model).__name__
+
+
+class ResultCache:
+    """Two-tier (in-memory LRU + SQLite) cache of structured extraction results.
+
+    Entries are stored as JSON and re-validated into the caller's response model on
+    read, so a hit never touches rasterization or the model. ``get`` and ``put``
+    block on SQLite; async code runs them in the render pool.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None,
+        memory_max_entries: int = 256,
+        disk_max_entries: int = 10_000,
+        ttl_seconds: float = 7 * 24 * 3600,
+        enabled: bool = True,
+        busy_timeout_ms: int = 5000,
+    ) -> None:
+        self.enabled = enabled
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_entries = disk_max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+        self._connection: sqlite3.Connection | None = None
+        if enabled and path is not None:
+            db_path = Path(path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(db_path, check_same_thread=False)
+            # Every uvicorn worker shares the file: WAL keeps readers and writers from
+            # blocking each other, and a writer waits for the lock instead of failing.
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    agent_type TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)"
+            )
+            self._connection.commit()
+
+    @staticmethod
+    def build_key(
+        document_path: str | Path,
+        *,
+        agent_type: str,
+        response_format: type[BaseModel],
+        system_prompt: str,
+        model_name: str,
+        render_key: str,
+        file_hash: str | None = None,
+    ) -> str:
+        parts = {
+            "file": file_hash or file_sha256(document_path),
+            "agent_type": agent_type,
+            "schema": schema_version(response_format),
+            "prompt": text_sha256(system_prompt),
+            "model": model_name,
+            "render": render_key,
+        }
+        return text_sha256(json.dumps(parts, sort_keys=True))
+
+    def get(self, key: str, response_format: type[ResponseT]) -> ResponseT | None:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, payload = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return response_format.model_validate_json(payload)
+                del self._memory[key]
+
+            if self._connection is not None:
+                row = self._connection.execute(
+                    "SELECT payload, expires_at FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    payload, expires_at = row
+                    if expires_at > now:
+                        self._connection.execute(
+                            "UPDATE results SET last_access = ? WHERE key = ?", (now, key)
+                        )
+                        self._connection.commit()
+                        self._remember(key, expires_at, payload)
+                        self._counters["disk_hits"] += 1
+                        return response_format.model_validate_json(payload)
+                    self._connection.execute("DELETE FROM results WHERE key = ?", (key,))
+                    self._connection.commit()
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key: str, agent_type: str, response: BaseModel) -> None:
+        if not self.enabled:
+            return
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        payload = response.model_dump_json()
+        with self._lock:
+            self._remember(key, expires_at, payload)
+            self._counters["stores"] += 1
+            if self._connection is not None:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO results (key, agent_type, payload, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, agent_type, payload, expires_at, now),
+                )
+                self._evict_disk(now)
+                self._connection.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM results")
+                self._connection.commit()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            memory_entries = len(self._memory)
+            disk_entries = (
+                self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+                if self._connection is not None
+                else 0
+            )
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        lookups = hits + counters["misses"]
+        return {
+            "enabled": self.enabled,
+            **counters,
+            "hits": hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": memory_entries,
+            "disk_entries": disk_entries,
+        }
+
+    def _remember(self, key: str, expires_at: float, payload: str) -> None:
+        self._memory[key] = (expires_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _evict_disk(self, now: float) -> None:
+        assert self._connection is not None
+        expired = self._connection.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+        self._counters["evictions"] += expired.rowcount
+        overflow = self._connection.execute(
+            "DELETE FROM results WHERE key IN ("
+            "SELECT key FROM results ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,),
+        )
+        self._counters["evictions"] += overflow.rowcount
+
+
+def _build_default_cache() -> ResultCache:
+    enabled = os.getenv("RESULT_CACHE_ENABLED", "true").lower() not in {"0", "false", "no"}
+    path = os.getenv(
+        "RESULT_CACHE_PATH",
+        str(Path(__file__).resolve().parent.parent / ".cache" / "results.sqlite3"),
+    )
+    return ResultCache(
+        path=path,
+        memory_max_entries=int(os.getenv("RESULT_CACHE_MEMORY_ENTRIES", "256")),
+        disk_max_entries=int(os.getenv("RESULT_CACHE_DISK_ENTRIES", "10000")),
+        ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        enabled=enabled,
+        busy_timeout_ms=int(os.getenv("RESULT_CACHE_BUSY_TIMEOUT_MS", "5000")),
+    )
+
+
+result_cache = _build_default_cache()
@@ -0,0 +1,227 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+RESULT_STORE_ENABLED = os.getenv("RESULT_STORE_ENABLED", "true").lower() not in {"0", "false", "no"}
+RESULT_STORE_PATH = os.getenv(
+    "RESULT_STORE_PATH",
+    str(Path(__file__).resolve().parent.parent / ".cache" / "history.sqlite3"),
+)
+RESULT_STORE_MAX_LIMIT = 1000
+# Every uvicorn worker writes the same file; a writer waits this long for the lock instead of failing.
+RESULT_STORE_BUSY_TIMEOUT_MS = int(os.getenv("RESULT_STORE_BUSY_TIMEOUT_MS", "5000"))
+
+# Spellings that otherwise make the same entity look like two.
+_ENTITY_ABBREVIATIONS = {"private": "pvt", "limited": "ltd", "and": "&"}
+
+
+def entity_key(name: str) -> str:
+    """Case-, punctuation- and suffix-insensitive form of an entity name, e.g. "cashfree payments india pvt ltd"."""
+    words = re.sub(r"[^\w&]+", " ", name.casefold()).split()
+    return " ".join(_ENTITY_ABBREVIATIONS.get(word, word) for word in words)
+
+
+def identifier_key(value: str) -> str:
+    """GSTIN/IFSC as compared: upper case without whitespace."""
+    return re.sub(r"\s+", "", value).upper()
+
+
+@dataclass(frozen=True)
+class IndexedFields:
+    """Which response fields identify the entity a document is about.
+
+    Each names a field of the document type's response model; None when the
+    document does not carry that identifier.
+    """
+
+    entity_name: str | None = None
+    gstin: str | None = None
+    ifsc: str | None = None
+
+    def values(self, response: BaseModel) -> dict[str, str | None]:
+        indexed: dict[str, str | None] = {}
+        for column, field_name in asdict(self).items():
+            value = getattr(response, field_name, None) if field_name is not None else None
+            indexed[column] = (value.strip() or None) if isinstance(value, str) else None
+        return indexed
+
+
+NOT_INDEXED = IndexedFields()
+
+
+class ResultStore:
+    """Append-only history of every structured response the model produced.
+
+    Unlike the result cache, entries never expire and are indexed by what
+    compliance asks about (entity name, GSTIN, IFSC, document hash), so
+    "everything we validated for this entity" is a database read. Calls block
+    on SQLite; async code runs them in the render pool.
+    """
+
+    def __init__(self, path: str | Path, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+        if not enabled:
+            return
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        # WAL lets the /results readers and the workers' writers proceed without blocking each other.
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(f"PRAGMA busy_timeout={RESULT_STORE_BUSY_TIMEOUT_MS}")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS validations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                document_hash TEXT NOT NULL,
+                document_name TEXT NOT NULL,
+                agent_type TEXT NOT NULL,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                entity_name TEXT,
+                entity_key TEXT,
+                gstin TEXT,
+                ifsc TEXT,
+                latency_ms REAL NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        for column in ("entity_key", "gstin", "ifsc", "document_hash"):
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS validations_{column} ON validations ({column}, created_at)"
+            )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS validations_agent_type ON validations (agent_type, created_at)"
+        )
+        self._connection.commit()
+
+    def record(
+        self,
+        *,
+        document_hash: str,
+        document_name: str,
+        agent_type: str,
+        model_name: str,
+        response: BaseModel,
+        latency_seconds: float,
+        indexed_fields: IndexedFields = NOT_INDEXED,
+    ) -> int | None:
+        """Persist one response; returns its id, or None when the store is disabled."""
+        if self._connection is None:
+            return None
+        indexed = indexed_fields.values(response)
+        entity_name = indexed["entity_name"]
+        row = (
+            document_hash,
+            document_name,
+            agent_type,
+            model_name,
+            response.model_dump_json(),
+            entity_name,
+            entity_key(entity_name) if entity_name else None,
+            identifier_key(indexed["gstin"]) if indexed["gstin"] else None,
+            identifier_key(indexed["ifsc"]) if indexed["ifsc"] else None,
+            round(latency_seconds * 1000, 1),
+            time.time(),
+        )
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO validations (document_hash, document_name, agent_type, model, response, "
+                "entity_name, entity_key, gstin, ifsc, latency_ms, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            self._connection.commit()
+        return cursor.lastrowid
+
+    def try_record(self, **fields: Any) -> int | None:
+        """``record``, logging instead of raising: a response the model already produced is never failed by its history."""
+        try:
+            return self.record(**fields)
+        except Exception:
+            logger.exception("Recording the %s result in the history failed", fields.get("agent_type"))
+            return None
+
+    def get(self, result_id: int) -> dict[str, Any] | None:
+        if self._connection is None:
+            return None
+        with self._lock:
+            row = self._connection.execute("SELECT * FROM validations WHERE id = ?", (result_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def query(
+        self,
+        *,
+        entity_name: str | None = None,
+        gstin: str | None = None,
+        ifsc: str | None = None,
+        document_hash: str | None = None,
+        agent_type: str | None = None,
+        since: float | None = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> list[dict[str, Any]]:
+        """Newest first. ``entity_name`` matches any stored name starting with it once normalized."""
+        if self._connection is None:
+            return []
+        clauses: list[str] = []
+        params: list[Any] = []
+        if entity_name:
+            # A range on the index rather than LIKE, which SQLite cannot serve from a case-sensitive index.
+            key = entity_key(entity_name)
+            clauses.append("entity_key >= ? AND entity_key < ?")
+            params += [key, key + "\U0010ffff"]
+        for column, value in (("gstin", gstin), ("ifsc", ifsc)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(identifier_key(value))
+        if document_hash:
+            clauses.append("document_hash = ?")
+            params.append(document_hash.lower())
+        if agent_type:
+            clauses.append("agent_type = ?")
+            params.append(agent_type)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params += [max(1, min(limit, RESULT_STORE_MAX_LIMIT)), max(0, offset)]
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT * FROM validations {where} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                params,
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def stats(self) -> dict[str, Any]:
+        if self._connection is None:
+            return {"enabled": False, "entries": 0}
+        with self._lock:
+            entries, entities, documents = self._connection.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT entity_key), COUNT(DISTINCT document_hash) FROM validations"
+            ).fetchone()
+        return {"enabled": True, "entries": entries, "entities": entities, "documents": documents}
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict[str, Any]:
+        entry = dict(row)
+        del entry["entity_key"]
+        entry["response"] = json.loads(entry["response"])
+        return entry
+
+
+result_store = ResultStore(RESULT_STORE_PATH, enabled=RESULT_STORE_ENABLED)
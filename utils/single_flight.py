@@ -0,0 +1,85 @@
+import asyncio
+import os
+import threading
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce identical in-flight work so only the first caller runs it.
+
+    Callers pass a key (the result-cache key, which covers the file hash,
+    agent type, schema, prompt, model and pipeline). While a call for that key
+    is running, later callers wait for and share its result or exception
+    instead of making their own model call. Async callers share an
+    ``asyncio.Task`` (shielded, so one caller disconnecting does not cancel
+    the others); sync callers share a ``concurrent.futures.Future``.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._tasks: dict[str, asyncio.Task[Any]] = {}
+        self._futures: dict[str, Future[Any]] = {}
+        self._counters = {"leaders": 0, "coalesced": 0}
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        if not self.enabled:
+            return await factory()
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                task = asyncio.ensure_future(factory())
+                self._tasks[key] = task
+                task.add_done_callback(lambda _: self._forget_task(key, task))
+                self._counters["leaders"] += 1
+            else:
+                self._counters["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def run_sync(self, key: str, func: Callable[[], T]) -> T:
+        if not self.enabled:
+            return func()
+        with self._lock:
+            future = self._futures.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._futures[key] = future
+                self._counters["leaders"] += 1
+            else:
+                self._counters["coalesced"] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._futures.pop(key, None)
+
+    def _forget_task(self, key: str, task: asyncio.Task[Any]) -> None:
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter has gone away.
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._counters, "in_flight": len(self._tasks) + len(self._futures)}
+
+
+single_flight = SingleFlight(
+    enabled=os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() not in {"0", "false", "no"},
+)
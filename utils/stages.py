@@ -0,0 +1,86 @@
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+StageObserver = Callable[[str, str, float], None]
+
+
+class StageTimings:
+    """Wall time and call counts per pipeline stage for one unit of work (a request, a benchmark run)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._seconds: dict[str, float] = {}
+        self._counts: dict[str, int] = {}
+        self.observations: list[tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._seconds[name] = self._seconds.get(name, 0.0) + seconds
+            self._counts[name] = self._counts.get(name, 0) + 1
+            self.observations.append((name, seconds))
+
+    def to_dict(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {name: {"seconds": self._seconds[name], "count": self._counts[name]} for name in self._seconds}
+
+
+_current: ContextVar[StageTimings | None] = ContextVar("stage_timings", default=None)
+_agent_type: ContextVar[str] = ContextVar("stage_agent_type", default="none")
+_observers: list[StageObserver] = []
+
+
+def add_observer(observer: StageObserver) -> None:
+    """Also report every stage to ``observer(stage, agent_type, seconds)`` (the Prometheus histograms)."""
+    _observers.append(observer)
+
+
+def observe(name: str, seconds: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+    agent_type = _agent_type.get()
+    for observer in _observers:
+        observer(name, agent_type, seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage ("open", "rasterize", "encode", "base64", "model", ...).
+
+    "model" covers the whole provider call, including the agent's parsing of
+    the structured output, which is not timed on its own.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started)
+
+
+@contextmanager
+def agent_scope(agent_type: str) -> Iterator[None]:
+    """Attribute the stages timed in this context to ``agent_type``."""
+    token = _agent_type.set(agent_type)
+    try:
+        yield
+    finally:
+        _agent_type.reset(token)
+
+
+def current_agent_type() -> str:
+    return _agent_type.get()
+
+
+@contextmanager
+def record_stages() -> Iterator[StageTimings]:
+    """Collect the stages timed in this context, including tasks and render-pool work it starts."""
+    timings = StageTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
@@ -0,0 +1,127 @@
+import json
+import re
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any
+
+from utils.document_source import DocumentSource, open_pdf
+
+# Defaults for trusting a text layer enough to skip images for textual fields.
+MIN_CHARS_PER_PAGE = 200
+MIN_CONFIDENCE = 0.8
+
+# Font PyMuPDF/Tesseract and most OCR engines use for their invisible text layer.
+_OCR_FONTS = ("GlyphLessFont", "GlyphLess")
+
+GSTIN_PATTERN = r"\d{2}[A-Z]{5}\d{4}[A-Z][1-9A-Z]Z[0-9A-Z]"
+IFSC_PATTERN = r"[A-Z]{4}0[A-Z0-9]{6}"
+DATE_PATTERN = r"\d{1,2}[/.-]\d{1,2}[/.-]\d{4}"
+
+
+def parse_date(value: str) -> date:
+    """Parse Indian-style DD/MM/YYYY (or - / . separated) dates."""
+    normalized = re.sub(r"[.-]", "/", value.strip())
+    return datetime.strptime(normalized, "%d/%m/%Y").date()
+
+
+def collapse_whitespace(value: str) -> str:
+    return re.sub(r"\s+", " ", value).strip()
+
+
+@dataclass(frozen=True)
+class TextFieldRule:
+    """Regex over the page text whose first capture group is the field value."""
+
+    pattern: str
+    normalize: Callable[[str], Any] = collapse_whitespace
+    flags: int = re.IGNORECASE
+
+    def extract(self, text: str) -> Any | None:
+        match = re.search(self.pattern, text, self.flags)
+        if match is None:
+            return None
+        try:
+            value = self.normalize(match.group(1))
+        except ValueError:
+            return None
+        return value if value not in ("", None) else None
+
+
+@dataclass(frozen=True)
+class TextExtraction:
+    """Deterministic extraction rules for the non-visual fields of one schema.
+
+    The fast path is taken only when the text layer is trustworthy (enough
+    characters per page, not an OCR overlay) and every rule matches; otherwise
+    the whole document goes to the VLM as before.
+    """
+
+    rules: dict[str, TextFieldRule] = field(default_factory=dict)
+    min_chars_per_page: int = MIN_CHARS_PER_PAGE
+    min_confidence: float = MIN_CONFIDENCE
+
+    def cache_key(self) -> str:
+        return json.dumps(
+            {
+                "rules": {name: [rule.pattern, rule.flags] for name, rule in sorted(self.rules.items())},
+                "min_chars_per_page": self.min_chars_per_page,
+                "min_confidence": self.min_confidence,
+            },
+            sort_keys=True,
+        )
+
+
+@dataclass
+class TextLayer:
+    text: str
+    page_count: int
+    char_count: int
+    ocr_char_ratio: float
+
+    def confidence(self, min_chars_per_page: int = MIN_CHARS_PER_PAGE) -> float:
+        """0..1 score for how much the text layer can be trusted for field extraction."""
+        if self.page_count == 0 or self.char_count == 0:
+            return 0.0
+        density = min(1.0, self.char_count / (self.page_count * min_chars_per_page))
+        return density * (1.0 - self.ocr_char_ratio)
+
+
+def read_text_layer(pdf_path: DocumentSource) -> TextLayer:
+    """Read the PDF text layer line by line via ``page.get_text("dict")``."""
+    lines: list[str] = []
+    char_count = 0
+    ocr_chars = 0
+    with open_pdf(pdf_path) as document:
+        page_count = document.page_count
+        for page in document:
+            for block in page.get_text("dict")["blocks"]:
+                for line in block.get("lines", []):
+                    spans = line["spans"]
+                    text = "".join(span["text"] for span in spans).strip()
+                    if not text:
+                        continue
+                    lines.append(text)
+                    char_count += len(text)
+                    ocr_chars += sum(len(span["text"]) for span in spans if span["font"].startswith(_OCR_FONTS))
+    return TextLayer(
+        text="\n".join(lines),
+        page_count=page_count,
+        char_count=char_count,
+        ocr_char_ratio=ocr_chars / char_count if char_count else 0.0,
+    )
+
+
+def extract_fields(layer: TextLayer, extraction: TextExtraction) -> dict[str, Any] | None:
+    """Return values for every rule in ``extraction``, or None if the fast path does not apply."""
+    if layer.confidence(extraction.min_chars_per_page) < extraction.min_confidence:
+        return None
+
+    values: dict[str, Any] = {}
+    for name, rule in extraction.rules.items():
+        value = rule.extract(layer.text)
+        if value is None:
+            return None
+        values[name] = value
+    return values
+
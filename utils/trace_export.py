@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import queue
+import threading
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from utils.tracing import TRACING_QUEUE_SIZE, TRACING_REDACT_IMAGES, TRACING_SHUTDOWN_TIMEOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def redact_image(data: str) -> str:
+    digest = hashlib.sha256(data.encode("ascii", "ignore")).hexdigest()
+    return f"<image {len(data)} base64 chars sha256:{digest}>"
+
+
+def redact(value: Any) -> Any:
+    """A copy of ``value`` with base64 page images replaced by a size and hash.
+
+    Handles the content parts this repo sends (``{"type": "image", "data": ...}``),
+    OpenAI-style ``image_url`` data URLs, and LangChain messages holding either.
+    """
+    if isinstance(value, dict):
+        if value.get("type") == "image" and isinstance(value.get("data"), str):
+            return {**value, "data": redact_image(value["data"])}
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(item) for item in value)
+    if isinstance(value, str) and value.startswith("data:image/"):
+        return redact_image(value)
+    content = getattr(value, "content", None)
+    if isinstance(content, list) and hasattr(value, "model_copy"):
+        return value.model_copy(update={"content": redact(content)})
+    return value
+
+
+class BackgroundTracer(BaseCallbackHandler):
+    """LangChain callback handler that hands events to Langfuse on a background thread.
+
+    The request path redacts page images and appends the event to a bounded
+    queue, so queued events hold hashes rather than megabytes of base64; one
+    exporter thread replays them, in order, on the Langfuse handler. When the queue is full the event is dropped, together
+    with the rest of its trace, so a slow or unreachable Langfuse host costs
+    requests nothing.
+    """
+
+    # Enqueueing is cheap; no need for LangChain to hop to an executor thread in async code.
+    run_inline = True
+
+    def __init__(self, handler: Any, queue_size: int = TRACING_QUEUE_SIZE, redact_images: bool = TRACING_REDACT_IMAGES) -> None:
+        self.handler = handler
+        self.redact_images = redact_images
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        # Runs whose start was dropped; their own and their children's events are dropped too.
+        self._dropped_runs: set[UUID] = set()
+        self.enqueued = 0
+        self.dropped = 0
+        self.export_errors = 0
+        self._thread = threading.Thread(target=self._export, name="tracing-export", daemon=True)
+        self._thread.start()
+
+    def _enqueue(self, method: str, args: tuple[Any, ...], kwargs: dict[str, Any]) -> None:
+        run_id, parent_run_id = kwargs.get("run_id"), kwargs.get("parent_run_id")
+        if self.redact_images:
+            args = redact(args)
+        starts = method.endswith("_start")
+        with self._lock:
+            # Part of a trace that already lost an event: an incomplete trace is worse than none.
+            if run_id in self._dropped_runs or parent_run_id in self._dropped_runs:
+                self.dropped += 1
+                if starts:
+                    self._dropped_runs.add(run_id)
+                else:
+                    self._dropped_runs.discard(run_id)
+                return
+            # New traces only start while half the queue is free, so admitted traces can finish.
+            if starts and parent_run_id is None and self._queue.qsize() >= self._queue.maxsize // 2:
+                self.dropped += 1
+                self._dropped_runs.add(run_id)
+                return
+            try:
+                self._queue.put_nowait((method, args, kwargs))
+                self.enqueued += 1
+            except queue.Full:
+                self.dropped += 1
+                if starts:
+                    self._dropped_runs.add(run_id)
+
+    def _export(self) -> None:
+        while True:
+            event = self._queue.get()
+            try:
+                if event is _STOP:
+                    return
+                method, args, kwargs = event
+                getattr(self.handler, method)(*args, **kwargs)
+            except Exception as exc:
+                self.export_errors += 1
+                logger.debug("Trace export failed: %s", exc)
+            finally:
+                self._queue.task_done()
+
+    def on_chain_start(self, *args: Any, **kwargs: Any) -> None:
+        self._enqueue("on_chain_start", args, kwargs)
+
+    def on_chain_end(self, *args: Any, **kwargs: Any) -> None:
+        self._enqueue("on_chain_end", args, kwargs)
+
+    def on_chain_error(self, *args: Any, **kwargs: Any) -> None:
+        self._enqueue("on_chain_error", args, kwargs)
+
+    def on_chat_model_start(self, *args: Any, **kwargs: Any) -> None:
+        self._enqueue("on_chat_model_start", args, kwargs)
+
+    def on_llm_start(self, *args: Any, **kwargs: Any) -> None:
+        self._enqueue("on_llm_start", args, kwargs)
+
+    def on_llm_end(self, *args: Any, **kwargs: Any) -> None:
+        self._enqueue("on_llm_end", args, kwargs)
+
+    def on_llm_error(self, *args: Any, **kwargs: Any) -> None:
+        self._enqueue("on_llm_error", args, kwargs)
+
+    def on_tool_start(self, *args: Any, **kwargs: Any) -> None:
+        self._enqueue("on_tool_start", args, kwargs)
+
+    def on_tool_end(self, *args: Any, **kwargs: Any) -> None:
+        self._enqueue("on_tool_end", args, kwargs)
+
+    def on_tool_error(self, *args: Any, **kwargs: Any) -> None:
+        self._enqueue("on_tool_error", args, kwargs)
+
+    def shutdown(self, timeout: float = TRACING_SHUTDOWN_TIMEOUT_SECONDS) -> None:
+        """Export what is queued (waiting up to ``timeout``), then flush the Langfuse client."""
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("Trace export queue still full at shutdown; %s events dropped", self._queue.qsize())
+            return
+        self._thread.join(timeout)
+        client = getattr(self.handler, "client", None)
+        if client is not None:
+            client.flush()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "export_errors": self.export_errors,
+        }
@@ -0,0 +1,107 @@
+import functools
+import logging
+import os
+import random
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any
+
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    from utils.trace_export import BackgroundTracer
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# "false" turns tracing into a no-op even when the Langfuse keys are set.
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() in {"1", "true", "yes"}
+# Fraction of validations traced; every model call of a traced validation is traced.
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+# Callback events waiting for export; when full, new traces are dropped rather than slowing requests.
+TRACING_QUEUE_SIZE = int(os.getenv("TRACING_QUEUE_SIZE", "2000"))
+# Page images are replaced by their size and SHA-256 in traces unless this is "false"
+# (in which case queued events also hold the full images).
+TRACING_REDACT_IMAGES = os.getenv("TRACING_REDACT_IMAGES", "true").lower() in {"1", "true", "yes"}
+TRACING_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("TRACING_SHUTDOWN_TIMEOUT_SECONDS", "5"))
+
+# Whether the validation running in this context is traced; None outside trace_sampling().
+_sampled: ContextVar[bool | None] = ContextVar("trace_sampled", default=None)
+
+
+@functools.lru_cache(maxsize=None)
+def tracer() -> "BackgroundTracer | None":
+    """The process-wide tracer, created on first use; None when tracing is off.
+
+    Tracing is off when ``TRACING_ENABLED`` is false, the sample rate is zero,
+    or the Langfuse keys are not configured, so a missing .env never prevents
+    the agents from being used.
+    """
+    if not TRACING_ENABLED or TRACING_SAMPLE_RATE <= 0:
+        return None
+    public_key = os.getenv("LANGFUSE_PUBLIC_KEY")
+    secret_key = os.getenv("LANGFUSE_SECRET_KEY")
+    if not public_key or not secret_key:
+        logger.warning("LANGFUSE_PUBLIC_KEY/LANGFUSE_SECRET_KEY not set; Langfuse tracing is disabled")
+        return None
+
+    # Loaded here so that importing the agents (and this module) does not load langchain_core.
+    from langfuse import Langfuse
+    from langfuse.langchain import CallbackHandler
+
+    from utils.trace_export import BackgroundTracer
+
+    Langfuse(
+        public_key=public_key,
+        secret_key=secret_key,
+        host=os.getenv("LANGFUSE_HOST", "http://localhost:3000"),
+    )
+    return BackgroundTracer(CallbackHandler())
+
+
+@contextmanager
+def trace_sampling() -> Iterator[bool]:
+    """Decide once whether the validation run in this context is traced.
+
+    Every model call made inside (classification, text and vision calls,
+    render-pool work) shares the decision; a nested scope keeps the outer one's.
+    """
+    decided = _sampled.get()
+    if decided is not None:
+        yield decided
+        return
+    sampled = tracer() is not None and random.random() < TRACING_SAMPLE_RATE
+    token = _sampled.set(sampled)
+    try:
+        yield sampled
+    finally:
+        _sampled.reset(token)
+
+
+def tracing_callbacks() -> list[Any]:
+    """Callbacks for a model call: the tracer when the current validation is sampled, nothing otherwise.
+
+    Outside ``trace_sampling`` the call is sampled on its own.
+    """
+    handler = tracer()
+    if handler is None:
+        return []
+    sampled = _sampled.get()
+    if sampled is None:
+        sampled = random.random() < TRACING_SAMPLE_RATE
+    return [handler] if sampled else []
+
+
+def shutdown_tracing() -> None:
+    handler = tracer()
+    if handler is not None:
+        handler.shutdown()
+
+
+def tracing_stats() -> dict[str, Any]:
+    handler = tracer()
+    if handler is None:
+        return {"enabled": False}
+    return {"enabled": True, "sample_rate": TRACING_SAMPLE_RATE, **handler.stats()}